@@ -0,0 +1,459 @@
+import os
+import math
+import time
+import uuid
+import pickle
+import sqlite3
+import weakref
+import threading
+from pathlib import Path
+
+import faiss
+import numpy as np
+from dotenv import load_dotenv
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+import telemetry
+
+
+load_dotenv()
+
+# "auto" picks by corpus size; "flat", "hnsw_pq" and "ivf_pq" force a type.
+ANN_INDEX = os.getenv("GFF_ANN_INDEX", "auto").strip().lower()
+FLAT_MAX_VECTORS = int(os.getenv("GFF_ANN_FLAT_MAX_VECTORS", "20000"))
+HNSW_MAX_VECTORS = int(os.getenv("GFF_ANN_HNSW_MAX_VECTORS", "200000"))
+# Chunk text moves to SQLite once a corpus has this many chunks.
+OFFHEAP_MIN_CHUNKS = int(os.getenv("GFF_ANN_OFFHEAP_MIN_CHUNKS", str(FLAT_MAX_VECTORS)))
+PQ_SUBQUANTIZERS = int(os.getenv("GFF_ANN_PQ_M", "0"))  # 0 = about 16 dimensions per byte
+HNSW_M = int(os.getenv("GFF_ANN_HNSW_M", "32"))
+HNSW_EF_SEARCH = int(os.getenv("GFF_ANN_HNSW_EF_SEARCH", "64"))
+IVF_NPROBE = int(os.getenv("GFF_ANN_IVF_NPROBE", "16"))
+TRAIN_SAMPLE = int(os.getenv("GFF_ANN_TRAIN_SAMPLE", "50000"))
+RECALL_SAMPLE = int(os.getenv("GFF_ANN_RECALL_SAMPLE", "200"))
+# Off by default: checking an ANN index against exact search runs RECALL_SAMPLE extra searches per build.
+MEASURE_RECALL = os.getenv("GFF_ANN_MEASURE_RECALL", "0").lower() in ("1", "true", "yes")
+# Chunks embedded and added to the index per step; bounds the vectors held in Python at once.
+EMBED_BATCH_SIZE = int(os.getenv("GFF_EMBED_BATCH_SIZE", "256"))
+DOCSTORE_DIR = os.getenv("GFF_DOCSTORE_DIR", ".gff_cache/docstores")
+
+DOCSTORE_DB = "docstore.sqlite3"
+LEXICAL_FILE = "lexical.pkl"
+
+
+# --------------------------------------------------------------------------
+# Off-heap Docstore
+# --------------------------------------------------------------------------
+class SQLiteDocstore(Docstore, AddableMixin):
+    """Keeps chunk text and metadata in SQLite instead of a Python dict.
+
+    Only the rows a search returns are read into memory. Chunk text is also
+    kept in an FTS5 table, so keyword (BM25) search runs inside SQLite too
+    (see `full_text_search`). The store pickles as its path, so a saved vector
+    store reopens the database next to its index (see `load_vector_store`).
+    A store created with `owned=True` deletes its file when it is garbage
+    collected.
+    """
+
+    def __init__(self, path, owned=False):
+        self.path = Path(path)
+        self.owned = owned
+        self._lock = threading.Lock()
+        self._conn = None
+        if owned:
+            self._connect()
+            weakref.finalize(self, _remove_db, self._conn, str(self.path))
+
+    def __getstate__(self):
+        return {"path": str(self.path)}
+
+    def __setstate__(self, state):
+        # Connects lazily: load_vector_store swaps in the copy saved next to the index.
+        self.__init__(state["path"])
+
+    def _connect(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS docs (id TEXT PRIMARY KEY, doc BLOB NOT NULL)")
+            has_fts = self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'docs_fts'").fetchone()
+            if not has_fts:
+                # FTS rows share the rowid of their docs row. Databases from before the
+                # full-text table existed are backfilled once.
+                self._conn.execute("CREATE VIRTUAL TABLE docs_fts USING fts5(text)")
+                self._conn.executemany(
+                    "INSERT INTO docs_fts (rowid, text) VALUES (?, ?)",
+                    ((rowid, pickle.loads(doc).page_content)
+                     for rowid, doc in self._conn.execute("SELECT rowid, doc FROM docs")),
+                )
+            self._conn.commit()
+        return self._conn
+
+    def add(self, texts):
+        rows = [(str(_id), pickle.dumps(doc)) for _id, doc in texts.items()]
+        text_rows = [(doc.page_content, str(_id)) for _id, doc in texts.items()]
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.executemany("INSERT INTO docs (id, doc) VALUES (?, ?)", rows)
+                conn.executemany("INSERT INTO docs_fts (rowid, text) SELECT rowid, ? FROM docs WHERE id = ?", text_rows)
+                conn.commit()
+            except sqlite3.IntegrityError as e:
+                conn.rollback()
+                raise ValueError(f"Tried to add ids that already exist: {e}") from e
+
+    def delete(self, ids):
+        rows = [(str(i),) for i in ids]
+        with self._lock:
+            conn = self._connect()
+            conn.executemany("DELETE FROM docs_fts WHERE rowid = (SELECT rowid FROM docs WHERE id = ?)", rows)
+            conn.executemany("DELETE FROM docs WHERE id = ?", rows)
+            conn.commit()
+
+    def full_text_search(self, terms, k):
+        """BM25-ranks chunks containing any of `terms`. Returns [(docstore_id, score, text)], best first."""
+        if not terms:
+            return []
+        query = " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        with self._lock:
+            return self._connect().execute(
+                "SELECT docs.id, -bm25(docs_fts), docs_fts.text FROM docs_fts "
+                "JOIN docs ON docs.rowid = docs_fts.rowid "
+                "WHERE docs_fts MATCH ? ORDER BY bm25(docs_fts) LIMIT ?",
+                (query, k),
+            ).fetchall()
+
+    def search(self, search):
+        with self._lock:
+            row = self._connect().execute("SELECT doc FROM docs WHERE id = ?", (str(search),)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return pickle.loads(row[0])
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def copy_to(self, path, owned=False):
+        """Writes a consistent copy of the database to `path` and returns a store on it."""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        target = sqlite3.connect(str(path))
+        try:
+            with self._lock:
+                self._connect().backup(target)
+        finally:
+            target.close()
+        return SQLiteDocstore(path, owned=owned)
+
+
+def _remove_db(conn, path):
+    conn.close()
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except OSError:
+            pass
+
+
+# --------------------------------------------------------------------------
+# Index Selection
+# --------------------------------------------------------------------------
+def _pq_subquantizers(dim):
+    """Bytes per vector for product quantization: about 16 dimensions per byte, dividing `dim` evenly."""
+    m = PQ_SUBQUANTIZERS or max(1, dim // 16)
+    while m > 1 and dim % m:
+        m -= 1
+    return m
+
+
+def choose_index_plan(n_vectors, dim, kind=None):
+    """Picks the index type and its tuning parameters for a corpus of `n_vectors` vectors.
+
+    flat     exact search, 4*dim bytes per vector; best for small corpora.
+    hnsw_pq  graph search over PQ codes, m + ~2*M*4 bytes per vector; fast, high recall.
+    ivf_pq   inverted lists over PQ codes, m + 8 bytes per vector; smallest, recall set by nprobe.
+    """
+    kind = kind or ANN_INDEX
+    if kind == "auto":
+        if n_vectors < FLAT_MAX_VECTORS:
+            kind = "flat"
+        elif n_vectors < HNSW_MAX_VECTORS:
+            kind = "hnsw_pq"
+        else:
+            kind = "ivf_pq"
+
+    if kind == "flat":
+        return {"kind": "flat", "factory": "Flat", "bytes_per_vector": 4 * dim}
+
+    m = _pq_subquantizers(dim)
+    if kind == "hnsw_pq":
+        return {
+            "kind": "hnsw_pq",
+            "factory": f"HNSW{HNSW_M}_PQ{m}",
+            "pq_m": m,
+            "hnsw_m": HNSW_M,
+            "ef_search": HNSW_EF_SEARCH,
+            "bytes_per_vector": m + 2 * HNSW_M * 4,
+        }
+    if kind == "ivf_pq":
+        nlist = max(1, min(65536, 2 ** round(math.log2(4 * math.sqrt(max(1, n_vectors))))))
+        return {
+            "kind": "ivf_pq",
+            "factory": f"IVF{nlist},PQ{m}",
+            "pq_m": m,
+            "nlist": nlist,
+            "nprobe": min(IVF_NPROBE, nlist),
+            "bytes_per_vector": m + 8,
+        }
+    raise ValueError(f"Unknown index type '{kind}'. Use auto, flat, hnsw_pq or ivf_pq.")
+
+
+def _tune(index, plan):
+    if plan["kind"] == "hnsw_pq":
+        faiss.downcast_index(index).hnsw.efSearch = plan["ef_search"]
+    elif plan["kind"] == "ivf_pq":
+        faiss.extract_index_ivf(index).nprobe = plan["nprobe"]
+
+
+def build_index(vectors, plan):
+    """Creates, trains and fills the FAISS index described by `plan`."""
+    index = faiss.index_factory(vectors.shape[1], plan["factory"])
+    if not index.is_trained:
+        sample = vectors
+        if len(vectors) > TRAIN_SAMPLE:
+            rng = np.random.default_rng(0)
+            sample = vectors[rng.choice(len(vectors), TRAIN_SAMPLE, replace=False)]
+        index.train(sample)
+    _tune(index, plan)
+    index.add(vectors)
+    return index
+
+
+def build_index_from_flat(flat, plan, batch_size=EMBED_BATCH_SIZE):
+    """Like build_index, but reads the vectors out of an exact `flat` index a batch at a time."""
+    index = faiss.index_factory(flat.d, plan["factory"])
+    if not index.is_trained:
+        sample_ids = np.arange(flat.ntotal)
+        if flat.ntotal > TRAIN_SAMPLE:
+            rng = np.random.default_rng(0)
+            sample_ids = np.sort(rng.choice(flat.ntotal, TRAIN_SAMPLE, replace=False))
+        index.train(flat.reconstruct_batch(sample_ids))
+    _tune(index, plan)
+    for start in range(0, flat.ntotal, batch_size):
+        index.add(flat.reconstruct_n(start, min(batch_size, flat.ntotal - start)))
+    return index
+
+
+def describe_plan(plan, n_vectors, dim):
+    """Returns the index type, parameters and memory estimate for `plan`, without searching anything."""
+    report = {
+        "index": plan["kind"],
+        "factory": plan["factory"],
+        "vectors": n_vectors,
+        "memory_mb": round(n_vectors * plan["bytes_per_vector"] / 2**20, 1),
+        "flat_memory_mb": round(n_vectors * dim * 4 / 2**20, 1),
+    }
+    report.update({k: v for k, v in plan.items() if k in ("pq_m", "hnsw_m", "ef_search", "nlist", "nprobe")})
+    return report
+
+
+def measure_tradeoff(index, vectors, plan, top_k=5):
+    """Estimates recall@k against exact search and per-query latency, using stored vectors as queries.
+
+    `vectors` is the array of indexed vectors, or an exact (flat) FAISS index
+    holding them, which avoids materializing them all.
+    """
+    exact = vectors if isinstance(vectors, faiss.Index) else None
+    n_vectors, dim = (exact.ntotal, exact.d) if exact is not None else vectors.shape
+    report = describe_plan(plan, n_vectors, dim)
+
+    count = min(RECALL_SAMPLE, n_vectors)
+    rng = np.random.default_rng(1)
+    sample_ids = rng.choice(n_vectors, count, replace=False)
+    queries = exact.reconstruct_batch(sample_ids) if exact is not None else vectors[sample_ids]
+    k = min(top_k, n_vectors)
+
+    start = time.perf_counter()
+    _, found = index.search(queries, k)
+    report["ms_per_query"] = round((time.perf_counter() - start) * 1000 / count, 3)
+
+    if plan["kind"] == "flat":
+        report["recall_at_k"] = 1.0
+    else:
+        _, truth = exact.search(queries, k) if exact is not None else faiss.knn(queries, vectors, k)
+        hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+        report["recall_at_k"] = round(hits / (count * k), 3)
+    report["top_k"] = k
+    return report
+
+
+def print_tradeoff(report):
+    print("🔹 Vector index:")
+    for key in ("index", "factory", "vectors", "pq_m", "hnsw_m", "ef_search", "nlist", "nprobe"):
+        if key in report:
+            print(f"   {key:<14} {report[key]}")
+    print(f"   {'memory':<14} ~{report['memory_mb']} MB (flat would be {report['flat_memory_mb']} MB)")
+    if "recall_at_k" not in report:
+        if report["index"] != "flat":
+            print(f"   {'recall':<14} not measured (set GFF_ANN_MEASURE_RECALL=1)")
+        return
+    print(f"   {'latency':<14} {report['ms_per_query']} ms/query")
+    print(f"   {'recall@' + str(report['top_k']):<14} {report['recall_at_k']} vs exact search")
+
+
+# --------------------------------------------------------------------------
+# Vector Store Construction & Persistence
+# --------------------------------------------------------------------------
+def batched(items, size):
+    """Yields lists of up to `size` items from any iterable, consuming it lazily."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def index_documents(split_docs, embeddings, kind=None, batch_size=EMBED_BATCH_SIZE, measure_recall=None):
+    """Embeds chunks into a FAISS vector store whose index type and docstore fit the corpus size.
+
+    `split_docs` may be any iterable, including a generator that is still
+    reading the files: chunks are embedded and added `batch_size` at a time
+    into an exact index, and their text moves to SQLite once there are
+    OFFHEAP_MIN_CHUNKS of them, so memory held for the chunks themselves stays
+    bounded. When the final size calls for a compressed index, it is trained
+    and filled from the exact one in batches.
+
+    Returns (vector_store, report) where `report` describes the chosen index
+    and its memory estimate, or (None, None) when there were no chunks. With
+    `measure_recall` (default GFF_ANN_MEASURE_RECALL) the report also holds
+    the latency and recall measured against exact search.
+    """
+    flat = None
+    ids = []
+    held = {}
+    docstore = None
+    for batch in batched(split_docs, batch_size):
+        with telemetry.span("embed_chunks"):
+            vectors = np.array(embeddings.embed_documents([d.page_content for d in batch]), dtype=np.float32)
+        if flat is None:
+            flat = faiss.IndexFlatL2(vectors.shape[1])
+        with telemetry.span("build_index", kind="flat"):
+            flat.add(vectors)
+
+        # Chunks may arrive with ids (see answer_retrever's per-file ids); the rest get random ones.
+        batch_ids = [getattr(d, "id", None) or str(uuid.uuid4()) for d in batch]
+        ids.extend(batch_ids)
+        docs = {
+            _id: Document(id=_id, page_content=d.page_content, metadata=d.metadata)
+            for _id, d in zip(batch_ids, batch)
+        }
+        if docstore is None:
+            held.update(docs)
+            if len(held) >= OFFHEAP_MIN_CHUNKS:
+                docstore = SQLiteDocstore(Path(DOCSTORE_DIR) / f"{uuid.uuid4().hex}.sqlite3", owned=True)
+                docstore.add(held)
+                held = {}
+        else:
+            docstore.add(docs)
+
+    if flat is None:
+        return None, None
+
+    plan = choose_index_plan(flat.ntotal, flat.d, kind)
+    if plan["kind"] == "flat":
+        index = flat
+    else:
+        with telemetry.span("build_index", kind=plan["kind"]):
+            index = build_index_from_flat(flat, plan, batch_size)
+    if measure_recall is None:
+        measure_recall = MEASURE_RECALL
+    if measure_recall:
+        report = measure_tradeoff(index, flat, plan)
+    else:
+        report = describe_plan(plan, flat.ntotal, flat.d)
+    del flat
+
+    report["docstore"] = "sqlite" if docstore is not None else "memory"
+    vector_store = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore if docstore is not None else InMemoryDocstore(held),
+        index_to_docstore_id=dict(enumerate(ids)),
+    )
+    return vector_store, report
+
+
+def is_flat_in_memory(vector_store):
+    """True for stores built the original way (exact index, dict docstore), which can be merged and copied freely."""
+    return isinstance(vector_store.docstore, InMemoryDocstore) and isinstance(
+        faiss.downcast_index(vector_store.index), faiss.IndexFlat
+    )
+
+
+def index_kind(index):
+    """The choose_index_plan kind of a FAISS index ("flat", "hnsw_pq" or "ivf_pq")."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexFlat):
+        return "flat"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw_pq"
+    return "ivf_pq"
+
+
+def fits_corpus(vector_store):
+    """True when the store's index type and docstore are what index_documents would pick for its current size."""
+    n_vectors = vector_store.index.ntotal
+    plan = choose_index_plan(n_vectors, vector_store.index.d)
+    offheap = isinstance(vector_store.docstore, SQLiteDocstore)
+    return plan["kind"] == index_kind(vector_store.index) and (offheap or n_vectors < OFFHEAP_MIN_CHUNKS)
+
+
+def detach_vector_store(vector_store):
+    """Gives a loaded store its own SQLite docstore copy, so edits don't touch the files it was read from."""
+    if isinstance(vector_store.docstore, SQLiteDocstore) and not vector_store.docstore.owned:
+        vector_store.docstore = vector_store.docstore.copy_to(
+            Path(DOCSTORE_DIR) / f"{uuid.uuid4().hex}.sqlite3", owned=True
+        )
+    return vector_store
+
+
+def save_vector_store(vector_store, folder):
+    """save_local, plus a copy of an off-heap docstore and the lexical index next to the index."""
+    folder = Path(folder)
+    vector_store.save_local(str(folder))
+    if isinstance(vector_store.docstore, SQLiteDocstore):
+        vector_store.docstore.copy_to(folder / DOCSTORE_DB)
+    else:
+        (folder / DOCSTORE_DB).unlink(missing_ok=True)
+    # An off-heap docstore carries its own full-text index; only in-memory stores pickle one.
+    lexical = getattr(vector_store, "lexical_index", None)
+    if lexical is not None and not isinstance(vector_store.docstore, SQLiteDocstore):
+        with open(folder / LEXICAL_FILE, "wb") as f:
+            pickle.dump(lexical, f)
+    else:
+        (folder / LEXICAL_FILE).unlink(missing_ok=True)
+
+
+def load_vector_store(folder, embeddings, index):
+    """Rebuilds a saved vector store around an already-read `index`, with its SQLite docstore and lexical index if saved."""
+    folder = Path(folder)
+    with open(folder / "index.pkl", "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    if isinstance(docstore, SQLiteDocstore):
+        docstore = SQLiteDocstore(folder / DOCSTORE_DB)
+    vector_store = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id,
+    )
+    if (folder / LEXICAL_FILE).exists() and not isinstance(docstore, SQLiteDocstore):
+        with open(folder / LEXICAL_FILE, "rb") as f:
+            vector_store.lexical_index = pickle.load(f)
+    return vector_store
@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+
+def normalize_question(text):
+    """Lower-cases and collapses whitespace so trivial formatting changes still hit the cache."""
+    return " ".join(str(text).lower().split())
+
+
+def answer_key(question, options, model_name, context_text):
+    """Cache key: normalized question, option list, model name and a hash of the retrieved context."""
+    payload = json.dumps({
+        "question": normalize_question(question),
+        "options": [str(opt).strip() for opt in options or []],
+        "model": model_name,
+        "context": hashlib.sha256((context_text or "").encode("utf-8")).hexdigest(),
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# --------------------------------------------------------------------------
+# Persistent Answer Cache
+# --------------------------------------------------------------------------
+class AnswerCache:
+    """SQLite-backed cache of generated answers with TTL and LRU eviction.
+
+    Only successful answers are stored; `failed` results must never be passed
+    to `put`. Entries expire `ttl_seconds` after they were written, and the
+    least recently used ones are dropped once there are more than `max_entries`.
+    """
+
+    def __init__(self, db_path, ttl_seconds=7 * 24 * 3600, max_entries=10000):
+        self.db_path = Path(db_path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Returns the cached answer, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT answer, created FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            answer, created = row
+            if self.ttl_seconds is not None and now - created > self.ttl_seconds:
+                conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+                conn.commit()
+                self.expired += 1
+                self.misses += 1
+                return None
+            conn.execute("UPDATE answers SET last_used = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+        return json.loads(answer)
+
+    def put(self, key, answer):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO answers (key, answer, created, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(answer), now, now),
+            )
+            self.stores += 1
+            self._evict(conn)
+            conn.commit()
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM answers")
+            conn.commit()
+
+    def stats(self):
+        with self._lock:
+            size = self._connect().execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "entries": size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "stores": self.stores,
+                "expired": self.expired,
+                "evictions": self.evictions,
+            }
+
+    # Callers must hold self._lock.
+    def _connect(self):
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "key TEXT PRIMARY KEY, answer TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used)")
+            self._conn.commit()
+        return self._conn
+
+    def _evict(self, conn):
+        if self.ttl_seconds is not None:
+            cur = conn.execute("DELETE FROM answers WHERE created < ?", (time.time() - self.ttl_seconds,))
+            self.expired += cur.rowcount
+        if self.max_entries is not None:
+            size = conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+            if size > self.max_entries:
+                cur = conn.execute(
+                    "DELETE FROM answers WHERE key IN (SELECT key FROM answers ORDER BY last_used ASC LIMIT ?)",
+                    (size - self.max_entries,),
+                )
+                self.evictions += cur.rowcount
+
+
+answer_cache = AnswerCache(
+    db_path=os.getenv("GFF_ANSWER_CACHE_PATH", ".gff_cache/answers.sqlite3"),
+    ttl_seconds=float(os.getenv("GFF_ANSWER_CACHE_TTL_HOURS", "168")) * 3600,
+    max_entries=int(os.getenv("GFF_ANSWER_CACHE_MAX_ENTRIES", "10000")),
+)
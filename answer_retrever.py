@@ -2,16 +2,27 @@
 import os
 import time
 import random
-import google.generativeai as genai
 import traceback
+import threading
 import requests
 
 from dotenv import load_dotenv
-from langchain_community.vectorstores import FAISS
-# from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import TextLoader, PyPDFLoader, Docx2txtLoader
-from langchain_huggingface import HuggingFaceEmbeddings
+
+import telemetry
+# numpy, FAISS, LangChain and the loaders (ann_index, index_cache, incremental_index,
+# ingestion) are imported inside the functions that index or search, so importing
+# this module stays cheap for the app's first paint.
+from embedding_registry import DEFAULT_EMBEDDING_MODEL, get_embeddings
+from generation_engine import (
+    ConcurrentGenerator, FAILED_ANSWER, count_error, extract_response_text, is_rate_limit_error,
+    retry_after_hint, shared_backoff, shared_bucket,
+)
+from answer_cache import answer_cache, answer_key
+from run_checkpoint import RunCheckpoint, run_id_for
+from batch_prompts import build_batch_prompt, estimate_tokens, parse_batch_answers, plan_batches
+from hybrid_retriever import HYBRID_RETRIEVAL, hybrid_retrieve, lexical_index_for
+from context_assembler import ContextAssembler
+from choice_resolver import CHOICE_FAST_PATH, ChoiceResolver
 
 # Import your question extractor
 from question_retrever import extract_questions_from_google_form
@@ -23,163 +34,544 @@ from question_retrever import extract_questions_from_google_form
 load_dotenv()
 
 API_KEY = os.getenv("GFF_key")
-if not API_KEY:
-    raise ValueError("API key not found. Please set GFF_key in your .env file.")
-
-genai.configure(api_key=API_KEY)
+_genai = None
+_genai_lock = threading.Lock()
+
+
+def configure_gemini():
+    """Imports and configures google.generativeai on first use and returns the module.
+
+    Deferred so importing this module stays cheap; the app warms it up in the
+    background once the UI is on screen.
+    """
+    global _genai
+    with _genai_lock:
+        if _genai is None:
+            if not API_KEY:
+                raise ValueError("API key not found. Please set GFF_key in your .env file.")
+            import google.generativeai as genai
+            genai.configure(api_key=API_KEY)
+            _genai = genai
+    return _genai
+
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+INGEST_WORKERS = int(os.getenv("GFF_INGEST_WORKERS", "1"))
+# Read, split and embed files page by page instead of loading them whole (the process pool needs whole files).
+STREAM_INGEST = os.getenv("GFF_STREAM_INGEST", "1" if INGEST_WORKERS <= 1 else "0").lower() in ("1", "true", "yes")
+
+GEMINI_MODEL = "gemini-2.5-flash"
+PLACEHOLDER_FLAG = "DATA_NOT_FOUND"
+GENERATION_CONCURRENCY = int(os.getenv("GFF_GENERATION_CONCURRENCY", "4"))
+REQUESTS_PER_MINUTE = float(os.getenv("GFF_GEMINI_RPM", "0"))
+BATCHED_PROMPTS = os.getenv("GFF_BATCHED_PROMPTS", "0").lower() in ("1", "true", "yes")
+BATCH_TOKEN_BUDGET = int(os.getenv("GFF_BATCH_TOKEN_BUDGET", "6000"))
+BATCH_MAX_QUESTIONS = int(os.getenv("GFF_BATCH_MAX_QUESTIONS", "10"))
+ANSWER_CACHE_ENABLED = os.getenv("GFF_ANSWER_CACHE", "1").lower() in ("1", "true", "yes")
+CHECKPOINTS_ENABLED = os.getenv("GFF_CHECKPOINTS", "1").lower() in ("1", "true", "yes")
+
+SAFETY_SETTINGS = {
+    "HARM_CATEGORY_HARASSMENT": "BLOCK_NONE",
+    "HARM_CATEGORY_HATE_SPEECH": "BLOCK_NONE",
+    "HARM_CATEGORY_SEXUALLY_EXPLICIT": "BLOCK_NONE",
+    "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_NONE",
+}
 
 
 # --------------------------------------------------------------------------
 # Document Loading and Vector Store
 # --------------------------------------------------------------------------
-def load_documents(file_paths):
-    """Loads multiple documents (PDF, DOCX, or TXT)."""
-    docs = []
-    for path in file_paths:
-        try:
-            if not os.path.exists(path):
-                print(f"⚠️  Warning: File not found at {path}, skipping.")
-                continue
+@telemetry.span("load_documents")
+def load_documents(file_paths, workers=None):
+    """Loads multiple documents (PDF, DOCX, or TXT), across a process pool when `workers` > 1."""
+    from ingestion import ingest_files, print_ingest_report
+    docs, report = ingest_files(file_paths, workers=workers or INGEST_WORKERS)
+    print_ingest_report(report)
+    return docs
 
-            if path.endswith(".pdf"):
-                loader = PyPDFLoader(path)
-            elif path.endswith(".docx"):
-                loader = Docx2txtLoader(path)
-            else:
-                loader = TextLoader(path)
 
-            docs.extend(loader.load())
+@telemetry.span("load_documents")
+def load_and_split_documents(file_paths, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, workers=None):
+    """Loads and splits documents; with `workers` > 1 both steps run inside the pool."""
+    from ingestion import ingest_files, print_ingest_report
+    chunks, report = ingest_files(
+        file_paths, workers=workers or INGEST_WORKERS, chunk_size=chunk_size, chunk_overlap=chunk_overlap
+    )
+    print_ingest_report(report)
+    return chunks
 
-        except Exception as e:
-            print(f"⚠️  Error loading {path}: {e}")
-            traceback.print_exc()
 
-    return docs
+def stream_documents(file_paths, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """Yields the files' chunks as they are read page by page; the ingest report prints once the stream ends."""
+    from ingestion import iter_chunks, print_ingest_report
+    report = []
+    try:
+        yield from iter_chunks(file_paths, chunk_size, chunk_overlap, report=report)
+    finally:
+        print_ingest_report(report)
 
 
-def create_vector_store(docs):
+def split_documents(docs, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """Splits loaded documents into overlapping chunks for embedding."""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True)
+    return splitter.split_documents(docs)
+
+
+def iter_split_documents(docs, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """Like split_documents, but yields chunks one document at a time instead of building the full list."""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True)
+    for doc in docs:
+        yield from splitter.split_documents([doc])
+
+
+def create_vector_store(docs, embedding_model=DEFAULT_EMBEDDING_MODEL,
+                        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
     """Creates FAISS vector store from document embeddings."""
     if not docs:
         print("⚠️  No documents loaded. Skipping FAISS vector creation.")
         return None
 
-    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    split_docs = splitter.split_documents(docs)
+    return index_chunks(iter_split_documents(docs, chunk_size, chunk_overlap), embedding_model)
+
+
+def index_chunks(split_docs, embedding_model=DEFAULT_EMBEDDING_MODEL):
+    """Embeds already-split chunks (a list or a stream of them) into a FAISS vector store, a batch at a time."""
+    if isinstance(split_docs, list) and not split_docs:
+        print("⚠️  No document chunks to index. Skipping FAISS vector creation.")
+        return None
+
+    from ann_index import index_documents, print_tradeoff
 
     print("🔹 Initializing embedding model...")
-    embeddings = HuggingFaceEmbeddings(model_name="hkunlp/instructor-base")
+    embeddings = get_embeddings(embedding_model)
 
     print("🔹 Creating vector store...")
-    vector_store = FAISS.from_documents(split_docs, embeddings)
+    vector_store, report = index_documents(split_docs, embeddings)
+    if vector_store is None:
+        print("⚠️  No document chunks to index. Skipping FAISS vector creation.")
+        return None
+    print_tradeoff(report)
+    if HYBRID_RETRIEVAL:
+        lexical_index_for(vector_store)
     print("✅ Vector store created successfully.")
     return vector_store
 
 
+def build_vector_store(file_paths, embedding_model=DEFAULT_EMBEDDING_MODEL,
+                       chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, use_cache=True):
+    """Returns a vector store for the files, reusing the on-disk index cache when the same content was indexed before."""
+    from index_cache import file_digest, index_cache
+    key = None
+    if use_cache:
+        try:
+            key = index_cache.key_for(file_paths, chunk_size, chunk_overlap, embedding_model)
+            vector_store = index_cache.load(key, get_embeddings(embedding_model)) if key else None
+            telemetry.count("index_cache_lookups", result="hit" if vector_store is not None else "miss")
+            if vector_store is not None:
+                print(f"✅ Loaded vector store from index cache ({index_cache.stats()}).")
+                return vector_store
+        except Exception as e:
+            print(f"⚠️  Index cache lookup failed: {e}")
+            key = None
+
+    digests = {path: file_digest(path) for path in file_paths if os.path.exists(path)}
+    if STREAM_INGEST:
+        chunks = stream_documents(file_paths, chunk_size, chunk_overlap)
+    else:
+        chunks = load_and_split_documents(file_paths, chunk_size, chunk_overlap)
+    vector_store = index_chunks(_with_file_ids(chunks, digests), embedding_model)
+
+    if key and vector_store is not None:
+        try:
+            index_cache.store(key, vector_store, embedding_model=embedding_model,
+                              chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        except Exception as e:
+            print(f"⚠️  Could not save vector store to index cache: {e}")
+
+    return vector_store
+
+
+def _with_file_ids(chunks, digests):
+    """Gives each chunk the id "<file digest[:16]>:<n>", the scheme incremental_index uses to tell which file owns it."""
+    counts = {}
+    for chunk in chunks:
+        digest = digests.get(chunk.metadata.get("source"))
+        if digest is not None:
+            n = counts.get(digest, 0)
+            counts[digest] = n + 1
+            chunk.id = f"{digest[:16]}:{n}"
+        yield chunk
+
+
+def sync_vector_store(collection, file_paths, embedding_model=DEFAULT_EMBEDDING_MODEL,
+                      chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """Incrementally updates a named collection: only new or changed files are split and embedded.
+
+    New collections (and ones that outgrow their index type) are built through
+    build_vector_store, so they reuse the index cache and get the ANN index
+    and off-heap docstore picked for their size.
+    """
+    from incremental_index import incremental_index
+    from ingestion import iter_file_chunks
+    settings = {
+        "embedding_model": embedding_model,
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+    }
+    return incremental_index.sync(
+        collection,
+        file_paths,
+        get_embeddings(embedding_model),
+        chunk_loader=lambda path: (
+            iter_file_chunks(path, chunk_size, chunk_overlap) if STREAM_INGEST
+            else load_and_split_documents([path], chunk_size, chunk_overlap)
+        ),
+        settings=settings,
+        build=lambda paths: build_vector_store(paths, embedding_model, chunk_size, chunk_overlap),
+    )
+
+
+# --------------------------------------------------------------------------
+# Batched Retrieval
+# --------------------------------------------------------------------------
+def _dense_search(vector_store, queries, k):
+    """Embeds all queries in one call and runs one FAISS search. Returns ranked docstore ids per query."""
+    import faiss
+    import numpy as np
+    with telemetry.span("embed_queries"):
+        vectors = np.array(vector_store.embeddings.embed_documents(list(queries)), dtype=np.float32)
+    if vector_store._normalize_L2:
+        faiss.normalize_L2(vectors)
+    with telemetry.span("faiss_search"):
+        _, indices = vector_store.index.search(vectors, k)
+    return [[vector_store.index_to_docstore_id[j] for j in row if j != -1] for row in indices]
+
+
+def retrieve_contexts(vector_store, queries, top_k=3, hybrid=None):
+    """Retrieves the top_k chunks for every query with one batched embedding call and one FAISS search.
+
+    Returns one list of documents per query, matching what
+    `vector_store.as_retriever(search_type="similarity").invoke(query)` returns.
+    With `hybrid`, BM25 and vector rankings are fused, and queries with a
+    decisive keyword match skip the embedding model.
+    """
+    if not queries:
+        return []
+
+    hybrid = HYBRID_RETRIEVAL if hybrid is None else hybrid
+    if hybrid:
+        ranked_ids = hybrid_retrieve(
+            vector_store, list(queries), top_k, lambda qs, k: _dense_search(vector_store, qs, k)
+        )
+    else:
+        ranked_ids = _dense_search(vector_store, queries, top_k)
+
+    results = []
+    for row in ranked_ids:
+        docs = []
+        for doc_id in row:
+            doc = vector_store.docstore.search(doc_id)
+            if isinstance(doc, str):
+                raise ValueError(f"Could not find document for id {doc_id}: {doc}")
+            docs.append(doc)
+        results.append(docs)
+    return results
+
+
 # --------------------------------------------------------------------------
 # Safe Gemini Generation with Retry Logic
 # --------------------------------------------------------------------------
-def safe_generate_content(model, prompt, safety_settings, retries=3, delay=2):
-    """Calls Gemini API safely with retry logic. Logs each retry. Returns (response_text, failed_flag)."""
+def safe_generate_content(model, prompt, safety_settings, retries=3, delay=2, requests_per_minute=None):
+    """Calls Gemini API safely with retry logic. Logs each retry. Returns (response_text, failed_flag).
+
+    Paced by the same process-wide token bucket and rate-limit backoff as the concurrent engine.
+    """
+    bucket = shared_bucket(requests_per_minute)
     for attempt in range(1, retries + 1):
+        shared_backoff.wait_blocking()
+        if bucket:
+            bucket.acquire_blocking()
         try:
-            response = model.generate_content(prompt, safety_settings=safety_settings)
-
-            if hasattr(response, "text") and response.text:
-                return response.text.strip(), False
+            with telemetry.span("gemini_call"):
+                response = model.generate_content(prompt, safety_settings=safety_settings)
 
-            # fallback if no text returned
-            if getattr(response, "candidates", None):
-                candidate = response.candidates[0]
-                if candidate.content and candidate.content.parts:
-                    text = "".join(
-                        part.text for part in candidate.content.parts if hasattr(part, "text")
-                    ).strip()
-                    if text:
-                        return text, False
+            text = extract_response_text(response)
+            if text:
+                shared_backoff.on_success()
+                return text, False
 
+            telemetry.count("gemini_empty_responses")
             print(f"⚠️  Attempt {attempt}: Gemini returned empty response, retrying...")
 
         except Exception as e:
+            count_error(e)
+            if is_rate_limit_error(e):
+                shared_backoff.on_throttle(retry_after_hint(e))
             print(f"⚠️  Attempt {attempt} failed with error: {e}")
             print("🔁 Retrying...")
             # traceback.print_exc()
 
+        if attempt < retries:
+            telemetry.count("gemini_retries")
         time.sleep(delay + random.uniform(0, 1))
 
+    telemetry.count("gemini_failed")
     print("❌ All retry attempts failed. Marking as failed.")
-    return "No answer generated (Gemini failure)", True
+    return FAILED_ANSWER, True
 
 
 # --------------------------------------------------------------------------
 # Generate Answers using RAG
 # --------------------------------------------------------------------------
-def generate_answers_rag_with_refresh(form_data, vector_store, top_k=3, context_refresh_interval=5):
-    """Generates answers for each form question using Gemini RAG."""
-    model = genai.GenerativeModel("gemini-2.5-flash")
-    PLACEHOLDER_FLAG = "DATA_NOT_FOUND"
-
-    safety_settings = {
-        "HARM_CATEGORY_HARASSMENT": "BLOCK_NONE",
-        "HARM_CATEGORY_HATE_SPEECH": "BLOCK_NONE",
-        "HARM_CATEGORY_SEXUALLY_EXPLICIT": "BLOCK_NONE",
-        "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_NONE",
-    }
+def build_prompt(question_text, options, context_text):
+    """Builds the single-question Gemini prompt."""
+    options_str = "\n".join([f"- {opt}" for opt in options]) if options else "None"
+    return f"""
+You are an intelligent assistant filling a Google Form.
+
+Question: {question_text}
+Options (if any):
+{options_str}
+
+{"Use the following context to answer the question:\n" + context_text if context_text else "No relevant context found."}
+CRITICAL: If you could not answer using context or general_knowledge then return "{PLACEHOLDER_FLAG}" and source "not_found". Never invent personal data.
+
+Generate only the final answer (no explanation).
+"""
+
+
+def build_question_contexts(form_data, vector_store, top_k=3, context_refresh_interval=5, assembler=None,
+                            positions=None):
+    """Returns one {"text", "chunks", "source"} dict per question, applying the context refresh rule.
 
+    `positions` are the questions' 0-based indexes in the whole form (default:
+    their order in `form_data`), so a resumed run that only passes the missing
+    questions still refreshes on the same questions.
+
+    Retrieved chunks go through `assembler` (a ContextAssembler), which merges
+    overlaps, drops near-duplicates and trims each question's context to the
+    token budget. On a refresh question the previous question's chunks that it
+    doesn't already have are ranked after its own, and only fill room that
+    merging and de-duplication freed: the context never gets larger than its
+    own chunks sent verbatim.
+    """
+    assembler = assembler or ContextAssembler()
     retriever = None
+    batched_docs = None
     if vector_store:
         retriever = vector_store.as_retriever(search_type="similarity", search_kwargs={"k": top_k})
+        try:
+            print(f"🔹 Retrieving context for {len(form_data)} questions in one batch...")
+            batched_docs = retrieve_contexts(vector_store, [q.get("question", "") for q in form_data], top_k)
+        except Exception as e:
+            print(f"⚠️  Batched retrieval failed, falling back to per-question retrieval: {e}")
+            traceback.print_exc()
 
-    answered = []
-    last_context_text = ""
+    contexts = []
+    last_docs = []
+    positions = range(len(form_data)) if positions is None else positions
 
-    for i, q in enumerate(form_data, start=1):
+    for i, (q, position) in enumerate(zip(form_data, positions), start=1):
         question_text = q.get("question", "")
-        options = q.get("options", [])
-        options_str = "\n".join([f"- {opt}" for opt in options]) if options else "None"
-
-        print(f"\n🧠 Processing Q{i}: {question_text[:80]}...")
+        print(f"\n🧠 Processing Q{position + 1}: {question_text[:80]}...")
 
-        context_text = ""
+        relevant_docs = []
         source = "general knowledge"
 
         if retriever:
             try:
-                relevant_docs = retriever.invoke(question_text)
+                if batched_docs is not None:
+                    relevant_docs = batched_docs[i - 1]
+                else:
+                    relevant_docs = retriever.invoke(question_text)
                 if relevant_docs:
-                    context_text = "\n\n".join([doc.page_content for doc in relevant_docs])
                     source = "from context"
             except Exception as e:
-                print(f"⚠️  Context retrieval failed for Q{i}: {e}")
+                print(f"⚠️  Context retrieval failed for Q{position + 1}: {e}")
                 traceback.print_exc()
 
         # Context refresh mechanism
-        if i % context_refresh_interval == 0 and last_context_text:
-            context_text = last_context_text
-        if context_text:
-            last_context_text = context_text
-
-        prompt = f"""
-You are an intelligent assistant filling a Google Form.
-
-Question: {question_text}
-Options (if any):
-{options_str}
-
-{"Use the following context to answer the question:\n" + context_text if context_text else "No relevant context found."}
-CRITICAL: If you could not answer using context or general_knowledge then return "{PLACEHOLDER_FLAG}" and source "not_found". Never invent personal data.
-
-Generate only the final answer (no explanation).
-"""
-
-        answer_text, failed_flag = safe_generate_content(model, prompt, safety_settings)
+        docs, budget = list(relevant_docs), None
+        if (position + 1) % context_refresh_interval == 0 and last_docs:
+            if docs:
+                included = {doc.page_content for doc in docs}
+                docs += [doc for doc in last_docs if doc.page_content not in included]
+                budget = estimate_tokens("\n\n".join(doc.page_content for doc in relevant_docs))
+            else:
+                docs = list(last_docs)
+        baseline = list(relevant_docs) or docs
+        if relevant_docs:
+            last_docs = list(relevant_docs)
+
+        chunks = assembler.assemble(docs, baseline, token_budget=budget)
+        context_text = "\n\n".join(chunks)
+        contexts.append({"text": context_text, "chunks": chunks, "source": source})
+
+    assembler.report()
+    return contexts
+
+
+def _generate_prompts(model, prompts, concurrency, requests_per_minute, on_result):
+    """Sends prompts through the concurrent engine, or sequentially when concurrency is 1."""
+    if concurrency > 1 and len(prompts) > 1:
+        generator = ConcurrentGenerator(
+            model, SAFETY_SETTINGS, concurrency=concurrency, requests_per_minute=requests_per_minute
+        )
+        generator.run(prompts, on_result=on_result)
+    else:
+        for index, prompt in enumerate(prompts):
+            with telemetry.span("generate_answer", question=f"Q{index + 1}"):
+                result = safe_generate_content(
+                    model, prompt, SAFETY_SETTINGS, requests_per_minute=requests_per_minute
+                )
+            on_result(index, *result)
+
+
+def _generate_batched(form_data, contexts, model, concurrency, requests_per_minute, record):
+    """Answers several questions per prompt; anything missing from the JSON reply is asked on its own."""
+    batches = plan_batches(form_data, contexts, BATCH_TOKEN_BUDGET, BATCH_MAX_QUESTIONS)
+    batch_prompts = [build_batch_prompt(batch, form_data, contexts, PLACEHOLDER_FLAG) for batch in batches]
+    answered = set()
+
+    def _record_batch(batch_index, text, failed_flag):
+        batch = batches[batch_index]
+        answers = {} if failed_flag else parse_batch_answers(text, len(batch))
+        for position, answer in answers.items():
+            record(batch[position - 1], answer, False)
+            answered.add(batch[position - 1])
+        print(f"🔹 Batch {batch_index + 1}: {len(answers)}/{len(batch)} answers parsed.")
+
+    print(f"🔹 Answering {len(form_data)} questions in {len(batches)} batched prompt(s)...")
+    _generate_prompts(model, batch_prompts, concurrency, requests_per_minute, _record_batch)
+
+    missing = [i for i in range(len(form_data)) if i not in answered]
+    if missing:
+        print(f"🔁 Falling back to single-question prompts for {len(missing)} question(s)...")
+        single_prompts = [
+            build_prompt(form_data[i].get("question", ""), form_data[i].get("options", []), contexts[i]["text"])
+            for i in missing
+        ]
+        _generate_prompts(
+            model, single_prompts, concurrency, requests_per_minute,
+            lambda j, text, failed_flag: record(missing[j], text, failed_flag),
+        )
+
+    per_question_tokens = sum(
+        estimate_tokens(build_prompt(q.get("question", ""), q.get("options", []), c["text"]))
+        for q, c in zip(form_data, contexts)
+    )
+    batched_tokens = sum(estimate_tokens(p) for p in batch_prompts)
+    print(f"📉 Batched prompts: ~{batched_tokens} input tokens vs ~{per_question_tokens} per-question "
+          f"({len(batches) + len(missing)} calls instead of {len(form_data)}).")
+
+
+def generate_answers_rag_with_refresh(form_data, vector_store, top_k=3, context_refresh_interval=5,
+                                      concurrency=None, requests_per_minute=None, model=None, batched=None,
+                                      use_cache=None, on_answer=None, choice_fast_path=None, positions=None):
+    """Generates answers for each form question using Gemini RAG.
+
+    With `concurrency` > 1 the questions are sent to Gemini concurrently, paced by
+    `requests_per_minute`; answers keep the original question order. `model` can be
+    any object with a Gemini-style `generate_content`, e.g. a local fake. With
+    `batched`, several questions share one prompt and one deduplicated context.
+    Answers already in the answer cache (same question, options, model and
+    context) are reused without calling Gemini. With `choice_fast_path`, choice
+    questions whose best option clearly matches the retrieved context are
+    answered from embeddings alone. `on_answer(index, question)` is called as
+    soon as each answer is available, in completion order. `positions` are the
+    questions' indexes in the whole form when `form_data` is a subset of it.
+    """
+    model = model or configure_gemini().GenerativeModel(GEMINI_MODEL)
+    concurrency = concurrency or GENERATION_CONCURRENCY
+    requests_per_minute = requests_per_minute or REQUESTS_PER_MINUTE or None
+    batched = BATCHED_PROMPTS if batched is None else batched
+    use_cache = ANSWER_CACHE_ENABLED if use_cache is None else use_cache
+    choice_fast_path = CHOICE_FAST_PATH if choice_fast_path is None else choice_fast_path
+    model_name = getattr(model, "model_name", GEMINI_MODEL)
+
+    with telemetry.span("context_retrieval"):
+        contexts = build_question_contexts(
+            form_data, vector_store, top_k, context_refresh_interval, positions=positions
+        )
+    cache_keys = [
+        answer_key(q.get("question", ""), q.get("options", []), model_name, c["text"])
+        for q, c in zip(form_data, contexts)
+    ]
+
+    def _record(index, answer_text, failed_flag, source=None, cacheable=True):
+        q = form_data[index]
         q["answer"] = answer_text
-        q["answer_source"] = source
+        q["answer_source"] = source or contexts[index]["source"]
         q["failed"] = failed_flag
-
-        print(f"{'❌ Failed' if failed_flag else '✅ Success'} for Q{i}")
-        answered.append(q)
-
-    return answered
+        if use_cache and cacheable and not failed_flag:
+            try:
+                answer_cache.put(cache_keys[index], answer_text)
+            except Exception as e:
+                print(f"⚠️  Could not cache answer for Q{index + 1}: {e}")
+        print(f"{'❌ Failed' if failed_flag else '✅ Success'} for Q{index + 1}")
+        if on_answer:
+            on_answer(index, q)
+
+    pending = list(range(len(form_data)))
+    if use_cache:
+        pending = []
+        for index, key in enumerate(cache_keys):
+            try:
+                cached = answer_cache.get(key)
+            except Exception as e:
+                print(f"⚠️  Answer cache lookup failed for Q{index + 1}: {e}")
+                cached = None
+            telemetry.count("answer_cache_lookups", result="hit" if cached is not None else "miss")
+            if cached is None:
+                pending.append(index)
+                continue
+            q = form_data[index]
+            q["answer"] = cached
+            q["answer_source"] = contexts[index]["source"]
+            q["failed"] = False
+            print(f"♻️  Cached answer for Q{index + 1}")
+            if on_answer:
+                on_answer(index, q)
+        print(f"🔹 Answer cache: {len(form_data) - len(pending)} hit(s), {len(pending)} to generate ({answer_cache.stats()}).")
+
+    if choice_fast_path and pending and vector_store is not None:
+        resolver = ChoiceResolver(vector_store.embeddings)
+        try:
+            with telemetry.span("choice_fast_path"):
+                resolved = resolver.resolve([form_data[i] for i in pending], [contexts[i] for i in pending])
+        except Exception as e:
+            print(f"⚠️  Choice fast path skipped: {e}")
+            resolved = {}
+        for j, answer in resolved.items():
+            # Not cached: the cache holds model answers, keyed by model name.
+            _record(pending[j], answer, False, source="from context (option match)", cacheable=False)
+        telemetry.count("llm_calls_avoided", len(resolved), reason="choice_fast_path")
+        if resolver.attempted:
+            print(f"🔹 Choice fast path: {len(resolved)} of {resolver.attempted} choice question(s) answered "
+                  f"without Gemini ({len(resolved)} LLM call(s) avoided).")
+        pending = [i for j, i in enumerate(pending) if j not in resolved]
+
+    questions = [form_data[i] for i in pending]
+    question_contexts = [contexts[i] for i in pending]
+
+    def _record_pending(j, answer_text, failed_flag):
+        _record(pending[j], answer_text, failed_flag)
+
+    if batched and len(questions) > 1:
+        _generate_batched(questions, question_contexts, model, concurrency, requests_per_minute, _record_pending)
+    elif questions:
+        prompts = [
+            build_prompt(q.get("question", ""), q.get("options", []), c["text"])
+            for q, c in zip(questions, question_contexts)
+        ]
+        if concurrency > 1 and len(prompts) > 1:
+            print(f"🔹 Generating {len(prompts)} answers with concurrency {concurrency}...")
+        _generate_prompts(model, prompts, concurrency, requests_per_minute, _record_pending)
+
+    return list(form_data)
 
 # --------------------------------------------------------------------------
 # Safe Question Extraction
@@ -199,24 +591,79 @@ def safe_extract_questions(form_url):
 # --------------------------------------------------------------------------
 # Full Pipeline
 # --------------------------------------------------------------------------
-def rag_pipeline_with_refresh(form_url, doc_paths, top_k=3, context_refresh_interval=5):
-    """Main RAG pipeline with full fault tolerance."""
-    print("🔹 Extracting questions from Google Form...")
-    questions = safe_extract_questions(form_url)
-    print(f"✅ Extracted {len(questions)} questions (including failed placeholders if any).")
-
-    docs = load_documents(doc_paths)
-    vector_store = create_vector_store(docs)
-
-    print("🔹 Generating answers using RAG...")
-    filled_form = generate_answers_rag_with_refresh(
-        questions,
-        vector_store,
-        top_k=top_k,
-        context_refresh_interval=context_refresh_interval,
-    )
-
-    return filled_form
+def prepare_vector_store(doc_paths, collection=None):
+    """Indexes the documents: incrementally into `collection` if given, else through the content cache."""
+    if collection:
+        return sync_vector_store(collection, doc_paths)
+    return build_vector_store(doc_paths)
+
+
+@telemetry.run_scope("rag_pipeline")
+def rag_pipeline_with_refresh(form_url, doc_paths, top_k=3, context_refresh_interval=5, collection=None,
+                              resume=None, run_id=None, on_questions=None, on_answer=None):
+    """Main RAG pipeline with full fault tolerance.
+
+    Pass `collection` to keep a named index that is updated incrementally as the document set changes.
+    With `resume` (on by default), questions and answers are checkpointed as they are produced and a
+    re-run of the same form and documents only asks the questions that are missing or failed.
+    `on_questions(questions)` and `on_answer(index, question)` report progress as it happens.
+    """
+    resume = CHECKPOINTS_ENABLED if resume is None else resume
+    checkpoint = RunCheckpoint(run_id or run_id_for(form_url, doc_paths)) if resume else None
+
+    if checkpoint and checkpoint.questions:
+        questions = [dict(q) for q in checkpoint.questions]
+        print(f"♻️  Resuming run {checkpoint.run_id}: {len(questions)} questions from checkpoint.")
+    else:
+        print("🔹 Extracting questions from Google Form...")
+        with telemetry.span("question_extraction"):
+            questions = safe_extract_questions(form_url)
+        print(f"✅ Extracted {len(questions)} questions (including failed placeholders if any).")
+        fetch_failed = len(questions) == 1 and questions[0].get("failed")
+        if checkpoint and not fetch_failed:
+            checkpoint.save_questions(form_url, questions)
+    if on_questions:
+        on_questions(questions)
+
+    pending = list(range(len(questions)))
+    if checkpoint:
+        pending = []
+        for index, q in enumerate(questions):
+            if checkpoint.completed(index):
+                record = checkpoint.answers[index]
+                q.update(answer=record["answer"], answer_source=record["answer_source"], failed=False)
+                if on_answer:
+                    on_answer(index, q)
+            else:
+                pending.append(index)
+        if len(pending) < len(questions):
+            print(f"♻️  {len(questions) - len(pending)} answer(s) restored, {len(pending)} left to generate.")
+
+    if pending:
+        with telemetry.span("document_indexing"):
+            vector_store = prepare_vector_store(doc_paths, collection)
+
+        def _answered(j, q):
+            if checkpoint:
+                checkpoint.save_answer(pending[j], q)
+            if on_answer:
+                on_answer(pending[j], q)
+
+        print("🔹 Generating answers using RAG...")
+        with telemetry.span("answer_generation"):
+            generate_answers_rag_with_refresh(
+                [questions[i] for i in pending],
+                vector_store,
+                top_k=top_k,
+                context_refresh_interval=context_refresh_interval,
+                on_answer=_answered,
+                positions=pending,
+            )
+
+    if checkpoint and questions and not any(q.get("failed") for q in questions):
+        checkpoint.discard()
+
+    return questions
 
 
 
@@ -1,10 +1,16 @@
 import os
+import time
+import uuid
 import streamlit as st
+from streamlit import runtime
 from pathlib import Path
-from answer_retrever import rag_pipeline_with_refresh
-from form_filler import fill_google_form
 import shutil
 
+import startup
+
+# Heavy modules (answer_retrever, form_filler, streaming_pipeline) are imported
+# on first use or by the warm-up at the bottom, so first paint doesn't wait on them.
+
 # Set page configuration
 st.set_page_config(
     page_title="Google Form Auto-Filler",
@@ -12,6 +18,10 @@ st.set_page_config(
     layout="centered"
 )
 
+# Each browser session keeps its own incrementally updated document index.
+if "collection_id" not in st.session_state:
+    st.session_state.collection_id = uuid.uuid4().hex
+
 # --- App Title ---
 st.title("🧠 Google Form Auto-Filler")
 st.write("""
@@ -26,26 +36,12 @@ uploaded_files = st.file_uploader(
     accept_multiple_files=True
 )
 
-# --- Save Uploaded Files Temporarily ---
-uploaded_file_paths = []
-save_dir = Path("uploaded_docs")
-
+# --- Show Uploaded Files ---
+# Files are written to disk only when a run starts, into a folder owned by that run.
 if uploaded_files:
-    save_dir.mkdir(exist_ok=True)
-
-    st.info("💾 Saving uploaded files...")
+    st.success("✅ Files ready to use:")
     for uploaded_file in uploaded_files:
-        file_path = save_dir / uploaded_file.name
-        with open(file_path, "wb") as f:
-            f.write(uploaded_file.read())
-        uploaded_file_paths.append(str(file_path))
-
-# --- Show Uploaded Files ---
-if uploaded_file_paths:
-    st.success("✅ Uploaded files saved successfully!")
-    st.write("**Uploaded File Paths:**")
-    for path in uploaded_file_paths:
-        st.code(path, language="bash")
+        st.code(uploaded_file.name, language="bash")
 else:
     st.warning("No files uploaded yet — the model will rely on common knowledge.")
 
@@ -53,47 +49,142 @@ else:
 st.header("🔗 Enter Google Form Link")
 form_url = st.text_input("Paste your Google Form URL here:")
 
+fill_mode = st.radio(
+    "How should the form be filled?",
+    ["Open in browser (review before submitting)", "Submit directly (no browser)", "Prepare payload only (dry run)"],
+)
+stream_fill = st.checkbox(
+    "Start filling the browser while answers are still being generated",
+    disabled=not fill_mode.startswith("Open in browser"),
+)
+
+
+def _review_message(left_open):
+    if left_open:
+        return "🎉 Process complete! The browser window has been left open for your review."
+    return ("⚠️ The form was filled in a headless browser on the server, which can't be shown for review. "
+            "Use \"Submit directly\" or \"Prepare payload only\" to send these answers.")
+
+
+def _run_form_job(job, form_url, doc_paths, fill_mode, streaming, collection, upload_dir):
+    """Runs in a job worker thread: answers the form, fills or submits it, and reports progress on `job`."""
+    try:
+        job.set_stage("generating answers")
+        if streaming:
+            from streaming_pipeline import run_streaming_pipeline
+            filled_form_data, timing = run_streaming_pipeline(
+                form_url,
+                doc_paths,
+                top_k=3,
+                context_refresh_interval=5,
+                collection=collection,
+                use_pool=False,
+                on_answer=job.record_answer,
+                on_questions=job.set_questions,
+            )
+            job.log(
+                f"🎉 Form filled while answers were generated in {timing['wall']:.1f}s "
+                f"(stages would take {timing['sum_of_stages']:.1f}s back to back)."
+            )
+            from form_filler import browser_is_visible
+            job.log(_review_message(browser_is_visible()))
+            return {"mode": "streamed"}
+
+        from answer_retrever import rag_pipeline_with_refresh
+        filled_form_data = rag_pipeline_with_refresh(
+            form_url,
+            doc_paths,
+            top_k=3,
+            context_refresh_interval=5,
+            collection=collection,
+            on_questions=job.set_questions,
+            on_answer=job.record_answer,
+        )
+
+        if fill_mode.startswith("Open in browser"):
+            job.set_stage("filling the form in the browser")
+            from form_filler import fill_google_form
+            # Not pooled: a pooled browser is reset when handed back, discarding the filled form.
+            left_open = fill_google_form(form_url, filled_form_data, use_pool=False)
+            job.log(_review_message(left_open))
+            return {"mode": "browser"}
+
+        job.set_stage("submitting")
+        dry_run = fill_mode.startswith("Prepare payload")
+        from http_submitter import submit_google_form
+        result = submit_google_form(form_url, filled_form_data, dry_run=dry_run, output_path=None)
+        return {"mode": "dry-run" if dry_run else "http", **result}
+    finally:
+        # --- Delete uploaded files safely ---
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+
 # --- Run Button ---
 if st.button("🚀 Run Auto-Filler"):
     if not form_url:
         st.error("Please enter a valid Google Form link.")
     else:
-        st.write("### 🚀 Starting the Google Form Auto-Filler Process...")
-        st.write(f"📄 Using document(s): {', '.join(uploaded_file_paths) if uploaded_file_paths else 'None'}")
+        from job_runner import JobRejected, get_job_runner
+
+        upload_dir = Path("uploaded_docs") / f"{st.session_state.collection_id}-{uuid.uuid4().hex[:8]}"
+        uploaded_file_paths = []
+        if uploaded_files:
+            upload_dir.mkdir(parents=True, exist_ok=True)
+            for uploaded_file in uploaded_files:
+                file_path = upload_dir / uploaded_file.name
+                with open(file_path, "wb") as f:
+                    f.write(uploaded_file.getvalue())
+                uploaded_file_paths.append(str(file_path))
 
         try:
-            with st.spinner("🧠 Generating answers from documents... Please wait..."):
-                filled_form_data = rag_pipeline_with_refresh(
-                    form_url,
-                    uploaded_file_paths,
-                    top_k=3,
-                    context_refresh_interval=5
-                )
-
-            st.success("✅ Answers generated successfully!")
+            job = get_job_runner().submit(
+                st.session_state.collection_id,
+                _run_form_job,
+                form_url,
+                uploaded_file_paths,
+                fill_mode,
+                stream_fill and fill_mode.startswith("Open in browser"),
+                st.session_state.collection_id,
+                upload_dir,
+            )
+            st.session_state.job_id = job.id
+        except JobRejected as e:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            st.error(f"⏳ {e}")
+
+# --- Run Progress ---
+job_active = False
+if st.session_state.get("job_id"):
+    from job_runner import get_job_runner
+
+    job = get_job_runner().get(st.session_state.job_id)
+    if job is not None:
+        state = job.snapshot()
+        job_active = job.active
+        st.write(f"### 🚀 Run {state['id']}: {state['stage']} ({state['elapsed']:.0f}s)")
+        if state["total"]:
+            st.progress(state["answered"] / state["total"], text=f"{state['answered']} of {state['total']} answered")
+
+        for answer in state["answers"]:
+            st.markdown(f"**❓ Question:** {answer['question']}")
+            st.markdown(f"**{'❌' if answer['failed'] else '✔️'} Answer:** {answer['answer'] or 'No answer found'}")
             st.write("---")
-            for q in filled_form_data:
-                st.markdown(f"**❓ Question:** {q['question']}")
-                st.markdown(f"**✔️ Answer:** {q.get('answer', 'No answer found')}")
-                st.write("---")
 
-            st.info("🤖 Launching browser to auto-fill the form...")
-            fill_google_form(form_url, filled_form_data)
-
-            st.success("🎉 Process complete! The browser window has been left open for your review.")
-
-        except Exception as e:
-            st.error(f"❌ An error occurred: {e}")
-
-        finally:
-            # --- Delete uploaded files safely ---
-            if save_dir.exists():
-                try:
-                    shutil.rmtree(save_dir)
-                    # st.info("🧹 Temporary uploaded files deleted successfully.")
-                except Exception as cleanup_error:
-                    # st.warning(f"⚠️ Could not delete uploaded files: {cleanup_error}")
-                    pass
+        for message in state["messages"]:
+            st.success(message)
+
+        result = state["result"] or {}
+        if state["status"] == "failed":
+            st.error(f"❌ An error occurred: {state['error']}")
+        elif result.get("mode") in ("http", "dry-run"):
+            for question_text, reason in result["skipped"]:
+                st.warning(f"⏩ Skipped '{question_text}' ({reason}).")
+            if result["mode"] == "dry-run":
+                st.json({"url": result["url"], "payload": result["payload"]})
+            elif result["ok"]:
+                st.success(f"🎉 Form submitted directly with {result['answered']} answer(s)!")
+            else:
+                st.error(f"❌ Submission failed with HTTP {result['status_code']}.")
 
 # --- Footer ---
 st.markdown("""
@@ -101,3 +192,37 @@ st.markdown("""
 **Developed by:** Avula Puneeth Kumar Reddy  
 🔹 *GoogleFormFiller Project*  
 """)
+
+startup.mark("first page rendered")
+
+
+def _warm_answering():
+    import answer_retrever
+    answer_retrever.configure_gemini()
+    # answer_retrever defers these; load them here so the first run doesn't pay for them.
+    import incremental_index
+    import ingestion
+
+
+def _warm_embeddings():
+    from embedding_registry import prewarm_embeddings
+    prewarm_embeddings()
+
+
+def _warm_browser():
+    # Import only: app runs never lease from the driver pool, so there is nothing to prewarm.
+    import form_filler
+
+
+# Runs once per server process, after the page above has been sent to the browser.
+if runtime.exists():
+    startup.start_background_warmup([
+        ("answering stack imported", _warm_answering),
+        ("embedding model loaded", _warm_embeddings),
+        ("browser stack imported", _warm_browser),
+    ])
+
+# While a run is in progress, re-render every second to stream its answers.
+if job_active:
+    time.sleep(1)
+    st.rerun()
@@ -0,0 +1,121 @@
+import re
+import json
+
+
+# --------------------------------------------------------------------------
+# Multi-question Prompts
+# --------------------------------------------------------------------------
+_BATCH_TEMPLATE = """
+You are an intelligent assistant filling a Google Form.
+
+Context passages (shared by the questions below):
+{context}
+
+Questions:
+{questions}
+CRITICAL: If you could not answer a question using the context or general knowledge then answer "{placeholder}". Never invent personal data.
+For questions with options, the answer must be one of the listed options, copied exactly.
+
+Return ONLY a JSON array with one object per question, like [{{"index": 1, "answer": "..."}}]. No explanation.
+"""
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token), good enough for budgeting prompts."""
+    return len(text) // 4 + 1
+
+
+def _question_block(number, question, context_ids):
+    options = question.get("options", [])
+    options_str = "; ".join(options) if options else "None"
+    refs = ", ".join(f"C{cid}" for cid in context_ids) if context_ids else "none"
+    return (
+        f"{number}. Question: {question.get('question', '')}\n"
+        f"   Options: {options_str}\n"
+        f"   Relevant context: {refs}\n"
+    )
+
+
+def plan_batches(questions, contexts, token_budget=6000, max_batch_size=10):
+    """Groups question indexes into batches whose estimated prompt size stays within `token_budget`.
+
+    A context chunk shared by several questions in a batch is only counted
+    (and later sent) once. A question that alone exceeds the budget still gets
+    a batch of its own.
+    """
+    batches = []
+    current, seen_chunks, used = [], set(), estimate_tokens(_BATCH_TEMPLATE)
+
+    for index, question in enumerate(questions):
+        chunks = contexts[index]["chunks"]
+        new_chunks = [c for c in chunks if c not in seen_chunks]
+        cost = estimate_tokens(_question_block(index + 1, question, range(len(chunks))))
+        cost += sum(estimate_tokens(c) for c in new_chunks)
+
+        if current and (used + cost > token_budget or len(current) >= max_batch_size):
+            batches.append(current)
+            current, seen_chunks, used = [], set(), estimate_tokens(_BATCH_TEMPLATE)
+            new_chunks = chunks
+            cost = estimate_tokens(_question_block(index + 1, question, range(len(chunks))))
+            cost += sum(estimate_tokens(c) for c in new_chunks)
+
+        current.append(index)
+        seen_chunks.update(new_chunks)
+        used += cost
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def build_batch_prompt(indexes, questions, contexts, placeholder):
+    """Builds one prompt for several questions with a deduplicated, numbered context section."""
+    chunk_ids = {}
+    question_blocks = []
+    for number, index in enumerate(indexes, start=1):
+        refs = []
+        for chunk in contexts[index]["chunks"]:
+            if chunk not in chunk_ids:
+                chunk_ids[chunk] = len(chunk_ids) + 1
+            refs.append(chunk_ids[chunk])
+        question_blocks.append(_question_block(number, questions[index], refs))
+
+    context = "\n\n".join(f"[C{cid}] {chunk}" for chunk, cid in chunk_ids.items())
+    return _BATCH_TEMPLATE.format(
+        context=context or "No relevant context found.",
+        questions="\n".join(question_blocks),
+        placeholder=placeholder,
+    )
+
+
+def parse_batch_answers(text, batch_size):
+    """Parses the model's JSON answer array into {position: answer} (1-based positions).
+
+    Tolerates code fences and surrounding prose. Entries that are missing,
+    out of range or empty are simply left out so the caller can retry them.
+    """
+    if not text:
+        return {}
+    cleaned = re.sub(r"^```(?:json)?|```$", "", text.strip(), flags=re.MULTILINE).strip()
+    start, end = cleaned.find("["), cleaned.rfind("]")
+    if start == -1 or end <= start:
+        return {}
+    try:
+        items = json.loads(cleaned[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+
+    answers = {}
+    for position, item in enumerate(items if isinstance(items, list) else [], start=1):
+        if isinstance(item, dict):
+            number, answer = item.get("index", position), item.get("answer")
+        else:
+            number, answer = position, item
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            continue
+        if not 1 <= number <= batch_size or answer in (None, "", []):
+            continue
+        answers[number] = answer if isinstance(answer, list) else str(answer).strip()
+    return answers
@@ -0,0 +1,281 @@
+import os
+import csv
+import copy
+import json
+import time
+import hashlib
+import argparse
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import faiss
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+from ann_index import is_flat_in_memory
+from answer_retrever import build_vector_store, generate_answers_rag_with_refresh
+from question_retrever import extract_questions_from_google_form
+from http_submitter import submit_google_form
+from index_cache import file_digest
+
+
+# --------------------------------------------------------------------------
+# Job Manifest
+# --------------------------------------------------------------------------
+def _job_id(form_url, documents):
+    payload = json.dumps({"form_url": form_url, "documents": sorted(documents)})
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def _split_documents_field(value):
+    return [part.strip() for part in str(value or "").replace("|", ";").split(";") if part.strip()]
+
+
+def read_manifest(path):
+    """Reads jobs from a JSONL or CSV manifest.
+
+    JSONL lines look like {"form_url": ..., "documents": [...], "id": optional}.
+    CSV needs a form_url column and a documents column with paths separated by
+    ';' or '|', plus an optional id column. Jobs without an id get a stable one
+    derived from the form URL and documents, so resumes match them up.
+    """
+    jobs = []
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = [
+                {"id": row.get("id"), "form_url": row.get("form_url"), "documents": _split_documents_field(row.get("documents"))}
+                for row in csv.DictReader(f)
+            ]
+    else:
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    seen = {}
+    for row in rows:
+        form_url = (row.get("form_url") or "").strip()
+        if not form_url:
+            print(f"⚠️  Skipping manifest row without form_url: {row}")
+            continue
+        documents = row.get("documents") or []
+        if isinstance(documents, str):
+            documents = _split_documents_field(documents)
+        job_id = str(row.get("id") or _job_id(form_url, documents))
+        # Repeated identical rows are separate jobs; number them so resumes still tell them apart.
+        seen[job_id] = seen.get(job_id, 0) + 1
+        if seen[job_id] > 1:
+            job_id = f"{job_id}-{seen[job_id]}"
+        jobs.append({
+            "id": job_id,
+            "form_url": form_url,
+            "documents": documents,
+        })
+    return jobs
+
+
+def completed_job_ids(output_path):
+    """Returns ids of jobs already finished successfully in a previous run's output file."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a run killed mid-write leaves a partial last line
+            if record.get("status") == "ok":
+                done.add(record.get("id"))
+    return done
+
+
+# --------------------------------------------------------------------------
+# Shared Work (each form fetched and each document indexed once)
+# --------------------------------------------------------------------------
+class _SingleFlight:
+    """Computes each key once, even when several jobs ask for it at the same time."""
+
+    def __init__(self):
+        self._results = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def get(self, key, compute):
+        with self._guard:
+            if key in self._results:
+                return self._results[key]
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            with self._guard:
+                if key in self._results:
+                    return self._results[key]
+            value = compute()
+            with self._guard:
+                self._results[key] = value
+            return value
+
+
+def _copy_store(store):
+    return FAISS(
+        embedding_function=store.embedding_function,
+        index=faiss.clone_index(store.index),
+        docstore=InMemoryDocstore(dict(store.docstore._dict)),
+        index_to_docstore_id=dict(store.index_to_docstore_id),
+    )
+
+
+class BatchResources:
+    """Per-batch memo of fetched forms and indexed documents shared by all jobs."""
+
+    def __init__(self):
+        self.forms = _SingleFlight()
+        self.documents = _SingleFlight()
+        self.document_sets = _SingleFlight()
+
+    def questions(self, form_url):
+        # Every job writes answers into its own copy of the question dicts.
+        return copy.deepcopy(self.forms.get(form_url, lambda: extract_questions_from_google_form(form_url)))
+
+    def vector_store(self, documents):
+        """Merges the per-document indexes, so a document shared by many jobs is embedded once."""
+        paths = sorted({os.path.abspath(p) for p in documents if os.path.exists(p)})
+        missing = [p for p in documents if not os.path.exists(p)]
+        for path in missing:
+            print(f"⚠️  Warning: File not found at {path}, skipping.")
+        if not paths:
+            return None
+
+        # Chunk ids come from file content, so copies of one file would collide when merged; index one of them.
+        by_digest = {}
+        for path in paths:
+            by_digest.setdefault(file_digest(path), path)
+        digests = sorted(by_digest)
+
+        def _merge():
+            stores = [self.documents.get(d, lambda p=by_digest[d]: build_vector_store([p])) for d in digests]
+            stores = [s for s in stores if s is not None]
+            if not stores:
+                return None
+            if len(stores) == 1:
+                return stores[0]
+            if not all(is_flat_in_memory(s) for s in stores):
+                # Separately trained ANN indexes can't be merged; index the set as one corpus.
+                return build_vector_store([by_digest[d] for d in digests])
+            merged = _copy_store(stores[0])
+            for store in stores[1:]:
+                merged.merge_from(store)
+            return merged
+
+        return self.document_sets.get(tuple(digests), _merge)
+
+
+# --------------------------------------------------------------------------
+# Batch Execution
+# --------------------------------------------------------------------------
+# A browser fill is left unsubmitted for review, which a batch can't do, so it isn't offered.
+FILL_MODES = ("dry-run", "http", "none")
+
+
+def run_job(job, resources, fill_mode="dry-run", top_k=3, context_refresh_interval=5, requests_per_minute=None):
+    """Answers (and optionally submits) one form. Returns the result record for the output file.
+
+    `fill_mode` is "http" (submit), "dry-run" (build the payload only) or "none".
+    """
+    start = time.perf_counter()
+    record = {"id": job["id"], "form_url": job["form_url"], "documents": job["documents"]}
+    try:
+        questions = resources.questions(job["form_url"])
+        vector_store = resources.vector_store(job["documents"])
+        answered = generate_answers_rag_with_refresh(
+            questions, vector_store, top_k=top_k, context_refresh_interval=context_refresh_interval,
+            requests_per_minute=requests_per_minute,
+        )
+        record["answers"] = [
+            {"question": q["question"], "answer": q.get("answer"), "failed": q.get("failed", False)}
+            for q in answered
+        ]
+        failed = sum(1 for a in record["answers"] if a["failed"])
+        record["failed_answers"] = failed
+
+        # Partial jobs are retried on resume, so they're only submitted once a retry answers everything.
+        if fill_mode == "dry-run" or (fill_mode == "http" and not failed):
+            submission = submit_google_form(job["form_url"], answered, dry_run=(fill_mode == "dry-run"), output_path=None)
+            record["submission"] = {k: v for k, v in submission.items() if k != "skipped"}
+            record["skipped"] = [{"question": q, "reason": r} for q, r in submission["skipped"]]
+            if fill_mode == "http" and not submission.get("ok"):
+                raise RuntimeError(f"Submission failed with HTTP {submission.get('status_code')}")
+
+        # Jobs with unanswered questions aren't "ok", so a resumed batch runs them again.
+        record["status"] = "partial" if failed else "ok"
+    except Exception as e:
+        record["status"] = "failed"
+        record["error"] = f"{type(e).__name__}: {e}"
+        traceback.print_exc()
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def run_batch(manifest_path, output_path, workers=4, fill_mode="dry-run", resume=True, top_k=3,
+              context_refresh_interval=5, requests_per_minute=None):
+    """Runs every job in the manifest through a bounded worker pool, appending results to `output_path`.
+
+    With `resume`, jobs already recorded as "ok" in `output_path` are skipped;
+    failed and partial (some answers failed, nothing submitted) jobs are
+    retried. `requests_per_minute` (default GFF_GEMINI_RPM) is one quota for
+    the whole batch: all workers draw from the same process-wide token bucket
+    and back off together when Gemini throttles.
+    """
+    if fill_mode not in FILL_MODES:
+        raise ValueError(f"Unknown fill mode {fill_mode!r}; expected one of {', '.join(FILL_MODES)}.")
+    jobs = read_manifest(manifest_path)
+    done = completed_job_ids(output_path) if resume else set()
+    pending = [job for job in jobs if job["id"] not in done]
+    print(f"🚀 Batch: {len(jobs)} job(s), {len(jobs) - len(pending)} already done, {len(pending)} to run "
+          f"with {workers} worker(s).")
+
+    resources = BatchResources()
+    write_lock = threading.Lock()
+    summary = {"ok": 0, "partial": 0, "failed": 0}
+
+    if not resume and os.path.exists(output_path):
+        os.remove(output_path)
+
+    def _run(job):
+        record = run_job(job, resources, fill_mode, top_k, context_refresh_interval, requests_per_minute)
+        with write_lock:
+            with open(output_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            summary[record["status"]] += 1
+        icon = {"ok": "✅", "partial": "⚠️ "}.get(record["status"], "❌")
+        print(f"{icon} Job {job['id']} finished in {record['seconds']:.1f}s ({record['status']}).")
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        list(pool.map(_run, pending))
+
+    print(f"\n🎉 Batch complete: {summary['ok']} ok, {summary['partial']} partial, {summary['failed']} failed. "
+          f"Results in {output_path}.")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill many Google Forms against many document sets.")
+    parser.add_argument("manifest", help="JSONL or CSV job manifest (form_url + documents per job).")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="JSONL file for per-job results.")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="Number of jobs to run at once.")
+    parser.add_argument("--fill-mode", choices=FILL_MODES, default="dry-run",
+                        help="How to fill each form once it is answered.")
+    parser.add_argument("--no-resume", action="store_true", help="Start over instead of skipping finished jobs.")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--rpm", type=float, default=None,
+                        help="Gemini requests per minute across all workers (default: GFF_GEMINI_RPM).")
+    args = parser.parse_args()
+
+    run_batch(
+        args.manifest,
+        args.output,
+        workers=args.workers,
+        fill_mode=args.fill_mode,
+        resume=not args.no_resume,
+        top_k=args.top_k,
+        requests_per_minute=args.rpm,
+    )
@@ -0,0 +1,320 @@
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+import telemetry
+from embedding_registry import registry
+from fakes import FakeEmbeddings, FakeFormServer, FakeGenerativeModel
+
+
+# Synthetic workloads, from a quick smoke run to a large upload.
+SCENARIOS = {
+    "small": {"questions": 10, "documents": 2, "pages": 10},
+    "medium": {"questions": 40, "documents": 5, "pages": 50},
+    "large": {"questions": 100, "documents": 10, "pages": 200},
+}
+WORDS_PER_PAGE = 400
+FAKE_EMBEDDING_MODEL = "fake-hashing-384"
+BASELINE_FILE = "benchmark_baseline.json"
+# Differences below these are noise, whatever the relative change.
+MIN_SECONDS_DELTA = 0.02
+MIN_MB_DELTA = 1.0
+ACCURACY_DROP = 0.02
+
+_SYLLABLES = ["ka", "lo", "mi", "ren", "sa", "tu", "vek", "zor", "bri", "del", "fen", "gra", "hol", "jin", "qua", "rix"]
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))] if ordered else 0.0
+
+
+# --------------------------------------------------------------------------
+# Synthetic Forms and Corpora
+# --------------------------------------------------------------------------
+def _word(rng, syllables=3):
+    return "".join(rng.choice(_SYLLABLES) for _ in range(syllables))
+
+
+def make_workload(questions, documents, pages, seed=0):
+    """Builds a form of `questions` mixed-type questions (types 0-4) and a corpus that answers them.
+
+    Each question asks for the reference code of a made-up topic; the matching
+    fact sentence is buried in one of the `documents` texts among
+    `pages` pages of filler each. Returns (form_questions, texts, expected).
+    """
+    rng = random.Random(seed)
+    facts = []
+    seen = set()
+    while len(facts) < questions:
+        topic = f"{_word(rng, 2)} {_word(rng, 3)} ledger"
+        if topic not in seen:
+            seen.add(topic)
+            facts.append((topic, f"{_word(rng, 2)}{rng.randint(100, 999)}"))
+    codes = [code for _, code in facts]
+
+    form_questions = []
+    for i, (topic, code) in enumerate(facts):
+        question_type = i % 5
+        question = {"question": f"What is the reference code of the {topic}?", "type": question_type}
+        if question_type in (2, 3, 4):
+            options = [code] + rng.sample([c for c in codes if c != code], min(3, len(codes) - 1))
+            rng.shuffle(options)
+            question["options"] = options
+        form_questions.append(question)
+
+    vocabulary = [_word(rng, rng.randint(1, 3)) for _ in range(2000)]
+    pages_text = [[] for _ in range(documents)]
+    for d in range(documents):
+        for _ in range(pages):
+            pages_text[d].append(" ".join(rng.choice(vocabulary) for _ in range(WORDS_PER_PAGE)))
+    for topic, code in facts:
+        page = pages_text[rng.randrange(documents)]
+        position = rng.randrange(len(page))
+        page[position] += f"\n\nThe reference code of the {topic} is {code}.\n\n"
+
+    texts = ["\n\n".join(p) for p in pages_text]
+    return form_questions, texts, codes
+
+
+def answer_from_prompt(prompt):
+    """Fake LLM behaviour: answers with the code that the prompt's context gives for the asked topic."""
+    question = re.search(r"Question: What is the reference code of the (.+?)\?", prompt)
+    if question:
+        fact = re.search(rf"reference code of the {re.escape(question.group(1))} is (\w+)", prompt)
+        if fact:
+            return fact.group(1)
+    return "DATA_NOT_FOUND"
+
+
+# --------------------------------------------------------------------------
+# Benchmark Run
+# --------------------------------------------------------------------------
+def _measure(stages, name, unit, fn, units):
+    """Runs `fn` and records its time and peak Python allocations; `units(result)` is the work it did."""
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] - base
+    stages.setdefault(name, {"unit": unit, "seconds": [], "peak_bytes": [], "units": units(result)})
+    stages[name]["seconds"].append(seconds)
+    stages[name]["peak_bytes"].append(max(0, peak))
+    return result
+
+
+def run_benchmark(scenario="small", repeat=3, llm_latency=0.05, llm_jitter=0.02, form_latency=0.01,
+                  concurrency=None, embedding_model=None, seed=0):
+    """Runs the real extraction, loading, indexing and generation code against local fakes.
+
+    Nothing leaves the machine: the form is served by FakeFormServer, answers
+    come from FakeGenerativeModel and, unless `embedding_model` names a real
+    model, chunks are embedded by FakeEmbeddings. Each stage is timed over
+    `repeat` runs; peak memory is what Python allocated during the stage
+    (tracemalloc), so native FAISS buffers are not included.
+    """
+    from answer_retrever import create_vector_store, generate_answers_rag_with_refresh, load_documents
+    from question_retrever import clear_form_cache, extract_questions_from_google_form
+
+    config = dict(SCENARIOS[scenario]) if isinstance(scenario, str) else dict(scenario)
+    form_questions, texts, expected = make_workload(seed=seed, **config)
+    if not embedding_model:
+        embedding_model = FAKE_EMBEDDING_MODEL
+        registry.register(FAKE_EMBEDDING_MODEL, FakeEmbeddings())
+
+    stages = {}
+    span_seconds = {}
+    accuracy = []
+    llm_calls = []
+    tracemalloc.start()
+    try:
+        with tempfile.TemporaryDirectory() as workdir, FakeFormServer(form_questions, latency=form_latency) as server:
+            paths = []
+            for i, text in enumerate(texts):
+                path = os.path.join(workdir, f"corpus_{i}.txt")
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(text)
+                paths.append(path)
+            corpus_mb = sum(len(t.encode("utf-8")) for t in texts) / 2**20
+
+            for _ in range(repeat):
+                model = FakeGenerativeModel(latency=llm_latency, jitter=llm_jitter, answer_fn=answer_from_prompt,
+                                            seed=seed)
+                with telemetry.run_scope("benchmark", summary=False) as run:
+                    clear_form_cache()
+                    questions = _measure(
+                        stages, "extract_questions", "questions",
+                        lambda: extract_questions_from_google_form(server.form_url), len,
+                    )
+                    docs = _measure(stages, "load_documents", "MB", lambda: load_documents(paths), lambda _: corpus_mb)
+                    vector_store = _measure(
+                        stages, "create_vector_store", "chunks",
+                        lambda: create_vector_store(docs, embedding_model=embedding_model), lambda vs: vs.index.ntotal,
+                    )
+                    answered = _measure(
+                        stages, "generate_answers", "questions",
+                        lambda: generate_answers_rag_with_refresh(
+                            questions, vector_store, model=model, use_cache=False, concurrency=concurrency
+                        ),
+                        len,
+                    )
+                del docs, vector_store
+
+                if run is not None:
+                    for span in run.spans:
+                        span_seconds.setdefault(span["name"], []).append(span["seconds"])
+                llm_calls.append(model.calls)
+                correct = sum(1 for q, code in zip(answered, expected) if code in str(q.get("answer")))
+                accuracy.append(correct / len(expected) if expected else 1.0)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "scenario": scenario if isinstance(scenario, str) else "custom",
+        "config": {**config, "repeat": repeat, "llm_latency": llm_latency, "llm_jitter": llm_jitter,
+                   "form_latency": form_latency, "concurrency": concurrency, "embedding_model": embedding_model},
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "stages": {
+            name: {
+                "p50_s": round(_percentile(s["seconds"], 0.5), 4),
+                "p95_s": round(_percentile(s["seconds"], 0.95), 4),
+                "throughput": round(s["units"] / _percentile(s["seconds"], 0.5), 2) if s["units"] else 0.0,
+                "unit": f"{s['unit']}/s",
+                "peak_mb": round(max(s["peak_bytes"]) / 2**20, 2),
+            }
+            for name, s in stages.items()
+        },
+        "spans": {
+            name: {"count": len(v), "p50_s": round(_percentile(v, 0.5), 4), "p95_s": round(_percentile(v, 0.95), 4)}
+            for name, v in sorted(span_seconds.items())
+        },
+        "accuracy": round(min(accuracy), 4),
+        "llm_calls": max(llm_calls),
+        "max_rss_mb": _max_rss_mb(),
+    }
+
+
+def _max_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+# --------------------------------------------------------------------------
+# Reporting and Baselines
+# --------------------------------------------------------------------------
+def print_results(result):
+    print(f"\n📊 Benchmark '{result['scenario']}' ({result['config']['repeat']} run(s)):")
+    print(f"  {'stage':<22} {'p50 s':>8} {'p95 s':>8} {'throughput':>20} {'peak MB':>9}")
+    for name, s in result["stages"].items():
+        print(f"  {name:<22} {s['p50_s']:>8.3f} {s['p95_s']:>8.3f} {s['throughput']:>10.1f} {s['unit']:<9} "
+              f"{s['peak_mb']:>9.1f}")
+    for name in ("gemini_call", "generate_answer", "embed_chunks", "embed_queries", "faiss_search", "bm25_search"):
+        if name in result["spans"]:
+            s = result["spans"][name]
+            print(f"  · {name:<20} p50 {s['p50_s'] * 1000:7.1f} ms  p95 {s['p95_s'] * 1000:7.1f} ms  ({s['count']} spans)")
+    print(f"  accuracy {result['accuracy']:.0%}, {result['llm_calls']} LLM call(s) per run, "
+          f"max RSS {result['max_rss_mb']} MB")
+
+
+def compare_to_baseline(result, baseline, tolerance=0.2):
+    """Returns the regressions of `result` against `baseline`: slower or bigger stages, or lower accuracy."""
+    regressions = []
+    for name, current in result["stages"].items():
+        previous = baseline.get("stages", {}).get(name)
+        if not previous:
+            continue
+        for metric, floor in (("p50_s", MIN_SECONDS_DELTA), ("p95_s", MIN_SECONDS_DELTA), ("peak_mb", MIN_MB_DELTA)):
+            before, now = previous.get(metric, 0.0), current[metric]
+            if now > before * (1 + tolerance) and now - before > floor:
+                regressions.append(f"{name} {metric}: {before} → {now} (+{(now / before - 1) if before else 1:.0%})")
+    if result["accuracy"] < baseline.get("accuracy", 0.0) - ACCURACY_DROP:
+        regressions.append(f"accuracy: {baseline['accuracy']} → {result['accuracy']}")
+    if result["llm_calls"] > baseline.get("llm_calls", result["llm_calls"]):
+        regressions.append(f"llm_calls: {baseline['llm_calls']} → {result['llm_calls']}")
+    return regressions
+
+
+def print_comparison(result, baseline):
+    print("\n📈 Against baseline:")
+    for name, current in result["stages"].items():
+        previous = baseline.get("stages", {}).get(name)
+        if previous:
+            delta = (current["p50_s"] / previous["p50_s"] - 1) if previous["p50_s"] else 0.0
+            print(f"  {name:<22} p50 {previous['p50_s']:.3f}s → {current['p50_s']:.3f}s ({delta:+.0%}), "
+                  f"peak {previous['peak_mb']:.1f} → {current['peak_mb']:.1f} MB")
+
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(path, result):
+    baselines = load_baselines(path)
+    baselines[result["scenario"]] = result
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baselines, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline offline against fake Google services.")
+    parser.add_argument("scenario", nargs="?", choices=sorted(SCENARIOS), default="small")
+    parser.add_argument("-n", "--repeat", type=int, default=3, help="Runs per stage for the p50/p95 figures.")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per fake Gemini call.")
+    parser.add_argument("--llm-jitter", type=float, default=0.02)
+    parser.add_argument("--form-latency", type=float, default=0.01, help="Seconds per fake form request.")
+    parser.add_argument("--concurrency", type=int, default=None, help="Gemini concurrency (default: GFF setting).")
+    parser.add_argument("--embedding-model", default=None,
+                        help="Benchmark a real embedding model instead of the offline hashing fake.")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="JSON file of stored baselines, one per scenario.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the scenario's baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown/growth before failing.")
+    parser.add_argument("-o", "--output", default=None, help="Also write this run's results to a JSON file.")
+    args = parser.parse_args()
+
+    result = run_benchmark(
+        args.scenario,
+        repeat=args.repeat,
+        llm_latency=args.llm_latency,
+        llm_jitter=args.llm_jitter,
+        form_latency=args.form_latency,
+        concurrency=args.concurrency,
+        embedding_model=args.embedding_model,
+    )
+    print_results(result)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, result)
+        print(f"\n💾 Saved as the '{args.scenario}' baseline in {args.baseline}.")
+        sys.exit(0)
+
+    baseline = load_baselines(args.baseline).get(args.scenario)
+    if baseline is None:
+        print(f"\nℹ️  No '{args.scenario}' baseline in {args.baseline}; run with --save-baseline to store one.")
+        sys.exit(0)
+    if baseline.get("config") != result["config"]:
+        print("⚠️  Baseline was recorded with different settings; the comparison may not be like for like.")
+    print_comparison(result, baseline)
+    regressions = compare_to_baseline(result, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"❌ Regression: {regression}")
+    if not regressions:
+        print("✅ No regressions against the baseline.")
+    sys.exit(1 if regressions else 0)
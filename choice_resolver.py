@@ -0,0 +1,112 @@
+import os
+
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+# Choice questions whose best option is this similar to the context, and this far
+# ahead of the runner-up, are answered without the LLM. Off by default: the
+# thresholds depend on the embedding model, so calibrate them on your forms from
+# the score/margin log lines before turning it on.
+CHOICE_FAST_PATH = os.getenv("GFF_CHOICE_FAST_PATH", "0").lower() in ("1", "true", "yes")
+CHOICE_MIN_SIMILARITY = float(os.getenv("GFF_CHOICE_MIN_SIMILARITY", "0.8"))
+CHOICE_MIN_MARGIN = float(os.getenv("GFF_CHOICE_MIN_MARGIN", "0.08"))
+
+MULTIPLE_CHOICE, CHECKBOX, DROPDOWN = 2, 3, 4
+CHOICE_TYPES = (MULTIPLE_CHOICE, CHECKBOX, DROPDOWN)
+
+
+def _normalize_rows(matrix):
+    import numpy as np
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+# --------------------------------------------------------------------------
+# Embedding-based Choice Resolution
+# --------------------------------------------------------------------------
+class ChoiceResolver:
+    """Answers multiple choice, checkbox and dropdown questions without calling the LLM.
+
+    Each option is embedded as "<question> <option>" and scored by its best
+    cosine similarity to the question's retrieved chunks. A single-answer
+    question is resolved when the top option scores at least `min_similarity`
+    and beats the runner-up by `min_margin`. A checkbox question is resolved
+    when every option is clearly above or clearly below `min_similarity`.
+    Anything else is left for the LLM. Answers are always copied from the
+    option list, so they match the form's data-value attributes exactly.
+    """
+
+    def __init__(self, embeddings, min_similarity=CHOICE_MIN_SIMILARITY, min_margin=CHOICE_MIN_MARGIN):
+        self.embeddings = embeddings
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.attempted = 0
+        self.resolved = 0
+
+    def resolve(self, questions, contexts):
+        """Returns {position: answer} for the questions confident enough to skip the LLM."""
+        candidates = [
+            i for i, q in enumerate(questions)
+            if q.get("type") in CHOICE_TYPES and q.get("options") and contexts[i]["chunks"]
+        ]
+        if not candidates:
+            return {}
+
+        texts = []
+        spans = {}
+        for i in candidates:
+            q = questions[i]
+            start = len(texts)
+            texts.extend(f"{q.get('question', '')} {opt}" for opt in q["options"])
+            texts.extend(contexts[i]["chunks"])
+            spans[i] = (start, len(q["options"]), len(contexts[i]["chunks"]))
+
+        import numpy as np
+
+        # One batched forward pass for every option and chunk involved.
+        vectors = _normalize_rows(np.array(self.embeddings.embed_documents(texts), dtype=np.float32))
+
+        answers = {}
+        for i in candidates:
+            start, n_options, n_chunks = spans[i]
+            option_vecs = vectors[start:start + n_options]
+            chunk_vecs = vectors[start + n_options:start + n_options + n_chunks]
+            scores = (option_vecs @ chunk_vecs.T).max(axis=1)
+            answer, top, margin = self._pick(questions[i], scores)
+            self.attempted += 1
+            print(f"🔹 Choice fast path '{questions[i].get('question', '')[:60]}': best score {top:.3f}, "
+                  f"margin {margin:.3f} → {'answered ' + repr(answer) if answer is not None else 'left to Gemini'}")
+            if answer is not None:
+                answers[i] = answer
+                self.resolved += 1
+        return answers
+
+    def _pick(self, question, scores):
+        """Returns (answer or None, best score, margin over the runner-up)."""
+        options = question["options"]
+        order = (-scores).argsort()
+        top = float(scores[order[0]])
+        runner_up = float(scores[order[1]]) if len(order) > 1 else -1.0
+        margin = top - runner_up
+
+        if question.get("type") == CHECKBOX:
+            chosen = [options[j] for j in range(len(options)) if scores[j] >= self.min_similarity]
+            ambiguous = any(
+                self.min_similarity - self.min_margin < scores[j] < self.min_similarity for j in range(len(options))
+            )
+            return (chosen if chosen and not ambiguous else None), top, margin
+
+        if top >= self.min_similarity and margin >= self.min_margin:
+            return options[order[0]], top, margin
+        return None, top, margin
+
+    def stats(self):
+        return {
+            "attempted": self.attempted,
+            "resolved": self.resolved,
+            "llm_calls_avoided": self.resolved,
+        }
+
@@ -0,0 +1,202 @@
+import os
+import re
+import threading
+
+from dotenv import load_dotenv
+
+from batch_prompts import estimate_tokens
+
+
+load_dotenv()
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("GFF_CONTEXT_TOKEN_BUDGET", "1000"))
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("GFF_NEAR_DUPLICATE_THRESHOLD", "0.8"))
+# Overlaps shorter than this are treated as coincidence, not a shared chunk boundary.
+MIN_TEXT_OVERLAP = 20
+# Splitter overlaps are at most chunk_overlap (100 by default); longer ones aren't searched for.
+MAX_TEXT_OVERLAP = 400
+# Chunks this close count as adjacent (the splitter strips the separator between them).
+MAX_ADJACENT_GAP = 2
+
+
+def _location(doc):
+    metadata = getattr(doc, "metadata", None) or {}
+    return metadata.get("source"), metadata.get("page")
+
+
+def _start(doc):
+    metadata = getattr(doc, "metadata", None) or {}
+    return metadata.get("start_index")
+
+
+def _text_overlap(left, right):
+    """Length of the longest suffix of `left` that is a prefix of `right` (0 if shorter than MIN_TEXT_OVERLAP)."""
+    longest = min(len(left), len(right), MAX_TEXT_OVERLAP)
+    for size in range(longest, MIN_TEXT_OVERLAP - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _join(left, right):
+    """Joins two chunks of the same document if they overlap or touch, else returns None."""
+    if _location(left["doc"]) != _location(right["doc"]):
+        return None
+    left_start, right_start = left["start"], right["start"]
+    if left_start is not None and right_start is not None:
+        if right_start < left_start:
+            left, right = right, left
+            left_start, right_start = right_start, left_start
+        left_end = left_start + len(left["text"])
+        if right_start > left_end + MAX_ADJACENT_GAP:
+            return None
+        if right_start > left_end:
+            text = left["text"] + "\n" + right["text"]  # the splitter dropped the separator between them
+        else:
+            text = left["text"] + right["text"][left_end - right_start:]  # empty slice if right lies inside left
+        return {**left, "text": text, "rank": min(left["rank"], right["rank"])}
+
+    for first, second in ((left, right), (right, left)):
+        if second["text"] in first["text"]:
+            return {**first, "rank": min(first["rank"], second["rank"])}
+        overlap = _text_overlap(first["text"], second["text"])
+        if overlap:
+            return {**first, "text": first["text"] + second["text"][overlap:], "rank": min(first["rank"], second["rank"])}
+    return None
+
+
+def merge_chunks(docs):
+    """Merges overlapping or adjacent chunks of the same document. `docs` are in rank order."""
+    passages = [
+        {"doc": doc, "text": doc.page_content, "rank": rank, "start": _start(doc)}
+        for rank, doc in enumerate(docs)
+    ]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(passages)):
+            for j in range(i + 1, len(passages)):
+                joined = _join(passages[i], passages[j])
+                if joined is not None:
+                    passages[i] = joined
+                    del passages[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return sorted(passages, key=lambda p: p["rank"])
+
+
+def _shingles(text, size=3):
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def drop_near_duplicates(passages, threshold=NEAR_DUPLICATE_THRESHOLD):
+    """Drops passages whose word shingles mostly repeat a higher-ranked passage (e.g. a repeated letterhead)."""
+    kept = []
+    kept_shingles = []
+    for passage in passages:
+        shingles = _shingles(passage["text"])
+        duplicate = False
+        for other in kept_shingles:
+            if not shingles or not other:
+                continue
+            # Containment rather than Jaccard, so a short passage inside a longer one counts.
+            if len(shingles & other) / min(len(shingles), len(other)) >= threshold:
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append(passage)
+            kept_shingles.append(shingles)
+    return kept
+
+
+def trim_to_budget(passages, token_budget=CONTEXT_TOKEN_BUDGET):
+    """Keeps passages in rank order until `token_budget` is spent; the last one is cut at a sentence or word boundary."""
+    if not token_budget:
+        return [p["text"] for p in passages]
+    texts = []
+    used = 0
+    for passage in passages:
+        text = passage["text"]
+        cost = estimate_tokens(text)
+        if used + cost <= token_budget:
+            texts.append(text)
+            used += cost
+            continue
+        remaining_chars = (token_budget - used) * 4
+        if remaining_chars >= 200:
+            cut = text[:remaining_chars]
+            boundary = max(cut.rfind(". "), cut.rfind("\n"))
+            if boundary < len(cut) // 2:
+                boundary = cut.rfind(" ")
+            texts.append(cut[:boundary + 1].rstrip() if boundary > 0 else cut)
+        break
+    return texts
+
+
+# --------------------------------------------------------------------------
+# Context Assembly
+# --------------------------------------------------------------------------
+class ContextAssembler:
+    """Turns retrieved chunks into the context passages of one question's prompt.
+
+    Overlapping and adjacent chunks are merged, near-duplicates dropped, and the
+    rest kept in retrieval rank order up to `token_budget` tokens. Token counts
+    before and after are tallied so the savings can be reported per run.
+    """
+
+    def __init__(self, token_budget=CONTEXT_TOKEN_BUDGET, duplicate_threshold=NEAR_DUPLICATE_THRESHOLD):
+        self.token_budget = token_budget
+        self.duplicate_threshold = duplicate_threshold
+        self.raw_tokens = 0
+        self.assembled_tokens = 0
+        self.questions = 0
+        self._lock = threading.Lock()
+
+    def assemble(self, docs, baseline=None, token_budget=None):
+        """Returns the passages (strings) to put in the prompt for these rank-ordered documents.
+
+        `baseline` is what would have been sent verbatim without assembly
+        (defaults to `docs`); it is only used for the savings tally.
+        `token_budget` tightens the assembler's budget for this one call.
+        """
+        if not docs:
+            return []
+        budget = self.token_budget
+        if token_budget is not None:
+            budget = min(budget, token_budget) if budget else token_budget
+        passages = drop_near_duplicates(merge_chunks(docs), self.duplicate_threshold)
+        texts = trim_to_budget(passages, budget)
+        baseline = docs if baseline is None else baseline
+        with self._lock:
+            self.questions += 1
+            self.raw_tokens += estimate_tokens("\n\n".join(doc.page_content for doc in baseline))
+            self.assembled_tokens += estimate_tokens("\n\n".join(texts))
+        return texts
+
+    def stats(self):
+        with self._lock:
+            saved = self.raw_tokens - self.assembled_tokens
+            return {
+                "questions": self.questions,
+                "raw_tokens": self.raw_tokens,
+                "assembled_tokens": self.assembled_tokens,
+                "tokens_saved": saved,
+                "saved_ratio": round(saved / self.raw_tokens, 3) if self.raw_tokens else 0.0,
+            }
+
+    def report(self):
+        stats = self.stats()
+        if stats["questions"] and stats["tokens_saved"] < 0:
+            print(f"⚠️  Context assembly: {stats['raw_tokens']} → {stats['assembled_tokens']} prompt tokens "
+                  f"across {stats['questions']} question(s), {-stats['tokens_saved']} more than the retrieved "
+                  f"chunks verbatim.")
+        elif stats["questions"]:
+            print(f"🔹 Context assembly: {stats['raw_tokens']} → {stats['assembled_tokens']} prompt tokens "
+                  f"across {stats['questions']} question(s), {stats['tokens_saved']} saved "
+                  f"({stats['saved_ratio']:.0%}).")
+        return stats
@@ -0,0 +1,218 @@
+import time
+import threading
+from contextlib import contextmanager
+
+
+class DriverPoolFullError(RuntimeError):
+    """Raised when a lease is requested while the wait queue is already at its limit."""
+
+
+# --------------------------------------------------------------------------
+# Warm WebDriver Pool
+# --------------------------------------------------------------------------
+class DriverPool:
+    """Bounded pool of pre-launched WebDriver instances leased to fill jobs.
+
+    At most `size` browsers exist at once. A job that finds every driver busy
+    waits in line (up to `max_queue` waiters, `lease_timeout` seconds each).
+    Drivers are reset between leases (extra tabs closed, cookies and storage
+    cleared) and are replaced after `max_uses` leases or when they stop
+    responding.
+    """
+
+    def __init__(self, factory, size=2, max_uses=20, max_queue=None, lease_timeout=None):
+        self._factory = factory
+        self.size = max(1, size)
+        self.max_uses = max_uses
+        self.max_queue = max_queue
+        self.lease_timeout = lease_timeout
+
+        self._cond = threading.Condition()
+        self._idle = []            # [(driver, uses)]
+        self._in_use = 0
+        self._launching = 0
+        self._waiting = 0
+        self._closed = False
+
+        self.leases = 0
+        self.recycled = 0
+        self.crashed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def prewarm(self, count=None, background=True):
+        """Launches up to `count` idle drivers ahead of the first job."""
+        with self._cond:
+            live = len(self._idle) + self._in_use + self._launching
+            count = min(self.size if count is None else count, self.size - live)
+            if count <= 0:
+                return
+            self._launching += count
+
+        def _launch():
+            for _ in range(count):
+                try:
+                    driver = self._factory()
+                except Exception as e:
+                    print(f"⚠️ Could not prewarm browser: {e}")
+                    with self._cond:
+                        self._launching -= 1
+                        self._cond.notify()
+                    continue
+                with self._cond:
+                    self._launching -= 1
+                    self._idle.append((driver, 0))
+                    self._cond.notify()
+
+        if background:
+            threading.Thread(target=_launch, name="driver-prewarm", daemon=True).start()
+        else:
+            _launch()
+
+    @contextmanager
+    def lease(self):
+        """Yields a clean driver for one job and returns it to the pool afterwards."""
+        driver, uses = self._acquire()
+        healthy = True
+        try:
+            yield driver
+        except Exception:
+            healthy = self._is_alive(driver)
+            raise
+        finally:
+            self._release(driver, uses + 1, healthy)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "launching": self._launching,
+                "queue_depth": self._waiting,
+                "leases": self.leases,
+                "recycled": self.recycled,
+                "crashed": self.crashed,
+                "avg_lease_wait": round(self.total_wait / self.leases, 3) if self.leases else 0.0,
+                "max_lease_wait": round(self.max_wait, 3),
+            }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for driver, _ in idle:
+            self._quit(driver)
+
+    def _acquire(self):
+        start = time.monotonic()
+        deadline = start + self.lease_timeout if self.lease_timeout else None
+        with self._cond:
+            full = not self._idle and self._in_use + self._launching >= self.size
+            if self.max_queue is not None and self._waiting >= self.max_queue and full:
+                raise DriverPoolFullError(f"Driver pool busy: {self._waiting} job(s) already waiting.")
+            self._waiting += 1
+            try:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Driver pool is closed.")
+                    if self._idle:
+                        driver, uses = self._idle.pop()
+                        launch = False
+                        break
+                    if self._in_use + self._launching < self.size:
+                        self._launching += 1
+                        driver, uses, launch = None, 0, True
+                        break
+                    remaining = deadline - time.monotonic() if deadline else None
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f"No browser became free within {self.lease_timeout}s.")
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+        if launch:
+            try:
+                driver = self._factory()
+            finally:
+                with self._cond:
+                    self._launching -= 1
+                    self._cond.notify()
+        elif not self._is_alive(driver):
+            with self._cond:
+                self.crashed += 1
+                self._launching += 1
+            self._quit(driver)
+            try:
+                driver, uses = self._factory(), 0
+            finally:
+                with self._cond:
+                    self._launching -= 1
+                    self._cond.notify()
+
+        waited = time.monotonic() - start
+        with self._cond:
+            self._in_use += 1
+            self.leases += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        return driver, uses
+
+    def _release(self, driver, uses, healthy):
+        if not healthy:
+            outcome = "crashed"
+        elif self._closed or (self.max_uses is not None and uses >= self.max_uses):
+            outcome = "recycled"
+        elif not self._reset(driver):
+            outcome = "crashed"
+        else:
+            outcome = "kept"
+
+        if outcome != "kept":
+            with self._cond:
+                if outcome == "crashed":
+                    self.crashed += 1
+                else:
+                    self.recycled += 1
+            self._quit(driver)
+
+        with self._cond:
+            self._in_use -= 1
+            if outcome == "kept":
+                self._idle.append((driver, uses))
+            self._cond.notify()
+
+    def _reset(self, driver):
+        """Closes extra tabs and clears cookies/storage. Returns False if the driver is unusable."""
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            try:
+                driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+            except Exception:
+                pass
+            driver.delete_all_cookies()
+            driver.get("about:blank")
+            return True
+        except Exception as e:
+            print(f"⚠️ Browser reset failed, recycling it: {e}")
+            return False
+
+    @staticmethod
+    def _is_alive(driver):
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
@@ -0,0 +1,187 @@
+import os
+import threading
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+BASE_EMBEDDING_MODEL = "hkunlp/instructor-base"
+# "onnx" runs the int8-quantized export through onnxruntime instead of PyTorch.
+EMBEDDING_BACKEND = os.getenv("GFF_EMBEDDING_BACKEND", "huggingface").strip().lower()
+DEFAULT_EMBEDDING_MODEL = f"onnx:{BASE_EMBEDDING_MODEL}" if EMBEDDING_BACKEND == "onnx" else BASE_EMBEDDING_MODEL
+
+
+def _load_huggingface(model_name):
+    # Imported here: langchain_huggingface pulls in torch, which dominates cold start.
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=model_name)
+
+
+def _load_model(model_name):
+    """Loads "onnx:<model>" / "onnx-fp32:<model>" through onnxruntime and anything else through HuggingFace."""
+    if model_name.startswith(("onnx:", "onnx-fp32:")):
+        from onnx_embeddings import load_onnx_embeddings
+        return load_onnx_embeddings(model_name)
+    return _load_huggingface(model_name)
+
+
+# --------------------------------------------------------------------------
+# Embedding Model Registry
+# --------------------------------------------------------------------------
+class EmbeddingRegistry:
+    """Loads each embedding model once per process and shares it across callers.
+
+    `policy` decides which model is dropped once more than `max_models` are loaded:
+    "lru" evicts the least recently used model, "fifo" the oldest loaded one.
+    `max_models=None` disables eviction.
+    """
+
+    POLICIES = ("lru", "fifo")
+
+    def __init__(self, max_models=1, policy="lru", loader=None):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown eviction policy '{policy}'. Use one of {self.POLICIES}.")
+        if max_models is not None and max_models < 1:
+            raise ValueError("max_models must be at least 1 (or None for no limit).")
+
+        self.max_models = max_models
+        self.policy = policy
+        self._loader = loader or _load_model
+        self._models = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, model_name=DEFAULT_EMBEDDING_MODEL):
+        """Returns the loaded model, loading it on first use. Concurrent callers share one load."""
+        with self._lock:
+            model = self._lookup(model_name)
+            if model is not None:
+                return model
+            load_lock = self._loading.setdefault(model_name, threading.Lock())
+
+        with load_lock:
+            # Another thread may have finished loading while we waited.
+            with self._lock:
+                model = self._lookup(model_name)
+                if model is not None:
+                    return model
+
+            print(f"🔹 Loading embedding model '{model_name}'...")
+            try:
+                model = self._loader(model_name)
+            except BaseException:
+                with self._lock:
+                    self._loading.pop(model_name, None)
+                raise
+
+            # Stored and un-marked as loading in one step, so no caller sees neither.
+            with self._lock:
+                self.misses += 1
+                self._models[model_name] = model
+                self._loading.pop(model_name, None)
+                self._evict()
+
+        return model
+
+    def register(self, model_name, model):
+        """Makes an already-built model (e.g. a local fake) available under `model_name`."""
+        with self._lock:
+            self._models[model_name] = model
+            self._evict()
+
+    def prewarm(self, model_names=None, background=False):
+        """Loads the given models ahead of time. Returns the worker thread when `background` is set."""
+        names = list(model_names or [DEFAULT_EMBEDDING_MODEL])
+
+        def _warm():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"⚠️  Could not prewarm embedding model '{name}': {e}")
+
+        if not background:
+            _warm()
+            return None
+
+        with self._lock:
+            pending = [n for n in names if n not in self._models and n not in self._loading]
+        if not pending:
+            return None
+
+        thread = threading.Thread(target=_warm, name="embedding-prewarm", daemon=True)
+        thread.start()
+        return thread
+
+    def evict(self, model_name):
+        """Drops a model from the registry. Returns True if it was loaded."""
+        with self._lock:
+            if self._models.pop(model_name, None) is None:
+                return False
+            self.evictions += 1
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def loaded_models(self):
+        with self._lock:
+            return list(self._models)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "loaded": list(self._models),
+                "max_models": self.max_models,
+                "policy": self.policy,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    # Callers must hold self._lock.
+    def _lookup(self, model_name):
+        model = self._models.get(model_name)
+        if model is not None:
+            self.hits += 1
+            if self.policy == "lru":
+                self._models.move_to_end(model_name)
+        return model
+
+    def _evict(self):
+        if self.max_models is None:
+            return
+        while len(self._models) > self.max_models:
+            name, _ = self._models.popitem(last=False)
+            self.evictions += 1
+            print(f"🔹 Evicted embedding model '{name}' from registry.")
+
+
+def _max_models_from_env():
+    value = os.getenv("GFF_EMBEDDING_MAX_MODELS", "1").strip().lower()
+    if value in ("", "0", "none", "unlimited"):
+        return None
+    return int(value)
+
+
+registry = EmbeddingRegistry(
+    max_models=_max_models_from_env(),
+    policy=os.getenv("GFF_EMBEDDING_EVICTION", "lru").strip().lower(),
+)
+
+
+def get_embeddings(model_name=DEFAULT_EMBEDDING_MODEL):
+    """Returns the shared embedding model for `model_name`."""
+    return registry.get(model_name)
+
+
+def prewarm_embeddings(model_names=None, background=False):
+    """Loads embedding models at startup so the first request doesn't pay for it."""
+    return registry.prewarm(model_names, background=background)
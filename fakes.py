@@ -0,0 +1,209 @@
+import re
+import json
+import time
+import zlib
+import hashlib
+import random
+import threading
+from collections import deque
+from urllib.parse import parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+# --------------------------------------------------------------------------
+# Local Stand-ins for External Services
+# --------------------------------------------------------------------------
+class FakeRateLimitError(Exception):
+    """Raised by FakeGenerativeModel the way Gemini reports an exhausted quota."""
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+        self.candidates = []
+
+
+class FakeGenerativeModel:
+    """Offline stand-in for `genai.GenerativeModel`.
+
+    Simulates per-call latency (`latency` ± `jitter` seconds), throttling once
+    more than `requests_per_minute` calls land within a minute, and random
+    429s at `throttle_rate`. `answer_fn(prompt)` produces the answer text.
+    Call counts and the peak number of concurrent calls are recorded.
+    """
+
+    def __init__(self, latency=0.05, jitter=0.0, requests_per_minute=None, throttle_rate=0.0,
+                 answer_fn=None, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.requests_per_minute = requests_per_minute
+        self.throttle_rate = throttle_rate
+        self.answer_fn = answer_fn or (lambda prompt: "DATA_NOT_FOUND")
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recent = deque()
+        self._in_flight = 0
+
+        self.calls = 0
+        self.throttled = 0
+        self.max_in_flight = 0
+        self.prompts = []
+
+    def generate_content(self, prompt, safety_settings=None):
+        with self._lock:
+            self.calls += 1
+            self.prompts.append(prompt)
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            over_limit = self.requests_per_minute is not None and len(self._recent) >= self.requests_per_minute
+            if over_limit or self._random.random() < self.throttle_rate:
+                self.throttled += 1
+                raise FakeRateLimitError("429 Resource has been exhausted (e.g. check quota). Please retry in 1s.")
+            self._recent.append(now)
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+        try:
+            time.sleep(delay)
+            return FakeResponse(self.answer_fn(prompt))
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+
+class FakeEmbeddings(Embeddings):
+    """Offline stand-in for a sentence-embedding model.
+
+    Each text becomes an L2-normalised bag of hashed words, so texts that share
+    words are close and retrieval behaves sensibly without downloading a model.
+    `seconds_per_text` adds a simulated encoding cost per text.
+    """
+
+    def __init__(self, dim=384, seconds_per_text=0.0):
+        self.dim = dim
+        self.seconds_per_text = seconds_per_text
+        self.calls = 0
+        self.texts_embedded = 0
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            vector[zlib.crc32(word.encode("utf-8")) % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        self.texts_embedded += len(texts)
+        if self.seconds_per_text:
+            time.sleep(self.seconds_per_text * len(texts))
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def build_fb_public_load_data(questions, title="Fake Form"):
+    """Builds an FB_PUBLIC_LOAD_DATA_ structure for question dicts ({"question", "type", "options", "required"})."""
+    items = []
+    for i, q in enumerate(questions):
+        options = [[opt] for opt in q.get("options", [])] or None
+        items.append([
+            1000 + i, q["question"], None, q.get("type", 0),
+            [[q.get("entry_id", 2000000 + i), options, 1 if q.get("required") else 0]],
+        ])
+    return [None, [None, items, None, None, None, None, None, None, title], "/forms", title]
+
+
+class FakeFormServer:
+    """Local HTTP stand-in for a public Google Form.
+
+    Serves `<base>/viewform` with an embedded FB_PUBLIC_LOAD_DATA_ (with an ETag
+    so conditional requests get a 304) and records every POST to
+    `<base>/formResponse`. Use as a context manager; `form_url` is
+    the viewform URL to hand to the extractor or submitter.
+    """
+
+    def __init__(self, questions, title="Fake Form", latency=0.0, use_etag=True):
+        self.questions = questions
+        self.latency = latency
+        self.use_etag = use_etag
+        self.submissions = []
+        self.requests = []
+        data = build_fb_public_load_data(questions, title)
+        self.html = (
+            f"<html><head><title>{title}</title></head><body><form></form>"
+            f"<script>var FB_PUBLIC_LOAD_DATA_ = {json.dumps(data)};</script></body></html>"
+        )
+        self.etag = '"' + hashlib.sha256(self.html.encode("utf-8")).hexdigest()[:16] + '"'
+        self._server = None
+        self._thread = None
+
+    @property
+    def form_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/forms/d/e/fake/viewform"
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, body=b"", content_type="text/html; charset=utf-8", etag=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                if etag:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def do_HEAD(self):
+                fake.requests.append(("HEAD", self.path))
+                self._reply(200 if self.path.split("?")[0].endswith("viewform") else 404)
+
+            def do_GET(self):
+                fake.requests.append(("GET", self.path))
+                time.sleep(fake.latency)
+                if not self.path.split("?")[0].endswith("viewform"):
+                    self._reply(404)
+                elif fake.use_etag and self.headers.get("If-None-Match") == fake.etag:
+                    self._reply(304, etag=fake.etag)
+                else:
+                    self._reply(200, fake.html.encode("utf-8"), etag=fake.etag if fake.use_etag else None)
+
+            def do_POST(self):
+                fake.requests.append(("POST", self.path))
+                time.sleep(fake.latency)
+                if not self.path.split("?")[0].endswith("formResponse"):
+                    self._reply(404)
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                fields = parse_qs(self.rfile.read(length).decode("utf-8"))
+                fake.submissions.append(fields)
+                self._reply(200, b"<html>Your response has been recorded.</html>")
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
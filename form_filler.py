@@ -8,6 +8,12 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
+import atexit
+import threading
+from functools import lru_cache
+
+import telemetry
+from driver_pool import DriverPool
 
 import os
 import subprocess
@@ -65,19 +71,25 @@ def _handle_dropdown(wait: WebDriverWait, block_xpath: str, answer: str):
     option_in_list.click()
     time.sleep(0.5)
 
-def get_chrome_driver():
-    """Auto-detect OS and return a configured Chrome WebDriver."""
+@lru_cache(maxsize=1)
+def _managed_chromedriver_path():
+    """Resolves (and downloads if needed) the webdriver_manager ChromeDriver once per process."""
+    return ChromeDriverManager().install()
+
+
+def get_chrome_driver(headless=None):
+    """Auto-detect OS and return a configured Chrome WebDriver. `headless=True` forces headless Chrome."""
     options = webdriver.ChromeOptions()
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
 
     system_name = platform.system().lower()
 
-    if system_name == "windows":
+    if system_name == "windows" and not headless:
         # 🖥️ Local Windows: use visible Chrome with webdriver_manager
         options.add_experimental_option("detach", True)
         print("🖥️ Detected Windows — using local ChromeDriver.")
-        service = Service(ChromeDriverManager().install())
+        service = Service(_managed_chromedriver_path())
 
     else:
         # ☁️ Render / Linux: use headless Chrome
@@ -103,7 +115,7 @@ def get_chrome_driver():
 
         if not os.path.exists(chromedriver_path):
             print("⚠️ ChromeDriver not found at /usr/bin/chromedriver, using webdriver_manager fallback")
-            service = Service(ChromeDriverManager().install())
+            service = Service(_managed_chromedriver_path())
         else:
             service = Service(chromedriver_path)
 
@@ -111,55 +123,300 @@ def get_chrome_driver():
     return driver
 
 
-def fill_google_form(form_url: str, questions_with_answers: list):
-    """Main form-filling function."""
-    QUESTION_TYPE = {
-        "SHORT_ANSWER": 0, "PARAGRAPH": 1,
-        "MULTIPLE_CHOICE": 2, "CHECKBOX": 3, "DROPDOWN": 4
+# --- Warm Driver Pool (headless server runs) ---
+_driver_pool = None
+_driver_pool_lock = threading.Lock()
+
+
+def _env_optional_number(name, default):
+    value = os.getenv(name, "").strip().lower()
+    if value in ("", "none"):
+        return default
+    return float(value)
+
+
+def use_driver_pool():
+    """Pooled headless browsers are used on servers; local Windows runs keep a visible, detached browser."""
+    default = "0" if platform.system().lower() == "windows" else "1"
+    return os.getenv("GFF_DRIVER_POOL", default).lower() in ("1", "true", "yes")
+
+
+def browser_is_visible(headless=None):
+    """True when get_chrome_driver(headless) opens a window the user can see (local Windows runs)."""
+    return platform.system().lower() == "windows" and not headless
+
+
+def hand_over_for_review(driver):
+    """Leaves an unpooled, visible browser open on the filled form. A headless one is closed; returns whether it stayed open."""
+    if browser_is_visible():
+        print("\n✅ The filled form is open in the browser. Please review and submit manually.")
+        return True
+    print("\n⚠️ The form was filled in a headless browser, which can't be shown for review, so it was closed. "
+          "Use the http or dry-run fill mode to submit these answers.")
+    driver.quit()
+    return False
+
+
+def get_driver_pool():
+    """Returns the process-wide headless Chrome pool, creating it on first use."""
+    global _driver_pool
+    with _driver_pool_lock:
+        if _driver_pool is None:
+            max_queue = _env_optional_number("GFF_DRIVER_QUEUE_MAX", None)
+            lease_timeout = _env_optional_number("GFF_DRIVER_LEASE_TIMEOUT", 300)
+            _driver_pool = DriverPool(
+                factory=lambda: get_chrome_driver(headless=True),
+                size=int(os.getenv("GFF_DRIVER_POOL_SIZE", "2")),
+                max_uses=int(os.getenv("GFF_DRIVER_MAX_USES", "20")),
+                max_queue=int(max_queue) if max_queue is not None else None,
+                lease_timeout=lease_timeout,
+            )
+            atexit.register(_driver_pool.close)
+        return _driver_pool
+
+
+# --- Single-pass DOM Mapping ---
+# One round trip returns every question block with its title and input elements.
+_MAP_FORM_SCRIPT = """
+return Array.from(document.querySelectorAll("div[role='listitem']")).map(function (block) {
+    var heading = block.querySelector("[role='heading']");
+    var options = {};
+    block.querySelectorAll("[data-value]").forEach(function (el) {
+        if (el.getAttribute("role") !== "option") { options[el.getAttribute("data-value")] = el; }
+    });
+    var checkboxes = {};
+    block.querySelectorAll("[data-answer-value]").forEach(function (el) {
+        checkboxes[el.getAttribute("data-answer-value")] = el;
+    });
+    return {
+        title: heading ? heading.innerText : "",
+        text_inputs: Array.from(block.querySelectorAll("input[type='text'], input:not([type]), textarea")),
+        options: options,
+        checkboxes: checkboxes,
+        listbox: block.querySelector("[role='listbox']")
+    };
+});
+"""
+
+# Sets many text fields in one round trip, firing the events Google Forms listens for.
+_SET_TEXT_SCRIPT = """
+var failed = [];
+arguments[0].forEach(function (pair, i) {
+    try {
+        var el = pair[0];
+        var proto = el.tagName === "TEXTAREA" ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+        Object.getOwnPropertyDescriptor(proto, "value").set.call(el, pair[1]);
+        el.dispatchEvent(new Event("input", {bubbles: true}));
+        el.dispatchEvent(new Event("change", {bubbles: true}));
+    } catch (e) {
+        failed.push(i);
     }
+});
+return failed;
+"""
+
+
+def _normalize_title(text):
+    text = " ".join(str(text).split())
+    return text[:-1].rstrip() if text.endswith("*") else text
+
+
+def _xpath_literal(text):
+    """Quotes text for XPath, including text that contains both quote characters."""
+    if "'" not in text:
+        return f"'{text}'"
+    if '"' not in text:
+        return f'"{text}"'
+    parts = text.split("'")
+    return "concat(" + ", \"'\", ".join(f"'{part}'" for part in parts) + ")"
+
+
+def map_form_blocks(driver):
+    """Returns {normalized question title: block info} for every question on the page."""
+    blocks = driver.execute_script(_MAP_FORM_SCRIPT) or []
+    index = {}
+    for block in blocks:
+        title = _normalize_title(block.get("title", "").split("\n")[0])
+        if title and title not in index:
+            index[title] = block
+    return index
+
+
+def _find_block(index, question_text):
+    """Returns the block titled `question_text`, or the only block whose title is a prefix match; else None."""
+    title = _normalize_title(question_text)
+    if not title:
+        return None
+    if title in index:
+        return index[title]
+    matches = [
+        block for candidate, block in index.items()
+        if candidate.startswith(title) or title.startswith(candidate)
+    ]
+    return matches[0] if len(matches) == 1 else None
+
+
+def _fill_choice(block, answer, question_type, wait):
+    if question_type == 3:
+        answers_list = [answer] if not isinstance(answer, list) else answer
+        if len(answers_list) == 1 and str(answer).strip() not in block["checkboxes"]:
+            answers_list = str(answer).split(",")
+        for ans in answers_list:
+            checkbox = block["checkboxes"].get(str(ans).strip())
+            if checkbox is None:
+                raise ValueError(f"option '{ans}' not found")
+            checkbox.click()
+        return
+
+    if question_type == 4:
+        block["listbox"].click()
+        option_locator = (By.XPATH, f"//div[@role='option' and @data-value={_xpath_literal(str(answer))}]")
+        wait.until(EC.element_to_be_clickable(option_locator)).click()
+        time.sleep(0.5)
+        return
+
+    option = block["options"].get(str(answer).strip())
+    if option is None:
+        raise ValueError(f"option '{answer}' not found")
+    option.click()
+
+
+QUESTION_TYPE = {
+    "SHORT_ANSWER": 0, "PARAGRAPH": 1,
+    "MULTIPLE_CHOICE": 2, "CHECKBOX": 3, "DROPDOWN": 4
+}
+
+# Used only for questions the DOM map could not place.
+LEGACY_HANDLERS = {
+    QUESTION_TYPE["SHORT_ANSWER"]: _handle_short_answer,
+    QUESTION_TYPE["PARAGRAPH"]: _handle_short_answer,
+    QUESTION_TYPE["MULTIPLE_CHOICE"]: _handle_multiple_choice,
+    QUESTION_TYPE["CHECKBOX"]: _handle_checkbox,
+    QUESTION_TYPE["DROPDOWN"]: _handle_dropdown,
+}
+
+
+@telemetry.span("load_form")
+def load_form(driver, form_url: str):
+    """Opens the form and maps its question blocks. Returns (wait, block_index)."""
+    driver.get(form_url)
+    wait = WebDriverWait(driver, 15)
+    wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "form")))
+    index = map_form_blocks(driver)
+    print(f"✅ Form loaded successfully. Mapped {len(index)} question blocks. Starting automation...")
+    return wait, index
+
+
+@telemetry.span("fill_question")
+def fill_question(driver, wait, index, item, text_batch):
+    """Fills one question. Text answers are queued on `text_batch` for flush_text_inputs."""
+    question_text = item["question"]
+    question_type = item.get("type")
+    answer = item.get("answer")
+
+    if "DATA_NOT_FOUND" in str(answer):
+        print(f"⏩ Skipping '{question_text}' (answer is DATA_NOT_FOUND).")
+        return
+
+    if not _normalize_title(question_text):
+        print("⚠️ Warning: Skipping a question with an empty title; it can't be matched to the form safely.")
+        return
+
+    print(f"Attempting to answer '{question_text}'...")
+    try:
+        block = _find_block(index, question_text)
+        if block is None and index:
+            print(f"⚠️ Warning: Skipping '{question_text}': no single question on the form matches its title.")
+            return
+        if block is None:
+            # The DOM mapping found nothing at all; fall back to per-question XPath lookups.
+            handler = LEGACY_HANDLERS.get(question_type)
+            if not handler:
+                print(f"⚠️ Warning: No handler defined for question type '{question_type}'.")
+                return
+            literal = _xpath_literal(_normalize_title(question_text))
+            question_block_xpath = (
+                f"//div[@role='listitem' and .//*[@role='heading' and contains(normalize-space(.), {literal})]]"
+            )
+            handler(wait, question_block_xpath, answer)
+        elif question_type in (QUESTION_TYPE["SHORT_ANSWER"], QUESTION_TYPE["PARAGRAPH"]):
+            if not block["text_inputs"]:
+                raise ValueError("no text input in question block")
+            value = answer if isinstance(answer, str) else ", ".join(map(str, answer))
+            text_batch.append((question_text, block["text_inputs"][0], value))
+        elif question_type in (QUESTION_TYPE["MULTIPLE_CHOICE"], QUESTION_TYPE["CHECKBOX"], QUESTION_TYPE["DROPDOWN"]):
+            _fill_choice(block, answer, question_type, wait)
+        else:
+            print(f"⚠️ Warning: No handler defined for question type '{question_type}'.")
+    except TimeoutException:
+        telemetry.count("selenium_timeouts")
+        print(f"❌ ERROR: Could not find '{question_text}'. Timed out.")
+    except Exception as e:
+        print(f"❌ ERROR answering '{question_text}': {e}")
 
-    handler_map = {
-        QUESTION_TYPE["SHORT_ANSWER"]: _handle_short_answer,
-        QUESTION_TYPE["PARAGRAPH"]: _handle_short_answer,
-        QUESTION_TYPE["MULTIPLE_CHOICE"]: _handle_multiple_choice,
-        QUESTION_TYPE["CHECKBOX"]: _handle_checkbox,
-        QUESTION_TYPE["DROPDOWN"]: _handle_dropdown,
-    }
+
+@telemetry.span("flush_text_inputs")
+def flush_text_inputs(driver, text_batch):
+    """Sets all queued text answers in one script call, typing any that the script couldn't set."""
+    if not text_batch:
+        return
+    try:
+        failed = driver.execute_script(_SET_TEXT_SCRIPT, [[el, value] for _, el, value in text_batch]) or []
+    except Exception as e:
+        print(f"⚠️ Bulk text fill failed ({e}), typing answers instead.")
+        failed = range(len(text_batch))
+
+    for i in failed:
+        question_text, element, value = text_batch[i]
+        try:
+            element.clear()
+            element.send_keys(value)
+        except Exception as e:
+            print(f"❌ ERROR answering '{question_text}': {e}")
+    text_batch.clear()
+
+
+@telemetry.run_scope("form_filling")
+def fill_google_form(form_url: str, questions_with_answers: list, use_pool=None):
+    """Main form-filling function. Returns True when the filled form was left open for review.
+
+    With the pool, the browser is leased from the warm headless pool and reset
+    when handed back, so nothing is left to review (batch automation). For
+    review, pass `use_pool=False`: a fresh Chrome is launched and left open
+    when it is visible (see hand_over_for_review).
+    """
+    use_pool = use_driver_pool() if use_pool is None else use_pool
+
+    if use_pool:
+        pool = get_driver_pool()
+        print(f"🤖 Leasing a browser from the pool to auto-fill the form... {pool.stats()}")
+        with pool.lease() as driver:
+            filled = _run_fill(driver, form_url, questions_with_answers)
+        if filled:
+            print("\n✅ Form filled in a pooled headless browser; it is reset when handed back to the pool.")
+        return False
 
     print("🤖 Now launching browser to auto-fill the form...")
     driver = get_chrome_driver()
+    _run_fill(driver, form_url, questions_with_answers)
+    return hand_over_for_review(driver)
 
+
+def _run_fill(driver, form_url: str, questions_with_answers: list):
+    """Fills every answer into the form. Returns False if filling stopped on an error."""
     try:
-        driver.get(form_url)
-        wait = WebDriverWait(driver, 15)
-        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "form")))
-        print("✅ Form loaded successfully. Starting automation...")
+        wait, index = load_form(driver, form_url)
 
+        text_batch = []
         for item in questions_with_answers:
-            question_text = item["question"]
-            question_type = item.get("type")
-            answer = item.get("answer")
-
-            if "DATA_NOT_FOUND" in str(answer):
-                print(f"⏩ Skipping '{question_text}' (answer is DATA_NOT_FOUND).")
-                continue
-
-            print(f"Attempting to answer '{question_text}'...")
-            try:
-                question_block_xpath = f"//div[contains(., '{question_text}') and @role='listitem']"
-                handler = handler_map.get(question_type)
-                if handler:
-                    handler(wait, question_block_xpath, answer)
-                else:
-                    print(f"⚠️ Warning: No handler defined for question type '{question_type}'.")
-            except TimeoutException:
-                print(f"❌ ERROR: Could not find '{question_text}'. Timed out.")
-            except Exception as e:
-                print(f"❌ ERROR answering '{question_text}': {e}")
-
-        print("\n✅ Form filling routine complete. Please review and submit manually.")
+            fill_question(driver, wait, index, item, text_batch)
+        flush_text_inputs(driver, text_batch)
+
+        print("\n✅ Form filling routine complete.")
+        return True
     except Exception as e:
         print(f"❌ A critical error occurred: {e}")
+        return False
 
 
 # # -------------------------------
@@ -167,10 +424,8 @@ def fill_google_form(form_url: str, questions_with_answers: list):
 # # -------------------------------
 
 
-from answer_retrever import rag_pipeline_with_refresh 
-
-
 if __name__ == "__main__":
+    from answer_retrever import rag_pipeline_with_refresh
 
     FORM_URL = "https://docs.google.com/forms/d/e/1FAIpQLScP8ZvKzWqo496iHhBYp99ygcSEGADD4LOJAaXjspkYvfRBnw/viewform?usp=header"
     DOCUMENTS = [r"test_files\Avula_Puneeth_Kumar_Reddy_resume.pdf"]  
@@ -198,6 +453,7 @@ if __name__ == "__main__":
 
     # ---  Automatically Fill the Google Form ---
 
-    fill_google_form(FORM_URL, filled_form_data)
-
-    print("\n🎉 Process complete! The browser window has been left open for your review.")
\ No newline at end of file
+    if fill_google_form(FORM_URL, filled_form_data, use_pool=False):
+        print("\n🎉 Process complete! The browser window has been left open for your review.")
+    else:
+        print("\n🎉 Process complete!")
\ No newline at end of file
@@ -0,0 +1,268 @@
+import re
+import time
+import random
+import asyncio
+import threading
+
+import telemetry
+
+
+FAILED_ANSWER = "No answer generated (Gemini failure)"
+
+_RATE_LIMIT_MARKERS = ("429", "quota", "rate limit", "ratelimit", "resource exhausted", "resourceexhausted", "too many requests")
+
+
+def extract_response_text(response):
+    """Pulls the answer text out of a Gemini response, falling back to candidate parts."""
+    if hasattr(response, "text") and response.text:
+        return response.text.strip()
+
+    if getattr(response, "candidates", None):
+        candidate = response.candidates[0]
+        if candidate.content and candidate.content.parts:
+            return "".join(
+                part.text for part in candidate.content.parts if hasattr(part, "text")
+            ).strip()
+    return ""
+
+
+def is_rate_limit_error(error):
+    """True for quota / 429-style errors, which need backoff rather than a plain retry."""
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in _RATE_LIMIT_MARKERS)
+
+
+def is_timeout_error(error):
+    """True for client or server deadline errors, counted separately from other failures."""
+    text = f"{type(error).__name__} {error}".lower()
+    return "timeout" in text or "timed out" in text or "deadline" in text
+
+
+def count_error(error):
+    """Tallies a failed Gemini call under the matching telemetry counters."""
+    if is_rate_limit_error(error):
+        telemetry.count("gemini_rate_limited")
+    elif is_timeout_error(error):
+        telemetry.count("gemini_timeouts")
+    telemetry.count("gemini_errors")
+
+
+def retry_after_hint(error):
+    """Returns the server-suggested retry delay in seconds, if the error message carries one."""
+    text = str(error)
+    match = re.search(r"retry in ([\d.]+)\s*s", text, re.IGNORECASE) or re.search(
+        r"retry_delay\s*\{\s*seconds:\s*(\d+)", text
+    )
+    return float(match.group(1)) if match else None
+
+
+# --------------------------------------------------------------------------
+# Rate Limiting
+# --------------------------------------------------------------------------
+class TokenBucket:
+    """Token bucket allowing `requests_per_minute` with bursts of up to `burst` requests.
+
+    Each caller reserves its slot under a thread lock and then sleeps outside
+    it, so one bucket paces async workers on any event loop (every
+    `ConcurrentGenerator.run` starts its own) as well as blocking callers.
+    """
+
+    def __init__(self, requests_per_minute, burst=1):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Takes a token, going into debt if none is left. Returns how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    async def acquire(self):
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+    def acquire_blocking(self):
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+
+class AdaptiveBackoff:
+    """Shared cooldown that every worker honours after a rate-limit error.
+
+    Each consecutive throttle doubles the pause (capped at `max_delay`); a
+    successful call resets it. A retry delay suggested by the server wins when
+    it is longer.
+    """
+
+    def __init__(self, base_delay=2, max_delay=60):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._streak = 0
+        self._pause_until = 0.0
+        self._lock = threading.Lock()
+        self.throttles = 0
+
+    def on_throttle(self, hint=None):
+        with self._lock:
+            self._streak += 1
+            self.throttles += 1
+            delay = min(self.max_delay, self.base_delay * 2 ** (self._streak - 1))
+            if hint:
+                delay = max(delay, min(hint, self.max_delay))
+            delay += random.uniform(0, 1)
+            self._pause_until = max(self._pause_until, time.monotonic() + delay)
+        return delay
+
+    def on_success(self):
+        with self._lock:
+            self._streak = 0
+
+    async def wait(self):
+        remaining = self._pause_until - time.monotonic()
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+
+    def wait_blocking(self):
+        remaining = self._pause_until - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+
+# The Gemini quota is per API key, so every generator in the process (concurrent
+# runs in the app, parallel batch jobs, the sequential path) shares these.
+shared_backoff = AdaptiveBackoff()
+_shared_buckets = {}
+_shared_buckets_lock = threading.Lock()
+
+
+def shared_bucket(requests_per_minute):
+    """Returns the process-wide bucket for `requests_per_minute`, or None when pacing is off."""
+    if not requests_per_minute:
+        return None
+    with _shared_buckets_lock:
+        if requests_per_minute not in _shared_buckets:
+            _shared_buckets[requests_per_minute] = TokenBucket(requests_per_minute)
+        return _shared_buckets[requests_per_minute]
+
+
+# --------------------------------------------------------------------------
+# Concurrent Generation Engine
+# --------------------------------------------------------------------------
+class ConcurrentGenerator:
+    """Runs independent prompts against a model concurrently.
+
+    `model` is anything with `generate_content(prompt, safety_settings=...)`, so a
+    local fake can stand in for Gemini. At most `concurrency` calls are in flight,
+    requests are paced by the process-wide token bucket when `requests_per_minute`
+    is set, and quota errors pause every worker in the process through the shared
+    adaptive backoff (pass `backoff` to isolate one generator). Results come back
+    as (text, failed_flag) tuples in prompt order.
+    """
+
+    def __init__(self, model, safety_settings=None, concurrency=4, requests_per_minute=None,
+                 retries=3, throttle_retries=8, delay=2, backoff=None):
+        self.model = model
+        self.safety_settings = safety_settings
+        self.concurrency = max(1, concurrency)
+        self.requests_per_minute = requests_per_minute
+        self.retries = retries
+        self.throttle_retries = throttle_retries
+        self.delay = delay
+        self.backoff = backoff or shared_backoff
+
+    async def generate_all(self, prompts, on_result=None):
+        """Generates every prompt. `on_result(index, text, failed)` fires as each one completes."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        bucket = shared_bucket(self.requests_per_minute)
+        backoff = self.backoff
+        results = [None] * len(prompts)
+
+        async def worker(index, prompt):
+            async with semaphore:
+                results[index] = await self._generate_one(index, prompt, bucket, backoff)
+            if on_result:
+                on_result(index, *results[index])
+
+        await asyncio.gather(*(worker(i, p) for i, p in enumerate(prompts)))
+        return results
+
+    def run(self, prompts, on_result=None):
+        """Synchronous wrapper around generate_all, usable from scripts and Streamlit."""
+        return run_coroutine(self.generate_all(prompts, on_result))
+
+    async def _generate_one(self, index, prompt, bucket, backoff):
+        label = f"Q{index + 1}"
+        with telemetry.span("generate_answer", question=label):
+            return await self._attempt(label, prompt, bucket, backoff)
+
+    async def _attempt(self, label, prompt, bucket, backoff):
+        attempt = 0
+        throttled = 0
+        while attempt < self.retries:
+            await backoff.wait()
+            if bucket:
+                await bucket.acquire()
+
+            try:
+                with telemetry.span("gemini_call", question=label):
+                    response = await asyncio.to_thread(
+                        self.model.generate_content, prompt, safety_settings=self.safety_settings
+                    )
+                text = extract_response_text(response)
+                if text:
+                    backoff.on_success()
+                    return text, False
+                attempt += 1
+                telemetry.count("gemini_empty_responses")
+                print(f"⚠️  {label} attempt {attempt}: Gemini returned empty response, retrying...")
+
+            except Exception as e:
+                count_error(e)
+                if is_rate_limit_error(e) and throttled < self.throttle_retries:
+                    throttled += 1
+                    pause = backoff.on_throttle(retry_after_hint(e))
+                    telemetry.count("gemini_retries")
+                    print(f"⏳ {label} rate limited, backing off {pause:.1f}s...")
+                    continue
+                attempt += 1
+                print(f"⚠️  {label} attempt {attempt} failed with error: {e}")
+
+            if attempt < self.retries:
+                telemetry.count("gemini_retries")
+            await asyncio.sleep(self.delay + random.uniform(0, 1))
+
+        telemetry.count("gemini_failed")
+        print(f"❌ {label}: all retry attempts failed. Marking as failed.")
+        return FAILED_ANSWER, True
+
+
+def run_coroutine(coro):
+    """Runs a coroutine to completion, even when the calling thread already has an event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    result = {}
+
+    def _target():
+        try:
+            result["value"] = asyncio.run(coro)
+        except BaseException as e:
+            result["error"] = e
+
+    # Carry the caller's context over so spans recorded in the loop join the caller's run.
+    thread = threading.Thread(target=telemetry.run_in_context(_target))
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
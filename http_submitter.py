@@ -0,0 +1,134 @@
+import re
+import json
+from pathlib import Path
+
+from http_client import DEFAULT_TIMEOUT, get_session
+from question_retrever import resolve_form_url
+
+
+QUESTION_TYPE = {
+    "SHORT_ANSWER": 0, "PARAGRAPH": 1,
+    "MULTIPLE_CHOICE": 2, "CHECKBOX": 3, "DROPDOWN": 4,
+}
+PAGE_BREAK_TYPE = 8
+CHOICE_TYPES = (QUESTION_TYPE["MULTIPLE_CHOICE"], QUESTION_TYPE["CHECKBOX"], QUESTION_TYPE["DROPDOWN"])
+
+
+def form_response_url(form_url):
+    """Turns a .../viewform URL into the .../formResponse endpoint the form posts to."""
+    base = form_url.split("?", 1)[0].rstrip("/")
+    base = re.sub(r"/(viewform|formResponse|edit)$", "", base)
+    return f"{base}/formResponse"
+
+
+def _match_option(answer, options):
+    """Returns the listed option matching `answer` exactly or case-insensitively, else None."""
+    answer = str(answer).strip()
+    if answer in options:
+        return answer
+    lowered = {opt.lower(): opt for opt in options}
+    return lowered.get(answer.lower())
+
+
+def _checkbox_values(answer, options):
+    values = answer if isinstance(answer, list) else re.split(r"[,\n;]", str(answer))
+    matched = []
+    for value in values:
+        option = _match_option(value, options)
+        if option is not None and option not in matched:
+            matched.append(option)
+    return matched
+
+
+# --------------------------------------------------------------------------
+# Payload Construction
+# --------------------------------------------------------------------------
+def build_payload(questions_with_answers):
+    """Builds the formResponse payload from answered questions.
+
+    Returns (payload, skipped) where `payload` maps "entry.<id>" to a value (a
+    list for checkboxes) and `skipped` lists (question, reason) pairs for
+    answers that can't be submitted.
+    """
+    payload = {}
+    skipped = []
+    pages = 1
+
+    for item in questions_with_answers:
+        question_text = item.get("question", "")
+        question_type = item.get("type")
+        answer = item.get("answer")
+        options = item.get("options", [])
+
+        if question_type == PAGE_BREAK_TYPE:
+            pages += 1
+            continue
+        if question_type not in QUESTION_TYPE.values():
+            continue
+        if item.get("entry_id") is None:
+            skipped.append((question_text, "no entry id"))
+            continue
+        if item.get("failed") or answer in (None, "", []) or "DATA_NOT_FOUND" in str(answer):
+            skipped.append((question_text, "no answer"))
+            continue
+
+        key = f"entry.{item['entry_id']}"
+        if question_type == QUESTION_TYPE["CHECKBOX"]:
+            values = _checkbox_values(answer, options)
+            if not values:
+                skipped.append((question_text, f"answer '{answer}' is not a listed option"))
+                continue
+            payload[key] = values
+        elif question_type in CHOICE_TYPES:
+            option = _match_option(answer, options)
+            if option is None:
+                skipped.append((question_text, f"answer '{answer}' is not a listed option"))
+                continue
+            payload[key] = option
+        else:
+            payload[key] = answer if isinstance(answer, str) else ", ".join(map(str, answer))
+
+    # Multi-page forms only accept a response that claims to have visited every page.
+    payload["pageHistory"] = ",".join(str(page) for page in range(pages))
+    payload["fvv"] = "1"
+    return payload, skipped
+
+
+# --------------------------------------------------------------------------
+# Browserless Submission
+# --------------------------------------------------------------------------
+def submit_google_form(form_url, questions_with_answers, dry_run=True, output_path="prepared_payload.json",
+                       session=None, timeout=DEFAULT_TIMEOUT):
+    """Fills a Google Form over plain HTTP instead of driving Chrome.
+
+    In dry-run mode the prepared payload is written to `output_path` and nothing
+    is sent. Otherwise the payload is POSTed through the pooled session.
+    Returns a summary dict with the target URL, payload, skipped questions and,
+    for real submissions, the HTTP status.
+    """
+    url = form_response_url(resolve_form_url(form_url, session=session, timeout=timeout))
+    payload, skipped = build_payload(questions_with_answers)
+    answered = len([k for k in payload if k.startswith("entry.")])
+
+    for question_text, reason in skipped:
+        print(f"⏩ Skipping '{question_text}' ({reason}).")
+
+    result = {"url": url, "payload": payload, "skipped": skipped, "answered": answered, "dry_run": dry_run}
+
+    if dry_run:
+        if output_path:
+            Path(output_path).write_text(json.dumps({"url": url, "payload": payload}, indent=2, ensure_ascii=False),
+                                         encoding="utf-8")
+            print(f"📝 Dry run: prepared payload for {answered} question(s) written to {output_path}.")
+        return result
+
+    print(f"📨 Submitting {answered} answer(s) to {url}...")
+    session = session or get_session()
+    response = session.post(url, data=payload, timeout=timeout)
+    result["status_code"] = response.status_code
+    result["ok"] = response.ok
+    if response.ok:
+        print("✅ Form submitted successfully.")
+    else:
+        print(f"❌ Submission failed with HTTP {response.status_code}.")
+    return result
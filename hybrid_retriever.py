@@ -0,0 +1,200 @@
+import os
+import re
+import math
+import threading
+from collections import Counter, defaultdict
+
+from dotenv import load_dotenv
+
+import telemetry
+
+
+load_dotenv()
+
+HYBRID_RETRIEVAL = os.getenv("GFF_HYBRID_RETRIEVAL", "1").lower() in ("1", "true", "yes")
+LEXICAL_WEIGHT = float(os.getenv("GFF_HYBRID_LEXICAL_WEIGHT", "1.0"))
+DENSE_WEIGHT = float(os.getenv("GFF_HYBRID_DENSE_WEIGHT", "1.0"))
+# A lexical hit is decisive (no embedding needed) when a short query's terms all
+# appear in the top chunk and it outscores the runner-up by this factor. Single
+# words ("Name") are too ambiguous, so at least DECISIVE_MIN_TERMS must match.
+DECISIVE_RATIO = float(os.getenv("GFF_HYBRID_DECISIVE_RATIO", "1.5"))
+DECISIVE_MIN_TERMS = int(os.getenv("GFF_HYBRID_DECISIVE_MIN_TERMS", "2"))
+DECISIVE_MAX_TERMS = int(os.getenv("GFF_HYBRID_DECISIVE_MAX_TERMS", "4"))
+RRF_K = 60
+
+_STOPWORDS = frozenset("""
+a an and are as at be by do does for from have how i if in is it me my of on or please
+provide the this to was what when where which who why with you your enter mention
+""".split())
+
+
+def tokenize(text):
+    return [t for t in re.findall(r"\w+", text.lower()) if t not in _STOPWORDS]
+
+
+def _text_of(doc):
+    return "" if isinstance(doc, str) else doc.page_content
+
+
+# --------------------------------------------------------------------------
+# BM25 Lexical Index
+# --------------------------------------------------------------------------
+class LexicalIndex:
+    """Inverted index with BM25 scoring over the chunks of one vector store.
+
+    `doc_ids` are the docstore ids in FAISS row order, so the index can tell
+    when the vector store has changed under it.
+    """
+
+    def __init__(self, doc_ids, texts, k1=1.5, b=0.75):
+        self.doc_ids = list(doc_ids)
+        self._checked = None
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)
+        self.lengths = []
+        for position, text in enumerate(texts):
+            terms = tokenize(text)
+            self.lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self.postings[term].append((position, tf))
+        self.postings = dict(self.postings)
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    @classmethod
+    def from_vector_store(cls, vector_store):
+        doc_ids = [vector_store.index_to_docstore_id[i] for i in sorted(vector_store.index_to_docstore_id)]
+        # A generator, so an off-heap docstore's texts are read one at a time rather than all at once.
+        texts = (_text_of(vector_store.docstore.search(doc_id)) for doc_id in doc_ids)
+        return cls(doc_ids, texts)
+
+    def matches(self, vector_store):
+        mapping = vector_store.index_to_docstore_id
+        # FAISS rows are numbered 0..n-1. Adds grow the mapping and deletes replace
+        # it, so the same mapping object at the same size needs no re-check.
+        if self._checked is not None and self._checked[0] is mapping and self._checked[1] == len(mapping):
+            return True
+        if len(self.doc_ids) != len(mapping) or any(mapping.get(i) != d for i, d in enumerate(self.doc_ids)):
+            return False
+        self._checked = (mapping, len(mapping))
+        return True
+
+    def __getstate__(self):
+        return {**self.__dict__, "_checked": None}
+
+    def _idf(self, term):
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.doc_ids) - df + 0.5) / (df + 0.5))
+
+    def search(self, query, k=10):
+        """Returns [(docstore_id, score, matched_terms)] for the best `k` chunks."""
+        terms = set(tokenize(query))
+        scores = defaultdict(float)
+        matched = defaultdict(int)
+        for term in terms:
+            idf = self._idf(term)
+            for position, tf in self.postings.get(term, ()):
+                norm = 1 - self.b + self.b * self.lengths[position] / (self.avg_length or 1)
+                scores[position] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+                matched[position] += 1
+        best = sorted(scores, key=scores.get, reverse=True)[:k]
+        return [(self.doc_ids[p], scores[p], matched[p]) for p in best]
+
+
+class FullTextIndex:
+    """BM25 search through an off-heap docstore's FTS5 table, so no postings are held in memory."""
+
+    def __init__(self, docstore):
+        self.docstore = docstore
+
+    def search(self, query, k=10):
+        """Returns [(docstore_id, score, matched_terms)] for the best `k` chunks."""
+        terms = set(tokenize(query))
+        hits = self.docstore.full_text_search(sorted(terms), k)
+        return [(doc_id, score, len(terms & set(tokenize(text)))) for doc_id, score, text in hits]
+
+
+def lexical_index_for(vector_store):
+    """Returns the store's lexical index, (re)building it when missing or out of date.
+
+    An off-heap (SQLite) docstore is searched in place through its FTS5 table.
+    """
+    if hasattr(vector_store.docstore, "full_text_search"):
+        return FullTextIndex(vector_store.docstore)
+    lexical = getattr(vector_store, "lexical_index", None)
+    if lexical is None or not lexical.matches(vector_store):
+        lexical = LexicalIndex.from_vector_store(vector_store)
+        vector_store.lexical_index = lexical
+    return lexical
+
+
+def is_decisive(query, hits):
+    """True when a short, keyword-like query has one clear lexical winner that contains all its terms."""
+    terms = set(tokenize(query))
+    if not hits or not DECISIVE_MIN_TERMS <= len(terms) <= DECISIVE_MAX_TERMS:
+        return False
+    _, top_score, top_matched = hits[0]
+    if top_matched < len(terms):
+        return False
+    runner_up = hits[1][1] if len(hits) > 1 else 0.0
+    return top_score >= DECISIVE_RATIO * runner_up
+
+
+def fuse(rankings, weights, top_k):
+    """Reciprocal rank fusion of several ranked id lists."""
+    scores = defaultdict(float)
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] += weight / (RRF_K + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)[:top_k]
+
+
+# --------------------------------------------------------------------------
+# Hybrid Retrieval
+# --------------------------------------------------------------------------
+retrieval_stats = {"queries": 0, "lexical_only": 0, "fused": 0}
+_stats_lock = threading.Lock()
+
+
+def hybrid_retrieve(vector_store, queries, top_k, dense_search):
+    """Returns one list of docstore ids per query, fusing BM25 and dense rankings.
+
+    `dense_search(queries, k)` returns ranked docstore ids per query; it is
+    called once, for every query except those with a decisive lexical hit and
+    at least top_k lexical results, which get the lexical top_k. A decisive
+    chunk always comes first.
+    """
+    depth = max(top_k * 4, 10)
+    with telemetry.span("bm25_search"):
+        lexical = lexical_index_for(vector_store)
+        lexical_hits = [lexical.search(q, depth) for q in queries]
+
+    results = [None] * len(queries)
+    pinned = {}
+    dense_needed = []
+    for i, (query, hits) in enumerate(zip(queries, lexical_hits)):
+        if is_decisive(query, hits):
+            if len(hits) >= top_k:
+                results[i] = [doc_id for doc_id, _, _ in hits[:top_k]]
+                continue
+            pinned[i] = hits[0][0]
+        dense_needed.append(i)
+
+    if dense_needed:
+        dense_ranked = dense_search([queries[i] for i in dense_needed], depth)
+        for i, dense_ids in zip(dense_needed, dense_ranked):
+            lexical_ids = [doc_id for doc_id, _, _ in lexical_hits[i]]
+            fused = fuse([lexical_ids, dense_ids], [LEXICAL_WEIGHT, DENSE_WEIGHT], top_k)
+            if i in pinned:
+                fused = [pinned[i]] + [doc_id for doc_id in fused if doc_id != pinned[i]][:top_k - 1]
+            results[i] = fused
+
+    with _stats_lock:
+        retrieval_stats["queries"] += len(queries)
+        retrieval_stats["lexical_only"] += len(queries) - len(dense_needed)
+        retrieval_stats["fused"] += len(dense_needed)
+    telemetry.count("retrieval_queries", len(queries) - len(dense_needed), path="lexical_only")
+    telemetry.count("retrieval_queries", len(dense_needed), path="fused")
+    print(f"🔹 Hybrid retrieval: {len(queries) - len(dense_needed)} of {len(queries)} question(s) answered by "
+          f"exact keyword match (no embedding), {len(dense_needed)} fused with vector search.")
+    return results
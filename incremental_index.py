@@ -0,0 +1,261 @@
+import os
+import json
+import time
+import shutil
+import threading
+from pathlib import Path
+
+import faiss
+from dotenv import load_dotenv
+from langchain_community.vectorstores import FAISS
+
+from ann_index import (
+    EMBED_BATCH_SIZE, batched, detach_vector_store, fits_corpus, load_vector_store, save_vector_store,
+)
+from index_cache import _dir_size, file_digest
+
+
+load_dotenv()
+
+MANIFEST_FILE = "manifest.json"
+
+
+# --------------------------------------------------------------------------
+# Incremental Document Index
+# --------------------------------------------------------------------------
+class IncrementalIndex:
+    """Keeps a named FAISS collection in sync with a changing set of files.
+
+    Every file version (content hash) owns the chunk ids it produced, so a sync
+    only splits and embeds new or changed files and deletes the vectors of
+    files that are gone. Renaming a file without changing it costs nothing.
+    Collections not synced within `max_age_seconds` are dropped, and the least
+    recently synced ones once all of them grow past `max_bytes`.
+    """
+
+    def __init__(self, root_dir, max_age_seconds=7 * 24 * 3600, max_bytes=512 * 1024 * 1024):
+        self.root_dir = Path(root_dir)
+        self.max_age_seconds = max_age_seconds
+        self.max_bytes = max_bytes
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def sync(self, collection, file_paths, embeddings, chunk_loader, settings, build=None):
+        """Brings `collection` in line with `file_paths` and returns its vector store.
+
+        `chunk_loader(path)` returns or yields the split chunks of one file;
+        they are embedded EMBED_BATCH_SIZE at a time. A file whose loader
+        fails part-way is rolled back (by a rebuild when the index can't drop
+        vectors) and retried on the next sync.
+        `settings` (splitter parameters, model name) must match the stored
+        manifest, otherwise the collection is rebuilt from scratch.
+
+        `build(paths)`, when given, builds a whole vector store whose chunk ids
+        are "<digest[:16]>:<n>" (answer_retrever goes through the index cache
+        and picks the ANN index for the corpus size). It seeds new collections
+        and rebuilds ones whose index can't drop vectors or no longer fits
+        their size; `chunk_loader` then only handles later additions.
+        """
+        with self._lock_for(collection):
+            folder = self.root_dir / collection
+            vector_store, manifest = self._load(folder, embeddings, settings)
+            files = manifest["files"]
+
+            current = {}
+            for path in file_paths:
+                if not os.path.exists(path):
+                    print(f"⚠️  Warning: File not found at {path}, skipping.")
+                    continue
+                current.setdefault(file_digest(path), path)
+
+            removed = [d for d in files if d not in current]
+            added = [d for d in current if d not in files]
+
+            stale_ids = [cid for d in removed for cid in files[d]["ids"]]
+            for d in removed:
+                del files[d]
+            if stale_ids and vector_store is not None:
+                try:
+                    vector_store.delete(stale_ids)
+                except Exception as e:
+                    # HNSW graphs can't remove vectors; rebuild without the stale files instead.
+                    if build is None:
+                        raise
+                    print(f"🔹 Collection index can't drop removed files ({e}), rebuilding it.")
+                    vector_store = None
+                    files.clear()
+
+            if vector_store is None and build is not None and current:
+                seeded, seeded_files = self._seed(build, current)
+                if seeded is not None:
+                    vector_store, files = seeded, seeded_files
+                    manifest["files"] = files
+
+            rebuild = False
+            for digest in [d for d in current if d not in files]:
+                path = current[digest]
+                ids = []
+                try:
+                    for batch in batched(chunk_loader(path), EMBED_BATCH_SIZE):
+                        batch_ids = [f"{digest[:16]}:{len(ids) + i}" for i in range(len(batch))]
+                        if vector_store is None:
+                            vector_store = FAISS.from_documents(batch, embeddings, ids=batch_ids)
+                        else:
+                            vector_store.add_documents(batch, ids=batch_ids)
+                        ids.extend(batch_ids)
+                except Exception as e:
+                    print(f"⚠️  Error loading {path}: {e}")
+                    if ids:
+                        try:
+                            vector_store.delete(ids)
+                        except Exception as rollback_error:
+                            # Same HNSW limit as above; the half-added file goes away when the index is rebuilt.
+                            print(f"⚠️  Could not roll back {path} ({rollback_error}), rebuilding the index.")
+                            rebuild = True
+                    continue
+                if not ids:
+                    continue
+                files[digest] = {"path": path, "ids": ids}
+
+            for digest, path in current.items():
+                if digest in files:
+                    files[digest]["path"] = path
+
+            print(f"🔹 Incremental index '{collection}': +{len(added)} file(s), "
+                  f"-{len(removed)} file(s), {len(files)} indexed.")
+
+            if rebuild and build is None:
+                print("⚠️  No builder given; the half-added chunks stay until the collection is rebuilt.")
+            if build is not None and vector_store is not None and added and not fits_corpus(vector_store):
+                print("🔹 Collection outgrew its index type, rebuilding it.")
+                rebuild = True
+            if rebuild and build is not None:
+                seeded, seeded_files = self._seed(build, current)
+                if seeded is not None:
+                    vector_store, files = seeded, seeded_files
+                    manifest["files"] = files
+
+            if not files:
+                vector_store = None
+            if added or removed:
+                self._save(folder, vector_store, manifest)
+            elif (folder / MANIFEST_FILE).exists():
+                # Marks the collection as used, so prune() doesn't drop it.
+                (folder / MANIFEST_FILE).touch()
+
+        self.prune(keep=collection)
+        return vector_store
+
+    def drop(self, collection):
+        with self._lock_for(collection):
+            shutil.rmtree(self.root_dir / collection, ignore_errors=True)
+
+    def prune(self, keep=None):
+        """Deletes collections not synced within `max_age_seconds`, then the least
+        recently synced ones while all of them take more than `max_bytes`.
+        `keep` (the collection just synced) is never deleted."""
+        if not self.root_dir.exists():
+            return
+        cutoff = time.time() - self.max_age_seconds if self.max_age_seconds is not None else None
+        collections = []
+        for folder in self.root_dir.iterdir():
+            manifest_path = folder / MANIFEST_FILE
+            if folder.name == keep or not manifest_path.exists():
+                continue
+            synced = manifest_path.stat().st_mtime
+            if cutoff is not None and synced < cutoff:
+                self.drop(folder.name)
+                continue
+            collections.append((synced, _dir_size(folder), folder.name))
+
+        if self.max_bytes is None:
+            return
+        total = sum(size for _, size, _ in collections)
+        if keep is not None and (self.root_dir / keep).exists():
+            total += _dir_size(self.root_dir / keep)
+        for _, size, name in sorted(collections):
+            if total <= self.max_bytes:
+                break
+            self.drop(name)
+            total -= size
+
+    def _lock_for(self, collection):
+        with self._locks_guard:
+            return self._locks.setdefault(collection, threading.Lock())
+
+    def _seed(self, build, current):
+        """Builds the whole collection with `build` and works out which file owns each vector.
+
+        Returns (None, {}) when the store's ids can't be attributed to files
+        (e.g. a cache entry from before per-file ids), so the caller falls back
+        to indexing file by file.
+        """
+        vector_store = build(list(current.values()))
+        if vector_store is None:
+            return None, {}
+        by_prefix = {digest[:16]: digest for digest in current}
+        files = {}
+        for doc_id in vector_store.index_to_docstore_id.values():
+            digest = by_prefix.get(str(doc_id).split(":", 1)[0])
+            if digest is None:
+                print("🔹 Cached index has no per-file chunk ids, indexing the collection file by file.")
+                return None, {}
+            files.setdefault(digest, {"path": current[digest], "ids": []})["ids"].append(doc_id)
+        # Cached indexes are memory-mapped read-only; the collection is modified in place.
+        vector_store.index = faiss.clone_index(vector_store.index)
+        return detach_vector_store(vector_store), files
+
+    def _load(self, folder, embeddings, settings):
+        empty = {"settings": settings, "files": {}}
+        manifest_path = folder / MANIFEST_FILE
+        if not manifest_path.exists():
+            return None, empty
+
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("settings") != settings:
+                print("🔹 Index settings changed, rebuilding collection.")
+                return None, empty
+            if not manifest["files"]:
+                return None, manifest
+            # A regular read (not mmap) and a private docstore copy, because both are modified in place.
+            index = faiss.read_index(str(folder / "index.faiss"))
+            return detach_vector_store(load_vector_store(folder, embeddings, index)), manifest
+        except Exception as e:
+            print(f"⚠️  Could not load incremental index at {folder}, rebuilding: {e}")
+            return None, empty
+
+    def _save(self, folder, vector_store, manifest):
+        folder.mkdir(parents=True, exist_ok=True)
+        if vector_store is not None:
+            save_vector_store(vector_store, folder)
+        else:
+            for name in ("index.faiss", "index.pkl"):
+                (folder / name).unlink(missing_ok=True)
+        # The manifest is written last so it never points at vectors that weren't saved.
+        tmp_path = folder / f".{MANIFEST_FILE}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, folder / MANIFEST_FILE)
+
+
+def _env_hours(name, default):
+    value = os.getenv(name, "").strip().lower()
+    if value in ("", "none"):
+        return default * 3600
+    return float(value) * 3600
+
+
+def _env_megabytes(name, default):
+    value = os.getenv(name, "").strip().lower()
+    if value == "none":
+        return None
+    return int(float(value or default) * 1024 * 1024)
+
+
+incremental_index = IncrementalIndex(
+    root_dir=os.getenv("GFF_COLLECTIONS_DIR", ".gff_cache/collections"),
+    max_age_seconds=_env_hours("GFF_INDEX_CACHE_MAX_AGE_HOURS", 168),
+    max_bytes=_env_megabytes("GFF_COLLECTIONS_MAX_MB", 512),
+)
@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+INDEX_FILE = "index.faiss"
+META_FILE = "meta.json"
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Returns the sha256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _dir_size(path):
+    return sum(p.stat().st_size for p in Path(path).rglob("*") if p.is_file())
+
+
+# --------------------------------------------------------------------------
+# On-disk FAISS Index Cache
+# --------------------------------------------------------------------------
+class IndexCache:
+    """Content-addressed cache of saved FAISS indexes.
+
+    An entry is keyed by the content hashes of the source files, the splitter
+    parameters and the embedding model name, so re-uploading the same files under
+    a different name still hits. Entries older than `max_age_seconds` (since last
+    use) are dropped, and the least recently used entries are dropped once the
+    cache grows past `max_bytes`.
+    """
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024, max_age_seconds=7 * 24 * 3600):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def key_for(self, file_paths, chunk_size, chunk_overlap, embedding_model):
+        """Builds the cache key for a document set. Missing files are ignored, as load_documents skips them."""
+        file_keys = sorted(
+            f"{Path(p).suffix.lower()}:{file_digest(p)}" for p in file_paths if os.path.exists(p)
+        )
+        if not file_keys:
+            return None
+        payload = json.dumps({
+            "files": file_keys,
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
+            "embedding_model": embedding_model,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def load(self, key, embeddings):
+        """Returns the cached vector store for `key`, or None on a miss."""
+        entry = self.cache_dir / key if key else None
+        if entry is None or not (entry / INDEX_FILE).exists():
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # Imported here so file_digest / key_for stay usable without loading FAISS.
+        from ann_index import load_vector_store
+
+        try:
+            vector_store = load_vector_store(entry, embeddings, _read_index(entry / INDEX_FILE))
+        except Exception as e:
+            print(f"⚠️  Discarding unreadable index cache entry {key[:12]}: {e}")
+            shutil.rmtree(entry, ignore_errors=True)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        self._touch(entry)
+        with self._lock:
+            self.hits += 1
+        return vector_store
+
+    def store(self, key, vector_store, **meta):
+        """Saves a vector store under `key`. Concurrent writers of the same key are harmless."""
+        if key is None or vector_store is None:
+            return
+        from ann_index import save_vector_store
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry = self.cache_dir / key
+        tmp_dir = Path(tempfile.mkdtemp(prefix=f".{key[:12]}-", dir=self.cache_dir))
+        try:
+            save_vector_store(vector_store, tmp_dir)
+            now = time.time()
+            with open(tmp_dir / META_FILE, "w", encoding="utf-8") as f:
+                json.dump({"created": now, "last_used": now, **meta}, f)
+            try:
+                os.replace(tmp_dir, entry)
+            except OSError:
+                # Another session stored the same key first; keep theirs.
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        with self._lock:
+            self.stores += 1
+        self.evict()
+
+    def evict(self):
+        """Applies age- and size-based eviction. Returns the number of entries removed."""
+        if not self.cache_dir.exists():
+            return 0
+
+        now = time.time()
+        entries = []
+        removed = 0
+        for entry in self.cache_dir.iterdir():
+            if not entry.is_dir() or entry.name.startswith("."):
+                continue
+            last_used = self._last_used(entry)
+            if self.max_age_seconds is not None and now - last_used > self.max_age_seconds:
+                shutil.rmtree(entry, ignore_errors=True)
+                removed += 1
+                continue
+            entries.append((last_used, _dir_size(entry), entry))
+
+        if self.max_bytes is not None:
+            total = sum(size for _, size, _ in entries)
+            for _, size, entry in sorted(entries, key=lambda e: e[0]):
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(entry, ignore_errors=True)
+                total -= size
+                removed += 1
+
+        with self._lock:
+            self.evictions += removed
+        return removed
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
+
+    def _last_used(self, entry):
+        try:
+            with open(entry / META_FILE, encoding="utf-8") as f:
+                return json.load(f)["last_used"]
+        except Exception:
+            return entry.stat().st_mtime
+
+    def _touch(self, entry):
+        meta_path = entry / META_FILE
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            meta["last_used"] = time.time()
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+        except Exception:
+            pass
+
+
+def _read_index(path):
+    """Memory-maps the saved index where the FAISS build supports it, else reads it normally."""
+    import faiss
+    try:
+        return faiss.read_index(str(path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except Exception:
+        return faiss.read_index(str(path))
+
+
+def _env_float(name, default):
+    value = os.getenv(name, "").strip().lower()
+    if value in ("", "none"):
+        return default
+    return float(value)
+
+
+index_cache = IndexCache(
+    cache_dir=os.getenv("GFF_INDEX_CACHE_DIR", ".gff_cache/indexes"),
+    max_bytes=int(_env_float("GFF_INDEX_CACHE_MAX_MB", 512) * 1024 * 1024),
+    max_age_seconds=_env_float("GFF_INDEX_CACHE_MAX_AGE_HOURS", 168) * 3600,
+)
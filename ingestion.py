@@ -0,0 +1,204 @@
+import os
+import re
+import time
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_community.document_loaders import TextLoader, PyPDFLoader, Docx2txtLoader
+
+
+# Kept free of heavy project imports: pool workers are spawned and import only this module.
+
+# Text files are streamed in blocks of about this many characters, cut at paragraph breaks.
+TEXT_BLOCK_CHARS = int(os.getenv("GFF_TEXT_BLOCK_CHARS", str(256 * 1024)))
+
+
+def get_loader(path):
+    """Picks the LangChain loader for a file based on its extension."""
+    if path.endswith(".pdf"):
+        return PyPDFLoader(path)
+    if path.endswith(".docx"):
+        return Docx2txtLoader(path)
+    return TextLoader(path)
+
+
+def _ingest_file(path, chunk_size=None, chunk_overlap=None):
+    """Parses (and optionally splits) one file. Never raises; errors are returned for the caller to report."""
+    result = {"path": path, "docs": [], "seconds": 0.0, "error": None, "skipped": False}
+    if not os.path.exists(path):
+        result["skipped"] = True
+        return result
+
+    start = time.perf_counter()
+    try:
+        docs = get_loader(path).load()
+        if chunk_size:
+            splitter = RecursiveCharacterTextSplitter(
+                chunk_size=chunk_size, chunk_overlap=chunk_overlap or 0, add_start_index=True
+            )
+            docs = splitter.split_documents(docs)
+        result["docs"] = docs
+    except Exception as e:
+        result["error"] = f"{e}\n{traceback.format_exc()}"
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def _ingest_star(args):
+    return _ingest_file(*args)
+
+
+def ingest_files(file_paths, workers=1, chunk_size=None, chunk_overlap=None):
+    """Loads files, in parallel when `workers` > 1, and returns (docs, report).
+
+    Documents come back in the order of `file_paths` regardless of which worker
+    finishes first. Missing or unreadable files are skipped with a warning.
+    `report` holds one entry per file with its parse time in seconds.
+    """
+    paths = list(file_paths)
+    jobs = [(path, chunk_size, chunk_overlap) for path in paths]
+    workers = max(1, min(workers or 1, len(paths)))
+
+    if workers == 1:
+        results = [_ingest_star(job) for job in jobs]
+    else:
+        # "spawn" avoids forking a process that may already hold torch/FAISS threads.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(_ingest_star, jobs))
+
+    docs = []
+    report = []
+    for result in results:
+        path = result["path"]
+        if result["skipped"]:
+            print(f"⚠️  Warning: File not found at {path}, skipping.")
+            continue
+        if result["error"]:
+            print(f"⚠️  Error loading {path}: {result['error']}")
+        docs.extend(result["docs"])
+        report.append({
+            "path": path,
+            "seconds": round(result["seconds"], 3),
+            "documents": len(result["docs"]),
+            "failed": result["error"] is not None,
+        })
+    return docs, report
+
+
+def print_ingest_report(report):
+    for entry in report:
+        status = "❌" if entry["failed"] else "⏱️ "
+        print(f"{status} Parsed {entry['path']} in {entry['seconds']:.2f}s ({entry['documents']} document(s))")
+
+
+# --------------------------------------------------------------------------
+# Streaming Ingestion
+# --------------------------------------------------------------------------
+def _iter_text_blocks(path, block_chars):
+    """Yields (Document, offset) blocks of a text file, each ending at a paragraph or line break where possible."""
+    offset = 0
+    buffer = ""
+    # Same encoding handling as TextLoader.
+    with open(path, encoding=None) as f:
+        while True:
+            data = f.read(block_chars)
+            buffer += data
+            while len(buffer) >= block_chars or (not data and buffer):
+                cut = len(buffer)
+                if data:
+                    for separator in ("\n\n", "\n"):
+                        position = buffer.rfind(separator, block_chars // 2, block_chars)
+                        if position != -1:
+                            cut = position + len(separator)
+                            break
+                    else:
+                        cut = block_chars
+                block, buffer = buffer[:cut], buffer[cut:]
+                yield Document(page_content=block, metadata={"source": path}), offset
+                offset += len(block)
+            if not data:
+                return
+
+
+def _iter_pages(path, block_chars):
+    """Yields (Document, offset) one page at a time: PDF pages as pypdf reads them, text files in blocks."""
+    if path.endswith((".pdf", ".docx")):
+        for page in get_loader(path).lazy_load():
+            yield page, 0
+    else:
+        yield from _iter_text_blocks(path, block_chars)
+
+
+def _overlap_tail(text, size):
+    """Returns at most the last `size` characters of `text`, starting at a word boundary."""
+    if size <= 0:
+        return ""
+    tail = text[-size:]
+    if len(tail) < len(text) and not text[-size - 1].isspace():
+        space = re.search(r"\s", tail)
+        tail = tail[space.start():] if space else ""
+    return tail
+
+
+def iter_file_chunks(path, chunk_size, chunk_overlap, block_chars=TEXT_BLOCK_CHARS):
+    """Yields one file's chunks while reading it page by page, so only a page is parsed and split at a time.
+
+    Chunks match the eager path's metadata: `start_index` counts from the
+    start of the page for PDFs and from the start of the file for text files.
+    Each text block is split together with the last `chunk_overlap` characters
+    of the block before it, so chunks overlap across block boundaries as they
+    do within a block. Raises on unreadable files, after yielding the chunks
+    read so far.
+    """
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True)
+    # PDF and DOCX pages are split one by one on the eager path too; only text blocks carry overlap.
+    carry_overlap = not path.endswith((".pdf", ".docx"))
+    carry = ""
+    for page, offset in _iter_pages(path, block_chars):
+        block = page.page_content
+        if carry:
+            page.page_content = carry + block
+            offset -= len(carry)
+        for chunk in splitter.split_documents([page]):
+            start = chunk.metadata.get("start_index", -1)
+            if carry and 0 <= start and start + len(chunk.page_content) <= len(carry):
+                continue  # lies wholly in the carried text, which the previous block already yielded
+            if start >= 0:
+                chunk.metadata["start_index"] += offset
+            yield chunk
+        if carry_overlap:
+            carry = _overlap_tail(block, chunk_overlap)
+
+
+def iter_chunks(file_paths, chunk_size, chunk_overlap, report=None):
+    """Streams the chunks of several files in order, skipping missing files and stopping a file at its first error.
+
+    Per-file entries in the shape ingest_files reports are appended to
+    `report` as each file finishes; `seconds` counts only reading and
+    splitting, not the time the consumer spends between chunks.
+    """
+    for path in file_paths:
+        if not os.path.exists(path):
+            print(f"⚠️  Warning: File not found at {path}, skipping.")
+            continue
+        entry = {"path": path, "seconds": 0.0, "documents": 0, "failed": False}
+        chunks = iter_file_chunks(path, chunk_size, chunk_overlap)
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = next(chunks, None)
+            except Exception as e:
+                print(f"⚠️  Error loading {path} after {entry['documents']} chunk(s): {e}\n{traceback.format_exc()}")
+                entry["failed"] = True
+                chunk = None
+            entry["seconds"] += time.perf_counter() - start
+            if chunk is None:
+                break
+            entry["documents"] += 1
+            yield chunk
+        entry["seconds"] = round(entry["seconds"], 3)
+        if report is not None:
+            report.append(entry)
@@ -0,0 +1,181 @@
+import os
+import time
+import uuid
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+JOB_WORKERS = int(os.getenv("GFF_JOB_WORKERS", "2"))
+# Jobs allowed to wait for a worker; beyond this new jobs are turned away.
+JOB_QUEUE_MAX = int(os.getenv("GFF_JOB_QUEUE_MAX", "4"))
+JOBS_PER_SESSION = int(os.getenv("GFF_JOBS_PER_SESSION", "1"))
+# Finished jobs are forgotten after this many seconds.
+JOB_TTL = float(os.getenv("GFF_JOB_TTL", "3600"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobRejected(Exception):
+    """Raised when the server (or the session) already has as many jobs as it may run."""
+
+
+# --------------------------------------------------------------------------
+# Jobs
+# --------------------------------------------------------------------------
+class Job:
+    """One background run and its progress, written by the worker and read by the UI."""
+
+    def __init__(self, session_id):
+        self.id = uuid.uuid4().hex[:12]
+        self.session_id = session_id
+        self.status = QUEUED
+        self.stage = "waiting for a worker"
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.questions = []
+        self.answers = {}
+        self.messages = []
+        self.result = None
+        self.error = None
+        self._lock = threading.Lock()
+
+    def set_stage(self, stage):
+        with self._lock:
+            self.stage = stage
+
+    def set_questions(self, questions):
+        with self._lock:
+            self.questions = [q.get("question", "") for q in questions]
+
+    def record_answer(self, index, question):
+        with self._lock:
+            self.answers[index] = {
+                "question": question.get("question", ""),
+                "answer": question.get("answer"),
+                "source": question.get("answer_source"),
+                "failed": question.get("failed", False),
+            }
+
+    def log(self, message):
+        with self._lock:
+            self.messages.append(message)
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    def snapshot(self):
+        """A consistent copy of the job's state for rendering."""
+        with self._lock:
+            return {
+                "id": self.id,
+                "status": self.status,
+                "stage": self.stage,
+                "total": len(self.questions),
+                "answered": len(self.answers),
+                "answers": [self.answers[i] for i in sorted(self.answers)],
+                "messages": list(self.messages),
+                "result": self.result,
+                "error": self.error,
+                "elapsed": (self.finished or time.time()) - (self.started or self.created),
+            }
+
+
+# --------------------------------------------------------------------------
+# Job Runner
+# --------------------------------------------------------------------------
+class JobRunner:
+    """Runs jobs on a bounded worker pool with an admission limit.
+
+    At most `workers` jobs run at once and at most `queue_max` more wait; a
+    session may have `per_session` active jobs. Anything beyond that raises
+    JobRejected instead of oversubscribing CPU, memory and browsers.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, queue_max=JOB_QUEUE_MAX, per_session=JOBS_PER_SESSION, ttl_seconds=JOB_TTL):
+        self.workers = max(1, workers)
+        self.queue_max = max(0, queue_max)
+        self.per_session = max(1, per_session)
+        self.ttl_seconds = ttl_seconds
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="gff-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def submit(self, session_id, target, *args, **kwargs):
+        """Queues `target(job, *args, **kwargs)` and returns the Job. Its return value becomes `job.result`."""
+        with self._lock:
+            self._forget_finished()
+            active = [j for j in self._jobs.values() if j.active]
+            if sum(1 for j in active if j.session_id == session_id) >= self.per_session:
+                self.rejected += 1
+                raise JobRejected("This session already has a run in progress.")
+            if len(active) >= self.workers + self.queue_max:
+                self.rejected += 1
+                raise JobRejected(f"The server is busy ({len(active)} runs in progress or queued). Try again shortly.")
+            job = Job(session_id)
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job, target, args, kwargs)
+        return job
+
+    def _run(self, job, target, args, kwargs):
+        job.status = RUNNING
+        job.started = time.time()
+        job.set_stage("starting")
+        try:
+            job.result = target(job, *args, **kwargs)
+            job.status = DONE
+            job.set_stage("finished")
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = FAILED
+            job.set_stage("failed")
+            traceback.print_exc()
+        finally:
+            job.finished = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs_for(self, session_id):
+        with self._lock:
+            return [j for j in self._jobs.values() if j.session_id == session_id]
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {
+            "workers": self.workers,
+            "queue_max": self.queue_max,
+            "running": sum(1 for j in jobs if j.status == RUNNING),
+            "queued": sum(1 for j in jobs if j.status == QUEUED),
+            "rejected": self.rejected,
+        }
+
+    # Callers must hold self._lock.
+    def _forget_finished(self):
+        if self.ttl_seconds is None:
+            return
+        cutoff = time.time() - self.ttl_seconds
+        for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished < cutoff]:
+            del self._jobs[job_id]
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner():
+    """Returns the process-wide job runner shared by every Streamlit session."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+        return _runner
@@ -1,5 +1,6 @@
-from answer_retrever import rag_pipeline_with_refresh 
-from form_filler import fill_google_form
+import os
+
+import startup
 
 
 if __name__ == "__main__":
@@ -11,13 +12,33 @@ if __name__ == "__main__":
     print("🚀 Starting the Google Form Auto-filler Process...")
     print(f"📄 Using document(s): {', '.join(DOCUMENTS)}")
 
+    # GFF_FILL_MODE: "browser" (Selenium, default), "http" (direct submit) or "dry-run" (write payload only)
+    fill_mode = os.getenv("GFF_FILL_MODE", "browser").lower()
+    # GFF_STREAMING=1 fills the browser while answers are still being generated.
+    streaming = fill_mode == "browser" and os.getenv("GFF_STREAMING", "0").lower() in ("1", "true", "yes")
+
+    # Only the stack the chosen mode needs is imported (Selenium stays unloaded for http/dry-run).
+    from answer_retrever import rag_pipeline_with_refresh
+    startup.mark("answering stack imported")
+
     print("\n🧠 Generating answers from documents... Please wait.")
-    filled_form_data = rag_pipeline_with_refresh(
-        FORM_URL, 
-        DOCUMENTS,
-        top_k=3,
-        context_refresh_interval=5
-    )
+    if streaming:
+        from streaming_pipeline import run_streaming_pipeline
+        filled_form_data, _ = run_streaming_pipeline(
+            FORM_URL,
+            DOCUMENTS,
+            top_k=3,
+            context_refresh_interval=5,
+            # Not pooled: a pooled browser is reset when handed back, discarding the filled form.
+            use_pool=False,
+        )
+    else:
+        filled_form_data = rag_pipeline_with_refresh(
+            FORM_URL, 
+            DOCUMENTS,
+            top_k=3,
+            context_refresh_interval=5
+        )
     
     # ---  Verify the Generated Answers  ---
 
@@ -30,7 +51,19 @@ if __name__ == "__main__":
 
     # ---  Automatically Fill the Google Form ---
 
-    print("\n🤖 Now launching browser to auto-fill the form...")
-    fill_google_form(FORM_URL, filled_form_data)
+    if streaming:
+        print("\n🎉 Process complete! The form was filled while answers were generated.")
+    elif fill_mode in ("http", "dry-run"):
+        from http_submitter import submit_google_form
+        submit_google_form(FORM_URL, filled_form_data, dry_run=(fill_mode == "dry-run"))
+        print("\n🎉 Process complete!")
+    else:
+        print("\n🤖 Now launching browser to auto-fill the form...")
+        from form_filler import fill_google_form
+        if fill_google_form(FORM_URL, filled_form_data, use_pool=False):
+            print("\n🎉 Process complete! The browser window has been left open for your review.")
+        else:
+            print("\n🎉 Process complete!")
 
-    print("\n🎉 Process complete! The browser window has been left open for your review.")
\ No newline at end of file
+    if os.getenv("GFF_STARTUP_REPORT", "0").lower() in ("1", "true", "yes"):
+        startup.report()
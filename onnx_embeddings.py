@@ -0,0 +1,276 @@
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+
+load_dotenv()
+
+ONNX_MODEL_DIR = os.getenv("GFF_ONNX_MODEL_DIR", ".gff_cache/onnx")
+ONNX_BATCH_SIZE = int(os.getenv("GFF_ONNX_BATCH_SIZE", "32"))
+# 0 lets onnxruntime pick (one thread per physical core).
+ONNX_INTRA_OP_THREADS = int(os.getenv("GFF_ONNX_THREADS", "0"))
+ONNX_INTER_OP_THREADS = int(os.getenv("GFF_ONNX_INTER_OP_THREADS", "1"))
+
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+CONFIG_FILE = "gff_onnx.json"
+
+
+def _require(module_name, purpose):
+    try:
+        return __import__(module_name, fromlist=["_"])
+    except ImportError as e:
+        raise ImportError(
+            f"The ONNX embedding backend needs '{module_name}' for {purpose}. "
+            f"Install it with: pip install onnx onnxruntime"
+        ) from e
+
+
+def model_dir_for(model_name, root=ONNX_MODEL_DIR):
+    return Path(root) / model_name.replace("/", "__")
+
+
+# --------------------------------------------------------------------------
+# Export & Quantization
+# --------------------------------------------------------------------------
+def export_onnx_model(model_name, output_dir=None, quantize=True, opset=14):
+    """Exports a sentence-transformers model to ONNX and quantizes its weights to int8.
+
+    The whole sentence-transformers pipeline (encoder, pooling, dense and
+    normalize layers) goes into the graph, so the ONNX model returns the same
+    vectors HuggingFaceEmbeddings would. Returns the output directory.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    output_dir = Path(output_dir or model_dir_for(model_name))
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    print(f"🔹 Exporting '{model_name}' to ONNX in {output_dir}...")
+    st_model = SentenceTransformer(model_name, device="cpu")
+    st_model.eval()
+
+    class _SentenceEmbedding(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            features = self.model({"input_ids": input_ids, "attention_mask": attention_mask})
+            return features["sentence_embedding"]
+
+    sample = st_model.tokenizer(["An example sentence."], return_tensors="pt")
+    with torch.no_grad():
+        torch.onnx.export(
+            _SentenceEmbedding(st_model),
+            (sample["input_ids"], sample["attention_mask"]),
+            str(output_dir / FP32_FILE),
+            input_names=["input_ids", "attention_mask"],
+            output_names=["sentence_embedding"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "sentence_embedding": {0: "batch"},
+            },
+            opset_version=opset,
+        )
+    st_model.tokenizer.save_pretrained(str(output_dir))
+
+    if quantize:
+        quantization = _require("onnxruntime.quantization", "int8 quantization")
+        print("🔹 Quantizing weights to int8...")
+        quantization.quantize_dynamic(
+            str(output_dir / FP32_FILE),
+            str(output_dir / INT8_FILE),
+            weight_type=quantization.QuantType.QInt8,
+        )
+
+    with open(output_dir / CONFIG_FILE, "w", encoding="utf-8") as f:
+        json.dump({
+            "model_name": model_name,
+            "max_seq_length": st_model.max_seq_length,
+            "dimension": st_model.get_sentence_embedding_dimension(),
+        }, f)
+    print(f"✅ ONNX export ready in {output_dir}.")
+    return output_dir
+
+
+# --------------------------------------------------------------------------
+# ONNX Runtime Embeddings
+# --------------------------------------------------------------------------
+class OnnxEmbeddings(Embeddings):
+    """CPU embeddings from an exported (optionally int8) ONNX model, usable anywhere HuggingFaceEmbeddings is.
+
+    Texts are sorted by length and run in batches of `batch_size`, so each batch
+    pads to a similar length; results come back in input order. Thread counts
+    are passed straight to onnxruntime.
+    """
+
+    def __init__(self, model_name, model_dir=None, quantized=True, batch_size=ONNX_BATCH_SIZE,
+                 intra_op_threads=ONNX_INTRA_OP_THREADS, inter_op_threads=ONNX_INTER_OP_THREADS):
+        ort = _require("onnxruntime", "running the model")
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.model_dir = Path(model_dir or model_dir_for(model_name))
+        self.quantized = quantized
+        self.batch_size = max(1, batch_size)
+
+        model_file = self.model_dir / (INT8_FILE if quantized else FP32_FILE)
+        if not model_file.exists():
+            export_onnx_model(model_name, self.model_dir, quantize=quantized)
+
+        with open(self.model_dir / CONFIG_FILE, encoding="utf-8") as f:
+            config = json.load(f)
+        self.max_length = config.get("max_seq_length") or 512
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        self.session = ort.InferenceSession(str(model_file), options, providers=["CPUExecutionProvider"])
+        self.tokenizer = AutoTokenizer.from_pretrained(str(self.model_dir))
+
+    def _embed(self, texts):
+        texts = [t.replace("\n", " ") for t in texts]
+        if not texts:
+            return []
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            encoded = self.tokenizer(
+                [texts[i] for i in batch],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np",
+            )
+            (output,) = self.session.run(None, {
+                "input_ids": encoded["input_ids"].astype(np.int64),
+                "attention_mask": encoded["attention_mask"].astype(np.int64),
+            })
+            for i, vector in zip(batch, output):
+                vectors[i] = vector.astype(np.float32).tolist()
+        return vectors
+
+    def embed_documents(self, texts):
+        return self._embed(list(texts))
+
+    def embed_query(self, text):
+        return self._embed([text])[0]
+
+
+def load_onnx_embeddings(model_name):
+    """Registry loader for "onnx:<model>" (int8) and "onnx-fp32:<model>" names."""
+    prefix, _, base_name = model_name.partition(":")
+    return OnnxEmbeddings(base_name, quantized=(prefix != "onnx-fp32"))
+
+
+# --------------------------------------------------------------------------
+# Quality Check
+# --------------------------------------------------------------------------
+def compare_retrieval(reference, candidate, chunks, queries, top_k=5):
+    """Compares how often `candidate` retrieves the same top-k chunks as `reference`.
+
+    Returns mean overlap@k (1.0 means identical result sets), the share of
+    queries with the same top-1 chunk, and the embedding time of each model.
+    """
+    def _normalized(vectors):
+        matrix = np.array(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _search(model):
+        start = time.perf_counter()
+        chunk_vecs = _normalized(model.embed_documents(chunks))
+        query_vecs = _normalized(model.embed_documents(queries))
+        seconds = time.perf_counter() - start
+        ranks = np.argsort(-(query_vecs @ chunk_vecs.T), axis=1)[:, :top_k]
+        return ranks, seconds
+
+    k = min(top_k, len(chunks))
+    ref_ranks, ref_seconds = _search(reference)
+    cand_ranks, cand_seconds = _search(candidate)
+    overlaps = [len(set(r[:k]) & set(c[:k])) / k for r, c in zip(ref_ranks, cand_ranks)]
+    return {
+        "queries": len(queries),
+        "chunks": len(chunks),
+        "top_k": k,
+        "mean_overlap": float(np.mean(overlaps)) if overlaps else 0.0,
+        "min_overlap": float(np.min(overlaps)) if overlaps else 0.0,
+        "top1_agreement": float(np.mean(ref_ranks[:, 0] == cand_ranks[:, 0])) if overlaps else 0.0,
+        "reference_seconds": round(ref_seconds, 3),
+        "candidate_seconds": round(cand_seconds, 3),
+    }
+
+
+def _sample_queries(chunks, count):
+    """Uses the first sentence of evenly spaced chunks as stand-in questions."""
+    step = max(1, len(chunks) // max(1, count))
+    queries = []
+    for chunk in chunks[::step][:count]:
+        sentence = chunk.strip().split(". ")[0][:200]
+        if sentence:
+            queries.append(sentence)
+    return queries
+
+
+def quality_check(doc_paths, model_name, queries=None, top_k=5, min_overlap=0.9, chunk_size=1000, chunk_overlap=100):
+    """Indexes sample documents with the fp32 model and the int8 ONNX model and reports retrieval overlap."""
+    from langchain_huggingface import HuggingFaceEmbeddings
+    from ingestion import ingest_files
+
+    docs, _ = ingest_files(doc_paths, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks = [d.page_content for d in docs]
+    if not chunks:
+        raise ValueError("No text found in the sample documents.")
+    queries = queries or _sample_queries(chunks, 50)
+
+    report = compare_retrieval(
+        HuggingFaceEmbeddings(model_name=model_name),
+        OnnxEmbeddings(model_name, quantized=True),
+        chunks,
+        queries,
+        top_k=top_k,
+    )
+    report["passed"] = report["mean_overlap"] >= min_overlap
+    print(f"\n📊 fp32 vs int8 ONNX retrieval for '{model_name}' "
+          f"({report['queries']} queries over {report['chunks']} chunks):")
+    print(f"   overlap@{report['top_k']}: mean {report['mean_overlap']:.3f}, min {report['min_overlap']:.3f}")
+    print(f"   top-1 agreement: {report['top1_agreement']:.3f}")
+    print(f"   embedding time: fp32 {report['reference_seconds']}s, int8 {report['candidate_seconds']}s")
+    print(f"   {'✅ PASS' if report['passed'] else '❌ FAIL'} (threshold {min_overlap})")
+    return report
+
+
+if __name__ == "__main__":
+    from embedding_registry import BASE_EMBEDDING_MODEL
+
+    parser = argparse.ArgumentParser(description="Export and check the int8 ONNX embedding backend.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = sub.add_parser("export", help="Export and quantize the model.")
+    export_parser.add_argument("--model", default=BASE_EMBEDDING_MODEL)
+    export_parser.add_argument("--no-quantize", action="store_true")
+
+    check_parser = sub.add_parser("check", help="Compare int8 ONNX retrieval against the fp32 model.")
+    check_parser.add_argument("documents", nargs="+")
+    check_parser.add_argument("--model", default=BASE_EMBEDDING_MODEL)
+    check_parser.add_argument("--top-k", type=int, default=5)
+    check_parser.add_argument("--min-overlap", type=float, default=0.9)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_onnx_model(args.model, quantize=not args.no_quantize)
+    else:
+        result = quality_check(args.documents, args.model, top_k=args.top_k, min_overlap=args.min_overlap)
+        sys.exit(0 if result["passed"] else 1)
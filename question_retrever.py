@@ -1,13 +1,74 @@
+import os
 import re
+import copy
 import json
-import requests
+import time
+import threading
+from collections import OrderedDict
+
+import telemetry
+from http_client import DEFAULT_TIMEOUT, get_session
+
+
+# Parsed forms are reused for this long before the server is asked again.
+SCHEMA_TTL = float(os.getenv("GFF_FORM_SCHEMA_TTL", "300"))
+# Forms (resolved URLs and parsed schemas) remembered per process, least recently used dropped first.
+FORM_CACHE_MAX = int(os.getenv("GFF_FORM_CACHE_MAX", "256"))
+
+_resolved_urls = OrderedDict()
+_schema_cache = OrderedDict()
+_url_locks = {}
+_cache_lock = threading.Lock()
+schema_stats = {"hits": 0, "revalidated": 0, "fetched": 0}
+
+
+def _count(name):
+    with _cache_lock:
+        schema_stats[name] += 1
+    telemetry.count("form_schema_lookups", result=name)
+
+
+def _lock_for(url):
+    with _cache_lock:
+        return _url_locks.setdefault(url, threading.Lock())
+
+
+def _cache_get(cache, key):
+    with _cache_lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+
+def _cache_put(cache, key, value):
+    with _cache_lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > FORM_CACHE_MAX:
+            evicted, _ = cache.popitem(last=False)
+            lock = _url_locks.get(evicted)
+            if cache is _schema_cache and lock is not None and not lock.locked():
+                del _url_locks[evicted]
+
+
+def resolve_form_url(form_url, session=None, timeout=DEFAULT_TIMEOUT):
+    """Expands short links (forms.gle) and returns the .../viewform URL.
+
+    Successful resolutions are cached per process. When the HEAD request fails,
+    the URL is used as given for this call only, so a transient error isn't
+    remembered.
+    """
+    cached = _cache_get(_resolved_urls, form_url)
+    if cached is not None:
+        return cached
 
-def extract_questions_from_google_form(form_url):
     # Step 1: Follow redirects if the link is shortened (forms.gle)
+    resolved = False
     try:
-        session = requests.Session()
-        response = session.head(form_url, allow_redirects=True)
+        response = (session or get_session()).head(form_url, allow_redirects=True, timeout=timeout)
         expanded_url = response.url
+        resolved = response.ok
     except Exception:
         expanded_url = form_url
 
@@ -18,10 +79,13 @@ def extract_questions_from_google_form(form_url):
         else:
             expanded_url += "viewform"
 
-    # Step 3: Fetch the form HTML
-    response = requests.get(expanded_url)
-    html = response.text
+    if resolved:
+        _cache_put(_resolved_urls, form_url, expanded_url)
+    return expanded_url
 
+
+def parse_form_html(html):
+    """Extracts the question list from a form page's embedded FB_PUBLIC_LOAD_DATA_."""
     # Step 4: Extract embedded JSON (FB_PUBLIC_LOAD_DATA_)
     match = re.search(r'FB_PUBLIC_LOAD_DATA_ = (.*?);</script>', html)
     if not match:
@@ -37,6 +101,11 @@ def extract_questions_from_google_form(form_url):
             question_text = item[1]
             question_type = item[3]
             options = []
+            entry_id = None
+            required = False
+            if len(item) > 4 and item[4] and isinstance(item[4], list):
+                entry_id = item[4][0][0]  # answers are submitted as entry.<entry_id>
+                required = bool(item[4][0][2]) if len(item[4][0]) > 2 else False
             if question_type in [2, 3, 4]:  # multiple choice / checkbox / dropdown
                 if item[4] and isinstance(item[4], list):
                     for opt in item[4][0][1]:
@@ -44,7 +113,9 @@ def extract_questions_from_google_form(form_url):
             questions.append({
                 "question": question_text,
                 "type": question_type,
-                "options": options
+                "options": options,
+                "entry_id": entry_id,
+                "required": required,
             })
         except Exception:
             continue
@@ -52,3 +123,50 @@ def extract_questions_from_google_form(form_url):
     return questions
 
 
+def extract_questions_from_google_form(form_url, session=None, max_age=None, timeout=DEFAULT_TIMEOUT):
+    """Returns the form's questions, served from the schema cache while it is fresh.
+
+    A stale entry is revalidated with If-None-Match / If-Modified-Since when the
+    server sent an ETag or Last-Modified, so an unchanged form costs a 304 and no
+    re-parse. Concurrent callers for the same form share one fetch. Each caller
+    gets its own copy of the question dicts.
+    """
+    session = session or get_session()
+    max_age = SCHEMA_TTL if max_age is None else max_age
+    expanded_url = resolve_form_url(form_url, session=session, timeout=timeout)
+
+    with _lock_for(expanded_url):
+        cached = _cache_get(_schema_cache, expanded_url)
+        if cached and time.time() - cached["fetched"] < max_age:
+            _count("hits")
+            return copy.deepcopy(cached["questions"])
+
+        headers = {}
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        # Step 3: Fetch the form HTML
+        response = session.get(expanded_url, headers=headers, timeout=timeout)
+        if cached and response.status_code == 304:
+            cached["fetched"] = time.time()
+            _count("revalidated")
+            return copy.deepcopy(cached["questions"])
+        response.raise_for_status()
+
+        questions = parse_form_html(response.text)
+        _count("fetched")
+        _cache_put(_schema_cache, expanded_url, {
+            "questions": questions,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched": time.time(),
+        })
+        return copy.deepcopy(questions)
+
+
+def clear_form_cache():
+    with _cache_lock:
+        _resolved_urls.clear()
+        _schema_cache.clear()
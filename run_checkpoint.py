@@ -0,0 +1,98 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from index_cache import file_digest
+
+
+load_dotenv()
+
+CHECKPOINT_DIR = os.getenv("GFF_CHECKPOINT_DIR", ".gff_cache/runs")
+CHECKPOINT_TTL = float(os.getenv("GFF_CHECKPOINT_TTL_HOURS", "24")) * 3600
+
+
+def run_id_for(form_url, doc_paths):
+    """Derives a run id from the form URL and document contents, so a retry of the same run finds its checkpoint."""
+    digests = sorted(file_digest(p) for p in doc_paths if os.path.exists(p))
+    payload = json.dumps({"form_url": form_url, "documents": digests})
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:20]
+
+
+# --------------------------------------------------------------------------
+# Run Checkpoints
+# --------------------------------------------------------------------------
+class RunCheckpoint:
+    """Append-only journal of one pipeline run: its questions and each answer.
+
+    The index isn't journaled: a resumed run reopens it by content (index cache)
+    or by collection name, like any other run. Every record is a JSON line written and flushed as soon as it is known, so
+    a run killed at any point loses at most the answer being written. A
+    truncated last line is ignored when the journal is read back.
+    """
+
+    def __init__(self, run_id, directory=CHECKPOINT_DIR, ttl_seconds=CHECKPOINT_TTL):
+        self.run_id = run_id
+        self.path = Path(directory) / f"{run_id}.jsonl"
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+        self.questions = None
+        self.answers = {}
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        if self.ttl_seconds is not None and time.time() - self.path.stat().st_mtime > self.ttl_seconds:
+            print(f"🔹 Checkpoint {self.run_id} is stale, starting over.")
+            self.discard()
+            return
+
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                kind = record.get("kind")
+                if kind == "questions":
+                    self.questions = record["questions"]
+                elif kind == "answer":
+                    self.answers[record["index"]] = record
+
+    def _append(self, record):
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def save_questions(self, form_url, questions):
+        self.questions = [
+            {k: v for k, v in q.items() if k not in ("answer", "answer_source", "failed")} for q in questions
+        ]
+        self._append({"kind": "questions", "form_url": form_url, "questions": self.questions})
+
+    def save_answer(self, index, question):
+        record = {
+            "kind": "answer",
+            "index": index,
+            "answer": question.get("answer"),
+            "answer_source": question.get("answer_source"),
+            "failed": question.get("failed", False),
+        }
+        self.answers[index] = record
+        self._append(record)
+
+    def completed(self, index):
+        record = self.answers.get(index)
+        return record is not None and not record.get("failed")
+
+    def discard(self):
+        self.path.unlink(missing_ok=True)
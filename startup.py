@@ -0,0 +1,124 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import subprocess
+
+
+PROCESS_START = time.perf_counter()
+
+# Modules that should only load on first use (or in the background warm-up), never on first paint.
+HEAVY_MODULES = (
+    "torch",
+    "transformers",
+    "sentence_transformers",
+    "langchain_huggingface",
+    "langchain_community",
+    "faiss",
+    "numpy",
+    "langchain_text_splitters",
+    "google.generativeai",
+    "selenium",
+    "webdriver_manager",
+)
+
+_marks = {}
+_marks_lock = threading.Lock()
+_warmup_thread = None
+
+
+def mark(name):
+    """Records `name` at the current time, in seconds since this process imported startup.py."""
+    with _marks_lock:
+        _marks.setdefault(name, time.perf_counter() - PROCESS_START)
+
+
+def report():
+    """Prints and returns the recorded startup milestones."""
+    with _marks_lock:
+        marks = dict(_marks)
+    print("\n⏱️  Startup timeline (seconds since process start):")
+    for name, seconds in sorted(marks.items(), key=lambda kv: kv[1]):
+        print(f"  {seconds:7.2f}  {name}")
+    return marks
+
+
+def start_background_warmup(steps):
+    """Runs `steps` ([(name, callable)]) once per process in a daemon thread, marking each as it finishes.
+
+    Call it at the end of the script, after the UI has been sent, so the
+    imports and model loads it triggers don't delay first paint.
+    """
+    global _warmup_thread
+    with _marks_lock:
+        if _warmup_thread is not None:
+            return _warmup_thread
+
+        def _run():
+            for name, step in steps:
+                started = time.perf_counter()
+                try:
+                    step()
+                    mark(f"{name} ({time.perf_counter() - started:.2f}s)")
+                except Exception as e:
+                    print(f"⚠️  Warm-up step '{name}' failed: {e}")
+            report()
+
+        _warmup_thread = threading.Thread(target=_run, name="startup-warmup", daemon=True)
+    _warmup_thread.start()
+    return _warmup_thread
+
+
+# --------------------------------------------------------------------------
+# Cold Import Check
+# --------------------------------------------------------------------------
+_PROBE = """
+import sys, time, json
+started = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - started
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"seconds": seconds, "heavy": heavy}}))
+"""
+
+
+def measure_import(module, python=sys.executable):
+    """Imports `module` in a fresh interpreter; returns its import time and the heavy modules it dragged in."""
+    result = subprocess.run(
+        [python, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr.strip()}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report cold import times and catch import regressions.")
+    parser.add_argument("modules", nargs="*", default=["app", "answer_retrever", "question_retrever", "http_submitter"])
+    parser.add_argument("--light", nargs="*", default=["app", "answer_retrever", "question_retrever", "http_submitter"],
+                        help="Modules that must not import any heavy dependency.")
+    parser.add_argument("--max-seconds", type=float, default=None, help="Fail if any module takes longer.")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'module':<22} {'seconds':>8}  heavy dependencies loaded")
+    for module in args.modules:
+        try:
+            measured = measure_import(module)
+        except RuntimeError as e:
+            failures.append(str(e))
+            continue
+        print(f"{module:<22} {measured['seconds']:8.2f}  {', '.join(measured['heavy']) or '-'}")
+        if module in args.light and measured["heavy"]:
+            failures.append(f"{module} imports {', '.join(measured['heavy'])} at import time")
+        if args.max_seconds is not None and measured["seconds"] > args.max_seconds:
+            failures.append(f"{module} took {measured['seconds']:.2f}s (limit {args.max_seconds}s)")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    sys.exit(1 if failures else 0)
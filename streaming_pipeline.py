@@ -0,0 +1,163 @@
+import time
+import queue
+import threading
+from contextlib import contextmanager, nullcontext
+
+import telemetry
+from answer_retrever import generate_answers_rag_with_refresh, prepare_vector_store, safe_extract_questions
+from form_filler import (
+    fill_question,
+    flush_text_inputs,
+    get_chrome_driver,
+    get_driver_pool,
+    hand_over_for_review,
+    load_form,
+    use_driver_pool,
+)
+
+
+_DONE = object()
+
+
+# --------------------------------------------------------------------------
+# Stage Timing
+# --------------------------------------------------------------------------
+class StageTimer:
+    """Records when each pipeline stage started and finished, relative to the run start."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        begin = time.perf_counter() - self.start
+        try:
+            yield
+        finally:
+            self.record(name, begin, time.perf_counter() - self.start)
+
+    def record(self, name, begin, end):
+        with self._lock:
+            self.stages[name] = (begin, end)
+
+    def report(self, width=40):
+        """Prints a timeline of the stages so overlap between them is visible."""
+        wall = time.perf_counter() - self.start
+        busy = sum(end - begin for begin, end in self.stages.values())
+        print("\n⏱️  Stage timeline (wall-clock seconds since start):")
+        for name, (begin, end) in sorted(self.stages.items(), key=lambda kv: kv[1][0]):
+            left = int(width * begin / wall) if wall else 0
+            length = max(1, int(width * (end - begin) / wall)) if wall else 1
+            bar = " " * left + "█" * length
+            print(f"  {name:<18} {begin:7.2f} → {end:7.2f}  ({end - begin:6.2f}s) |{bar:<{width}}|")
+        print(f"  {'total wall time':<18} {wall:7.2f}s  vs  {busy:.2f}s if run one after another")
+        return {"wall": wall, "sum_of_stages": busy, "stages": dict(self.stages)}
+
+
+# --------------------------------------------------------------------------
+# Streaming Pipeline
+# --------------------------------------------------------------------------
+def _fill_consumer(form_url, answers, timer, use_pool, errors):
+    """Opens the form while answers are still being produced, then fills each one as it arrives."""
+    try:
+        lease = get_driver_pool().lease() if use_pool else nullcontext(None)
+        with lease as driver:
+            with timer.stage("browser startup"):
+                driver = driver or get_chrome_driver()
+                wait, index = load_form(driver, form_url)
+
+            filled = 0
+            first_fill = None
+            done = False
+            while not done:
+                batch = [answers.get()]
+                # Drain whatever else is ready so text answers go out in one script call.
+                while True:
+                    try:
+                        batch.append(answers.get_nowait())
+                    except queue.Empty:
+                        break
+
+                text_batch = []
+                for item in batch:
+                    if item is _DONE:
+                        done = True
+                        continue
+                    if first_fill is None:
+                        first_fill = time.perf_counter() - timer.start
+                    fill_question(driver, wait, index, item, text_batch)
+                    filled += 1
+                flush_text_inputs(driver, text_batch)
+
+            if first_fill is not None:
+                timer.record("form filling", first_fill, time.perf_counter() - timer.start)
+            print(f"\n✅ Streamed {filled} answer(s) into the form.")
+            if use_pool:
+                print("🔹 The pooled headless browser is reset when handed back to the pool.")
+            else:
+                hand_over_for_review(driver)
+    except Exception as e:
+        errors.append(e)
+        print(f"❌ A critical error occurred while filling the form: {e}")
+
+
+@telemetry.run_scope("streaming_pipeline")
+def run_streaming_pipeline(form_url, doc_paths, top_k=3, context_refresh_interval=5, collection=None,
+                           use_pool=None, on_answer=None, on_questions=None):
+    """Runs extraction, indexing, generation and form filling as overlapping stages.
+
+    The browser starts and loads the form while documents are indexed, and
+    each answer is filled in as soon as Gemini produces it, so wall time tends
+    towards the slowest stage rather than the sum of all stages. Returns
+    (filled_form, timing) where `timing` is the stage timeline. Pass
+    `use_pool=False` to keep the filled form open for review (see
+    form_filler.hand_over_for_review); a pooled browser is reset afterwards.
+    """
+    timer = StageTimer()
+    use_pool = use_driver_pool() if use_pool is None else use_pool
+    answers = queue.Queue()
+    errors = []
+
+    # The consumer records its browser spans into this run.
+    consumer = threading.Thread(
+        target=telemetry.run_in_context(_fill_consumer),
+        args=(form_url, answers, timer, use_pool, errors),
+        name="form-fill-consumer",
+        daemon=True,
+    )
+    consumer.start()
+
+    def _stream(index, item):
+        if not errors:
+            answers.put(item)
+        if on_answer:
+            on_answer(index, item)
+
+    try:
+        with timer.stage("question extraction"), telemetry.span("question_extraction"):
+            print("🔹 Extracting questions from Google Form...")
+            questions = safe_extract_questions(form_url)
+            print(f"✅ Extracted {len(questions)} questions (including failed placeholders if any).")
+            if on_questions:
+                on_questions(questions)
+
+        with timer.stage("document indexing"), telemetry.span("document_indexing"):
+            vector_store = prepare_vector_store(doc_paths, collection)
+
+        with timer.stage("answer generation"), telemetry.span("answer_generation"):
+            print("🔹 Generating answers using RAG (streaming into the form)...")
+            filled_form = generate_answers_rag_with_refresh(
+                questions,
+                vector_store,
+                top_k=top_k,
+                context_refresh_interval=context_refresh_interval,
+                on_answer=_stream,
+            )
+    finally:
+        answers.put(_DONE)
+        consumer.join()
+
+    timing = timer.report()
+    return filled_form, timing
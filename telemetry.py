@@ -0,0 +1,285 @@
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+TELEMETRY_ENABLED = os.getenv("GFF_TELEMETRY", "1").lower() in ("1", "true", "yes")
+RUN_SUMMARY = os.getenv("GFF_RUN_SUMMARY", "1").lower() in ("1", "true", "yes")
+# When set, metrics are written here after every run (".prom" for Prometheus text, else JSON).
+METRICS_FILE = os.getenv("GFF_METRICS_FILE", "")
+# When set, each run's span trace is written to this folder as JSON.
+TRACE_DIR = os.getenv("GFF_TRACE_DIR", "")
+MAX_TRACE_SPANS = 5000
+
+# Histogram bucket upper bounds in seconds, from a FAISS search to a slow Gemini retry loop.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def _label_text(labels):
+    return ",".join(f'{k}="{v}"' for k, v in labels)
+
+
+# --------------------------------------------------------------------------
+# Process-wide Metrics
+# --------------------------------------------------------------------------
+class Metrics:
+    """Counters and fixed-bucket latency histograms, safe to update from any thread.
+
+    Histograms are keyed by stage name only, so the number of series stays
+    small; per-question detail lives in the run trace instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram["buckets"][i] += 1
+                    break
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def to_json(self):
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+                "histograms": {
+                    stage: {
+                        "buckets": dict(zip([str(b) for b in BUCKETS], _cumulative(h["buckets"]))),
+                        "sum": round(h["sum"], 6),
+                        "count": h["count"],
+                    }
+                    for stage, h in sorted(self.histograms.items())
+                },
+            }
+
+    def to_prometheus(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((stage, dict(h, buckets=list(h["buckets"]))) for stage, h in self.histograms.items())
+
+        seen = set()
+        for (name, labels), value in counters:
+            metric = f"gff_{name}_total"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} counter")
+                seen.add(metric)
+            label_text = _label_text(labels)
+            lines.append(f"{metric}{{{label_text}}} {value}" if label_text else f"{metric} {value}")
+
+        if histograms:
+            lines.append("# TYPE gff_stage_seconds histogram")
+        for stage, h in histograms:
+            for bound, total in zip(BUCKETS, _cumulative(h["buckets"])):
+                lines.append(f'gff_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {total}')
+            lines.append(f'gff_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {h["count"]}')
+            lines.append(f'gff_stage_seconds_sum{{stage="{stage}"}} {h["sum"]:.6f}')
+            lines.append(f'gff_stage_seconds_count{{stage="{stage}"}} {h["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+def _cumulative(counts):
+    total = 0
+    out = []
+    for c in counts:
+        total += c
+        out.append(total)
+    return out
+
+
+metrics = Metrics()
+
+
+# --------------------------------------------------------------------------
+# Runs & Spans
+# --------------------------------------------------------------------------
+class RunTrace:
+    """Spans and counters of one pipeline run, for its summary table and trace export."""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.wall_started = time.time()
+        self.spans = []
+        self.counters = {}
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def add_span(self, name, start, seconds, labels):
+        with self._lock:
+            if len(self.spans) >= MAX_TRACE_SPANS:
+                self.dropped += 1
+                return
+            self.spans.append({
+                "name": name,
+                "start": round(start - self.started, 6),
+                "seconds": round(seconds, 6),
+                "thread": threading.current_thread().name,
+                **({"labels": labels} if labels else {}),
+            })
+
+    def add_count(self, name, value):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self):
+        with self._lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+        by_name = {}
+        for span in spans:
+            by_name.setdefault(span["name"], []).append(span["seconds"])
+        stages = {
+            name: {
+                "count": len(values),
+                "total": sum(values),
+                "p50": _percentile(values, 0.5),
+                "p95": _percentile(values, 0.95),
+                "max": max(values),
+            }
+            for name, values in by_name.items()
+        }
+        return {
+            "run": self.name,
+            "wall_seconds": time.perf_counter() - self.started,
+            "stages": stages,
+            "counters": counters,
+            "dropped_spans": self.dropped,
+        }
+
+    def to_json(self):
+        summary = self.summary()
+        with self._lock:
+            return {**summary, "started": self.wall_started, "spans": list(self.spans)}
+
+
+_current_run = contextvars.ContextVar("gff_current_run", default=None)
+
+
+def current_run():
+    return _current_run.get()
+
+
+def count(name, value=1, **labels):
+    """Increments a process-wide counter and the current run's tally."""
+    if not TELEMETRY_ENABLED:
+        return
+    metrics.count(name, value, **labels)
+    run = _current_run.get()
+    if run is not None:
+        run.add_count(name, value)
+
+
+@contextmanager
+def span(name, **labels):
+    """Times a block into the `name` histogram and, inside a run, into its trace (with `labels`)."""
+    if not TELEMETRY_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        metrics.observe(name, seconds)
+        run = _current_run.get()
+        if run is not None:
+            run.add_span(name, start, seconds, labels)
+
+
+@contextmanager
+def run_scope(name, summary=None):
+    """Collects the spans of one run. Nested scopes join the outer run instead of starting their own.
+
+    On exit the run's summary table is printed (unless `summary` or
+    GFF_RUN_SUMMARY turns it off), and metrics and the trace are written out
+    when GFF_METRICS_FILE / GFF_TRACE_DIR are set.
+    """
+    if not TELEMETRY_ENABLED or _current_run.get() is not None:
+        yield _current_run.get()
+        return
+    run = RunTrace(name)
+    token = _current_run.set(run)
+    try:
+        with span(name):
+            yield run
+    finally:
+        _current_run.reset(token)
+        if RUN_SUMMARY if summary is None else summary:
+            print_summary(run)
+        try:
+            if METRICS_FILE:
+                write_metrics(METRICS_FILE)
+            if TRACE_DIR:
+                write_trace(run, TRACE_DIR)
+        except OSError as e:
+            print(f"⚠️  Could not write telemetry: {e}")
+
+
+def print_summary(run):
+    summary = run.summary()
+    print(f"\n📊 Run summary: {summary['run']} ({summary['wall_seconds']:.2f}s wall)")
+    print(f"  {'stage':<26} {'count':>6} {'total s':>9} {'p50 s':>8} {'p95 s':>8} {'max s':>8}")
+    for name, s in sorted(summary["stages"].items(), key=lambda kv: -kv[1]["total"]):
+        print(f"  {name:<26} {s['count']:>6} {s['total']:>9.3f} {s['p50']:>8.3f} {s['p95']:>8.3f} {s['max']:>8.3f}")
+    if summary["counters"]:
+        print("  " + ", ".join(f"{k}={v}" for k, v in sorted(summary["counters"].items())))
+    return summary
+
+
+def write_metrics(path):
+    """Writes process-wide metrics as Prometheus text (.prom / .txt) or JSON."""
+    text = metrics.to_prometheus() if path.endswith((".prom", ".txt")) else json.dumps(metrics.to_json(), indent=2)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def write_trace(run, directory):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{run.name}-{int(run.wall_started * 1000)}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(run.to_json(), f)
+    return path
+
+
+def run_in_context(target):
+    """Wraps `target` so a worker thread records into the caller's run."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(target, *args, **kwargs)
@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+import answer_cache as answer_cache_module
+from answer_cache import AnswerCache, answer_key
+
+
+BASE = ("What is your name?", ["Ada", "Grace"], "gemini-2.5-flash", "context")
+
+
+def test_key_ignores_case_and_whitespace_in_the_question():
+    assert answer_key("  What is\n your NAME? ", *BASE[1:]) == answer_key(*BASE)
+
+
+@pytest.mark.parametrize("changed", [
+    ("What is your email?", ["Ada", "Grace"], "gemini-2.5-flash", "context"),
+    ("What is your name?", ["Grace", "Ada"], "gemini-2.5-flash", "context"),
+    ("What is your name?", ["Ada"], "gemini-2.5-flash", "context"),
+    ("What is your name?", ["Ada", "Grace"], "gemini-2.5-pro", "context"),
+    ("What is your name?", ["Ada", "Grace"], "gemini-2.5-flash", "other context"),
+])
+def test_key_changes_with_question_options_model_and_context(changed):
+    assert answer_key(*changed) != answer_key(*BASE)
+
+
+def test_key_treats_missing_options_and_context_as_empty():
+    assert answer_key("q", None, "m", None) == answer_key("q", [], "m", "")
+
+
+def test_round_trip_and_stats(tmp_path):
+    cache = AnswerCache(tmp_path / "answers.sqlite3")
+    key = answer_key(*BASE)
+    assert cache.get(key) is None
+    cache.put(key, "Ada")
+    assert cache.get(key) == "Ada"
+    assert cache.stats() | {"hit_rate": None} == {
+        "entries": 1, "hits": 1, "misses": 1, "hit_rate": None, "stores": 1, "expired": 0, "evictions": 0,
+    }
+
+
+def test_entries_persist_across_instances(tmp_path):
+    AnswerCache(tmp_path / "answers.sqlite3").put("k", ["A", "B"])
+    assert AnswerCache(tmp_path / "answers.sqlite3").get("k") == ["A", "B"]
+
+
+def test_expired_entries_are_misses(tmp_path, monkeypatch):
+    cache = AnswerCache(tmp_path / "answers.sqlite3", ttl_seconds=60)
+    cache.put("k", "old")
+    now = time.time()
+    monkeypatch.setattr(answer_cache_module.time, "time", lambda: now + 120)
+    assert cache.get("k") is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = iter(range(1000, 2000))
+    monkeypatch.setattr(answer_cache_module.time, "time", lambda: next(clock))
+    cache = AnswerCache(tmp_path / "answers.sqlite3", ttl_seconds=None, max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,152 @@
+import threading
+
+import pytest
+
+from driver_pool import DriverPool, DriverPoolFullError
+
+
+class FakeDriver:
+    """Just enough of a Selenium WebDriver for the pool: tabs, cookies, liveness and quit."""
+
+    def __init__(self, number):
+        self.number = number
+        self.window_handles = ["main"]
+        self.cookies = {}
+        self.url = "about:blank"
+        self.alive = True
+        self.quit_called = False
+        self.switch_to = self
+
+    @property
+    def current_url(self):
+        if not self.alive:
+            raise RuntimeError("chrome not reachable")
+        return self.url
+
+    def window(self, handle):
+        pass
+
+    def close(self):
+        self.window_handles.pop()
+
+    def execute_script(self, script):
+        pass
+
+    def delete_all_cookies(self):
+        if not self.alive:
+            raise RuntimeError("chrome not reachable")
+        self.cookies.clear()
+
+    def get(self, url):
+        self.url = url
+
+    def quit(self):
+        self.quit_called = True
+
+
+class Factory:
+    def __init__(self):
+        self.drivers = []
+
+    def __call__(self):
+        driver = FakeDriver(len(self.drivers))
+        self.drivers.append(driver)
+        return driver
+
+
+@pytest.fixture
+def factory():
+    return Factory()
+
+
+def test_lease_reuses_a_reset_driver(factory):
+    pool = DriverPool(factory, size=2)
+    with pool.lease() as driver:
+        driver.window_handles.append("popup")
+        driver.cookies["session"] = "x"
+        driver.get("https://docs.google.com/forms")
+    with pool.lease() as again:
+        assert again is driver
+        assert again.window_handles == ["main"]
+        assert again.cookies == {}
+        assert again.url == "about:blank"
+    assert len(factory.drivers) == 1
+    assert pool.stats()["leases"] == 2
+
+
+def test_concurrent_leases_get_separate_drivers(factory):
+    pool = DriverPool(factory, size=2)
+    with pool.lease() as first, pool.lease() as second:
+        assert first is not second
+        assert pool.stats()["in_use"] == 2
+    assert pool.stats()["idle"] == 2
+
+
+def test_driver_is_recycled_after_max_uses(factory):
+    pool = DriverPool(factory, size=1, max_uses=2)
+    for _ in range(3):
+        with pool.lease():
+            pass
+    assert len(factory.drivers) == 2
+    assert factory.drivers[0].quit_called
+    assert pool.stats()["recycled"] == 1
+
+
+def test_crashed_driver_is_replaced(factory):
+    pool = DriverPool(factory, size=1)
+    with pytest.raises(ValueError):
+        with pool.lease() as driver:
+            driver.alive = False
+            raise ValueError("fill failed")
+    assert driver.quit_called
+    with pool.lease() as replacement:
+        assert replacement is not driver
+    assert pool.stats()["crashed"] == 1
+
+
+def test_idle_driver_that_died_is_replaced_on_lease(factory):
+    pool = DriverPool(factory, size=1)
+    pool.prewarm(background=False)
+    factory.drivers[0].alive = False
+    with pool.lease() as driver:
+        assert driver is factory.drivers[1]
+    assert pool.stats()["crashed"] == 1
+
+
+def test_waiter_gets_the_driver_when_it_is_returned(factory):
+    pool = DriverPool(factory, size=1, lease_timeout=5)
+    leased = []
+    with pool.lease() as driver:
+        def _wait_for_driver():
+            with pool.lease() as d:
+                leased.append(d)
+        waiter = threading.Thread(target=_wait_for_driver)
+        waiter.start()
+        waiter.join(0.1)
+        assert leased == []
+    waiter.join(5)
+    assert leased == [driver]
+
+
+def test_lease_times_out_and_queue_is_bounded(factory):
+    pool = DriverPool(factory, size=1, max_queue=0, lease_timeout=0.05)
+    with pool.lease():
+        with pytest.raises(DriverPoolFullError):
+            with pool.lease():
+                pass
+    pool.max_queue = None
+    with pool.lease():
+        with pytest.raises(TimeoutError):
+            with pool.lease():
+                pass
+
+
+def test_prewarm_respects_size_and_close_quits_idle_drivers(factory):
+    pool = DriverPool(factory, size=2)
+    pool.prewarm(count=5, background=False)
+    assert len(factory.drivers) == 2
+    pool.close()
+    assert all(d.quit_called for d in factory.drivers)
+    with pytest.raises(RuntimeError):
+        with pool.lease():
+            pass
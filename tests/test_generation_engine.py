@@ -0,0 +1,129 @@
+import pytest
+
+import generation_engine
+from fakes import FakeGenerativeModel
+from generation_engine import FAILED_ANSWER, AdaptiveBackoff, ConcurrentGenerator, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(generation_engine.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(generation_engine.time, "sleep", clock.sleep)
+    monkeypatch.setattr(generation_engine.random, "uniform", lambda a, b: 0.0)
+    return clock
+
+
+# --------------------------------------------------------------------------
+# TokenBucket
+# --------------------------------------------------------------------------
+def test_bucket_allows_a_burst_then_paces(clock):
+    bucket = TokenBucket(requests_per_minute=60, burst=2)
+    assert bucket._reserve() == 0.0
+    assert bucket._reserve() == 0.0
+    assert bucket._reserve() == pytest.approx(1.0)
+    # Reservations queue up: the next caller waits behind the one already in debt.
+    assert bucket._reserve() == pytest.approx(2.0)
+
+
+def test_bucket_refills_over_time(clock):
+    bucket = TokenBucket(requests_per_minute=120)
+    bucket.acquire_blocking()
+    clock.now += 0.5
+    bucket.acquire_blocking()
+    clock.now += 10
+    bucket.acquire_blocking()
+    assert clock.slept == []
+
+
+def test_bucket_blocking_acquire_sleeps_for_its_slot(clock):
+    bucket = TokenBucket(requests_per_minute=30)
+    bucket.acquire_blocking()
+    bucket.acquire_blocking()
+    assert clock.slept == [pytest.approx(2.0)]
+
+
+# --------------------------------------------------------------------------
+# AdaptiveBackoff
+# --------------------------------------------------------------------------
+def test_backoff_doubles_and_caps(clock):
+    backoff = AdaptiveBackoff(base_delay=2, max_delay=10)
+    assert [backoff.on_throttle() for _ in range(5)] == [2, 4, 8, 10, 10]
+    assert backoff.throttles == 5
+
+
+def test_backoff_resets_after_success(clock):
+    backoff = AdaptiveBackoff(base_delay=2, max_delay=60)
+    backoff.on_throttle()
+    backoff.on_throttle()
+    backoff.on_success()
+    assert backoff.on_throttle() == 2
+
+
+def test_backoff_honours_longer_server_hint_up_to_the_cap(clock):
+    backoff = AdaptiveBackoff(base_delay=2, max_delay=30)
+    assert backoff.on_throttle(hint=7) == 7
+    assert backoff.on_throttle(hint=1) == 4
+    assert backoff.on_throttle(hint=300) == 30
+
+
+def test_backoff_pauses_every_waiter_until_the_cooldown_ends(clock):
+    backoff = AdaptiveBackoff(base_delay=4)
+    backoff.on_throttle()
+    clock.now += 1
+    backoff.wait_blocking()
+    assert clock.slept == [pytest.approx(3.0)]
+    backoff.wait_blocking()
+    assert clock.slept == [pytest.approx(3.0)]
+
+
+def test_retry_after_hint_parses_gemini_messages():
+    assert generation_engine.retry_after_hint(Exception("429 quota. Please retry in 12.5s.")) == 12.5
+    assert generation_engine.retry_after_hint(Exception("retry_delay { seconds: 7 }")) == 7.0
+    assert generation_engine.retry_after_hint(Exception("boom")) is None
+
+
+# --------------------------------------------------------------------------
+# ConcurrentGenerator
+# --------------------------------------------------------------------------
+def _no_wait_backoff():
+    return AdaptiveBackoff(base_delay=0, max_delay=0)
+
+
+def test_generator_keeps_prompt_order_and_bounds_concurrency():
+    model = FakeGenerativeModel(latency=0.02, jitter=0.01, answer_fn=lambda prompt: prompt.upper(), seed=1)
+    generator = ConcurrentGenerator(model, concurrency=3, backoff=_no_wait_backoff())
+    prompts = [f"q{i}" for i in range(10)]
+    assert generator.run(prompts) == [(p.upper(), False) for p in prompts]
+    assert model.max_in_flight <= 3
+
+
+def test_generator_retries_through_throttling(monkeypatch):
+    monkeypatch.setattr(generation_engine.random, "uniform", lambda a, b: 0.0)
+    model = FakeGenerativeModel(latency=0, throttle_rate=0.5, answer_fn=lambda prompt: "ok", seed=3)
+    backoff = _no_wait_backoff()
+    generator = ConcurrentGenerator(model, concurrency=2, throttle_retries=50, delay=0, backoff=backoff)
+    assert generator.run(["a", "b", "c", "d"]) == [("ok", False)] * 4
+    assert model.throttled > 0
+    assert backoff.throttles == model.throttled
+
+
+def test_generator_marks_exhausted_prompts_failed(monkeypatch):
+    monkeypatch.setattr(generation_engine.random, "uniform", lambda a, b: 0.0)
+    model = FakeGenerativeModel(latency=0, answer_fn=lambda prompt: "")
+    generator = ConcurrentGenerator(model, retries=2, delay=0, backoff=_no_wait_backoff())
+    assert generator.run(["a"]) == [(FAILED_ANSWER, True)]
+    assert model.calls == 2
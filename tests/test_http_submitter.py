@@ -0,0 +1,102 @@
+import json
+
+import requests
+
+from fakes import FakeFormServer
+from http_submitter import QUESTION_TYPE, PAGE_BREAK_TYPE, build_payload, form_response_url, submit_google_form
+from question_retrever import clear_form_cache, extract_questions_from_google_form
+
+
+def _question(text, type_name, answer, entry_id, options=()):
+    return {"question": text, "type": QUESTION_TYPE[type_name], "options": list(options),
+            "entry_id": entry_id, "answer": answer}
+
+
+def _page_break():
+    return {"question": "Next page", "type": PAGE_BREAK_TYPE, "options": [], "entry_id": None}
+
+
+def test_form_response_url():
+    assert form_response_url("https://docs.google.com/forms/d/e/abc/viewform?usp=header") == \
+        "https://docs.google.com/forms/d/e/abc/formResponse"
+    assert form_response_url("https://docs.google.com/forms/d/e/abc/") == \
+        "https://docs.google.com/forms/d/e/abc/formResponse"
+
+
+def test_payload_maps_each_question_type():
+    payload, skipped = build_payload([
+        _question("Name", "SHORT_ANSWER", "Ada", 1),
+        _question("Skills", "PARAGRAPH", ["Python", "SQL"], 2),
+        _question("Level", "MULTIPLE_CHOICE", "senior", 3, ["Junior", "Senior"]),
+        _question("Tools", "CHECKBOX", "git, Docker, vim, git", 4, ["Git", "Docker", "Emacs"]),
+        _question("Country", "DROPDOWN", "India", 5, ["India", "Peru"]),
+    ])
+    assert skipped == []
+    assert payload["entry.1"] == "Ada"
+    assert payload["entry.2"] == "Python, SQL"
+    assert payload["entry.3"] == "Senior"
+    assert payload["entry.4"] == ["Git", "Docker"]
+    assert payload["entry.5"] == "India"
+    assert payload["fvv"] == "1"
+
+
+def test_payload_skips_unsubmittable_answers():
+    payload, skipped = build_payload([
+        _question("No id", "SHORT_ANSWER", "x", None),
+        _question("Failed", "SHORT_ANSWER", "No answer generated", 2) | {"failed": True},
+        _question("Unknown", "SHORT_ANSWER", "DATA_NOT_FOUND", 3),
+        _question("Empty", "SHORT_ANSWER", "", 4),
+        _question("Off-list", "MULTIPLE_CHOICE", "Maybe", 5, ["Yes", "No"]),
+        _question("Off-list boxes", "CHECKBOX", "Red", 6, ["Blue"]),
+    ])
+    assert [k for k in payload if k.startswith("entry.")] == []
+    assert skipped == [
+        ("No id", "no entry id"),
+        ("Failed", "no answer"),
+        ("Unknown", "no answer"),
+        ("Empty", "no answer"),
+        ("Off-list", "answer 'Maybe' is not a listed option"),
+        ("Off-list boxes", "answer 'Red' is not a listed option"),
+    ]
+
+
+def test_page_history_covers_every_page():
+    single, _ = build_payload([_question("Name", "SHORT_ANSWER", "Ada", 1)])
+    assert single["pageHistory"] == "0"
+
+    multi, skipped = build_payload([
+        _question("Name", "SHORT_ANSWER", "Ada", 1),
+        _page_break(),
+        _question("Email", "SHORT_ANSWER", "ada@example.com", 2),
+        _page_break(),
+        _question("Notes", "PARAGRAPH", "none", 3),
+    ])
+    assert multi["pageHistory"] == "0,1,2"
+    assert skipped == []
+
+
+def test_submit_posts_to_the_form_response_endpoint(tmp_path):
+    clear_form_cache()
+    form = [
+        {"question": "Name", "type": 0, "entry_id": 11},
+        {"question": "Tools", "type": 3, "options": ["Git", "Docker"], "entry_id": 12},
+    ]
+    session = requests.Session()
+    session.trust_env = False
+    with FakeFormServer(form) as server:
+        questions = extract_questions_from_google_form(server.form_url, session=session)
+        questions[0]["answer"] = "Ada"
+        questions[1]["answer"] = "Git; Docker"
+
+        output = tmp_path / "payload.json"
+        dry = submit_google_form(server.form_url, questions, dry_run=True, output_path=str(output), session=session)
+        assert server.submissions == []
+        assert json.loads(output.read_text(encoding="utf-8"))["payload"] == dry["payload"]
+
+        result = submit_google_form(server.form_url, questions, dry_run=False, session=session)
+
+    assert result["ok"] and result["answered"] == 2
+    assert result["url"].endswith("/formResponse")
+    assert server.submissions == [{
+        "entry.11": ["Ada"], "entry.12": ["Git", "Docker"], "pageHistory": ["0"], "fvv": ["1"],
+    }]
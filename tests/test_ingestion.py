@@ -0,0 +1,41 @@
+from ingestion import _ingest_file, iter_file_chunks
+
+
+def _spans(chunks):
+    return [(c.metadata["start_index"], c.metadata["start_index"] + len(c.page_content)) for c in chunks]
+
+
+def _write(tmp_path, text):
+    path = tmp_path / "notes.txt"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_streamed_chunks_point_at_their_text(tmp_path):
+    text = "\n\n".join(" ".join(f"p{p}w{w}" for w in range(15 + p % 7)) for p in range(60))
+    path = _write(tmp_path, text)
+    chunks = list(iter_file_chunks(path, chunk_size=120, chunk_overlap=30, block_chars=400))
+    assert chunks
+    for start, end in _spans(chunks):
+        assert text[start:end] in (c.page_content for c in chunks)
+    assert [s for s, _ in _spans(chunks)] == sorted(s for s, _ in _spans(chunks))
+
+
+def test_overlap_carries_across_text_blocks(tmp_path):
+    text = " ".join(f"word{i}" for i in range(600))
+    path = _write(tmp_path, text)
+    streamed = list(iter_file_chunks(path, chunk_size=100, chunk_overlap=30, block_chars=500))
+    eager = _ingest_file(path, 100, 30)["docs"]
+
+    spans = _spans(streamed)
+    # Every chunk shares some text with the one before it, including at block boundaries.
+    assert all(next_start < end for (_, end), (next_start, _) in zip(spans, spans[1:]))
+    assert abs(len(streamed) - len(eager)) <= len(text) // 500
+    assert spans[0][0] == 0 and spans[-1][1] == len(text)
+
+
+def test_overlap_is_not_carried_without_chunk_overlap(tmp_path):
+    text = " ".join(f"word{i}" for i in range(300))
+    path = _write(tmp_path, text)
+    spans = _spans(iter_file_chunks(path, chunk_size=100, chunk_overlap=0, block_chars=500))
+    assert all(next_start >= end for (_, end), (next_start, _) in zip(spans, spans[1:]))
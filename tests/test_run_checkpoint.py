@@ -0,0 +1,100 @@
+import os
+import json
+
+import pytest
+
+import answer_retrever
+from run_checkpoint import RunCheckpoint, run_id_for
+
+
+QUESTIONS = [{"question": "Name?", "type": 0}, {"question": "Email?", "type": 0}, {"question": "Role?", "type": 0}]
+
+
+def _answer(text, failed=False):
+    return {"answer": text, "answer_source": "rag", "failed": failed}
+
+
+def test_run_id_follows_document_content(tmp_path):
+    a, b = tmp_path / "a.txt", tmp_path / "b.txt"
+    a.write_text("same")
+    b.write_text("same")
+    assert run_id_for("form", [str(a)]) == run_id_for("form", [str(b)])
+    assert run_id_for("form", [str(a)]) != run_id_for("other form", [str(a)])
+    b.write_text("changed")
+    assert run_id_for("form", [str(a)]) != run_id_for("form", [str(b)])
+
+
+def test_journal_survives_a_restart(tmp_path):
+    checkpoint = RunCheckpoint("run", directory=tmp_path)
+    checkpoint.save_questions("form", [dict(q, answer="stale") for q in QUESTIONS])
+    checkpoint.save_answer(0, _answer("Ada"))
+    checkpoint.save_answer(1, _answer("No answer generated", failed=True))
+
+    resumed = RunCheckpoint("run", directory=tmp_path)
+    assert resumed.questions == QUESTIONS
+    assert resumed.completed(0)
+    assert not resumed.completed(1)
+    assert not resumed.completed(2)
+    assert resumed.answers[0]["answer"] == "Ada"
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    checkpoint = RunCheckpoint("run", directory=tmp_path)
+    checkpoint.save_questions("form", QUESTIONS)
+    checkpoint.save_answer(0, _answer("Ada"))
+    with open(checkpoint.path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"kind": "answer", "index": 1, "answer": "Bob"})[:20])
+
+    resumed = RunCheckpoint("run", directory=tmp_path)
+    assert resumed.completed(0)
+    assert not resumed.completed(1)
+
+
+def test_stale_checkpoint_starts_over(tmp_path):
+    checkpoint = RunCheckpoint("run", directory=tmp_path)
+    checkpoint.save_questions("form", QUESTIONS)
+    old = checkpoint.path.stat().st_mtime - 3600
+    os.utime(checkpoint.path, (old, old))
+
+    resumed = RunCheckpoint("run", directory=tmp_path, ttl_seconds=60)
+    assert resumed.questions is None
+    assert not checkpoint.path.exists()
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    """Runs rag_pipeline_with_refresh offline, failing the questions listed in `fail`."""
+    monkeypatch.setattr(answer_retrever, "RunCheckpoint", lambda run_id: RunCheckpoint(run_id, directory=tmp_path))
+    monkeypatch.setattr(answer_retrever, "prepare_vector_store", lambda doc_paths, collection: None)
+    state = {"fail": set(), "extracted": 0, "asked": []}
+
+    def extract(form_url):
+        state["extracted"] += 1
+        return [dict(q) for q in QUESTIONS]
+
+    def generate(questions, vector_store, on_answer=None, positions=None, **kwargs):
+        for j, q in enumerate(questions):
+            state["asked"].append(q["question"])
+            failed = q["question"] in state["fail"]
+            q.update(answer="No answer generated" if failed else q["question"].upper(), failed=failed)
+            on_answer(j, q)
+        return questions
+
+    monkeypatch.setattr(answer_retrever, "safe_extract_questions", extract)
+    monkeypatch.setattr(answer_retrever, "generate_answers_rag_with_refresh", generate)
+    return state
+
+
+def test_resumed_run_only_asks_missing_and_failed_questions(pipeline, tmp_path):
+    pipeline["fail"] = {"Email?"}
+    first = answer_retrever.rag_pipeline_with_refresh("form", [], resume=True, run_id="r1")
+    assert [q["failed"] for q in first] == [False, True, False]
+
+    pipeline["fail"] = set()
+    pipeline["asked"].clear()
+    resumed = answer_retrever.rag_pipeline_with_refresh("form", [], resume=True, run_id="r1")
+    assert pipeline["extracted"] == 1
+    assert pipeline["asked"] == ["Email?"]
+    assert [q["answer"] for q in resumed] == ["NAME?", "EMAIL?", "ROLE?"]
+    # A fully answered run has nothing left to resume.
+    assert not (tmp_path / "r1.jsonl").exists()